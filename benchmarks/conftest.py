@@ -0,0 +1,58 @@
+import os
+import shutil
+import sys
+
+import pytest
+
+import cheddar
+
+# the benchmarks import generate.py, whichever directory pytest runs from
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from generate import generate_library  # noqa: E402
+
+# number of files of the generated libraries, e.g.
+# CHEDDAR_BENCHMARK_SIZES=1000,10000,100000
+SIZES = [
+    int(size) for size in
+    os.environ.get("CHEDDAR_BENCHMARK_SIZES", "1000").split(",")
+]
+
+
+@pytest.fixture(scope="session", params=SIZES, ids=lambda size: str(size))
+def library_directory(request, tmp_path_factory):
+    """
+    directory of a synthetic library, generated once per session
+    """
+    directory = str(
+        tmp_path_factory.mktemp("library-{}".format(request.param))
+    )
+    generate_library(directory, request.param)
+    return directory
+
+
+@pytest.fixture
+def library_copy(library_directory, tmp_path):
+    """
+    function returning a fresh copy of the synthetic library, for the
+    benchmarks that modify it
+    """
+    copies = []
+
+    def copy():
+        destination = str(tmp_path / "copy-{}".format(len(copies)))
+        shutil.copytree(library_directory, destination)
+        copies.append(destination)
+        return destination
+
+    return copy
+
+
+@pytest.fixture(autouse=True)
+def no_cache():
+    """
+    measure cold runs: the directory caches are neither read nor written
+    """
+    cheddar.cache.ENABLED = False
+    yield
+    cheddar.cache.ENABLED = True
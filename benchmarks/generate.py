@@ -0,0 +1,148 @@
+"""
+Generate synthetic libraries of JPEG, PNG and MP4 files for the benchmarks.
+
+The files are tiny but structurally valid: JPEGs carry an EXIF APP1 segment,
+PNGs an eXIf chunk and MP4s a moov/mvhd box, with a camera make and model
+and a capture time. Some files are taken in bursts (several files in the
+same second), so renaming them by date produces name collisions.
+
+.. code::
+
+    python benchmarks/generate.py ./library 10000
+"""
+import datetime
+import os
+import random
+import struct
+import sys
+import time
+
+CAMERAS = [
+    ("Canon", "Canon EOS 80D"),
+    ("Canon", "Canon PowerShot G7 X"),
+    ("NIKON CORPORATION", "NIKON D750"),
+    ("Apple", "iPhone 8"),
+    ("GoPro", "HERO5 Black"),
+]
+
+# share of each file type in a library
+EXTENSIONS = [("jpg", 0.7), ("png", 0.15), ("mp4", 0.15)]
+
+START = datetime.datetime(2017, 1, 1)
+
+
+def tiff(make, model, datetime_original):
+    """
+    TIFF structure of an EXIF block with the make, model and
+    DateTimeOriginal tags
+    """
+    strings = [
+        s.encode("ascii") + b"\x00" for s in [make, model, datetime_original]
+    ]
+    exif_ifd = 8 + 2 + 3 * 12 + 4
+    offsets = [exif_ifd + 2 + 12 + 4]
+    for s in strings[:-1]:
+        offsets.append(offsets[-1] + len(s))
+
+    data = b"II" + struct.pack("<HI", 42, 8)
+    data += struct.pack("<H", 3)
+    data += struct.pack("<HHII", 0x010f, 2, len(strings[0]), offsets[0])
+    data += struct.pack("<HHII", 0x0110, 2, len(strings[1]), offsets[1])
+    data += struct.pack("<HHII", 0x8769, 4, 1, exif_ifd)
+    data += struct.pack("<IH", 0, 1)
+    data += struct.pack("<HHII", 0x9003, 2, len(strings[2]), offsets[2])
+    data += struct.pack("<I", 0)
+    return data + b"".join(strings)
+
+
+def jpeg(make, model, taken, payload):
+    exif = b"Exif\x00\x00" + tiff(
+        make, model, taken.strftime("%Y:%m:%d %H:%M:%S")
+    )
+    return (
+        b"\xff\xd8" +
+        b"\xff\xe1" + struct.pack(">H", 2 + len(exif)) + exif +
+        b"\xff\xda" + payload + b"\xff\xd9"
+    )
+
+
+def _png_chunk(kind, data):
+    return struct.pack(">I4s", len(data), kind) + data + b"\x00" * 4
+
+
+def png(make, model, taken, payload):
+    exif = tiff(make, model, taken.strftime("%Y:%m:%d %H:%M:%S"))
+    return (
+        b"\x89PNG\r\n\x1a\n" +
+        _png_chunk(b"IHDR", struct.pack(">IIBBBBB", 1, 1, 8, 2, 0, 0, 0)) +
+        _png_chunk(b"eXIf", exif) +
+        _png_chunk(b"IDAT", payload) +
+        _png_chunk(b"IEND", b"")
+    )
+
+
+def _box(kind, data):
+    return struct.pack(">I4s", 8 + len(data), kind) + data
+
+
+def mp4(make, model, taken, payload):
+    seconds = int((taken - datetime.datetime(1904, 1, 1)).total_seconds())
+    return (
+        _box(b"ftyp", b"isom\x00\x00\x02\x00") +
+        _box(b"mdat", payload) +
+        _box(b"moov", _box(b"mvhd", struct.pack(">B3xII", 0, seconds, 0)))
+    )
+
+
+WRITERS = {"jpg": jpeg, "png": png, "mp4": mp4}
+
+
+def generate_library(
+    directory, count, burst_fraction=0.1, payload_size=1024, seed=0
+):
+    """
+    Write a synthetic library
+
+    :param str directory: directory of the library, created if needed
+    :param int count: number of files
+    :param float burst_fraction: share of the files taken in the same
+        second as the previous file
+    :param int payload_size: bytes of fake image data per file
+    :param int seed: seed of the random generator
+    :rtype: list
+    :return: path of each file
+    """
+    rng = random.Random(seed)
+    if not os.path.isdir(directory):
+        os.makedirs(directory)
+
+    extensions = [e for e, _ in EXTENSIONS]
+    weights = [w for _, w in EXTENSIONS]
+
+    taken = START
+    filepaths = []
+    for i in range(count):
+        if rng.random() >= burst_fraction:
+            taken += datetime.timedelta(seconds=rng.randint(1, 3600))
+        extension = rng.choices(extensions, weights)[0]
+        make, model = rng.choice(CAMERAS)
+        payload = rng.getrandbits(8 * payload_size).to_bytes(
+            payload_size, "little"
+        )
+
+        filepath = os.path.join(
+            directory, "IMG_{:06d}.{}".format(i, extension)
+        )
+        with open(filepath, "wb") as f:
+            f.write(WRITERS[extension](make, model, taken, payload))
+
+        # cheddar dates media by their modification time
+        timestamp = time.mktime(taken.timetuple())
+        os.utime(filepath, (timestamp, timestamp))
+        filepaths.append(filepath)
+
+    return filepaths
+
+
+if __name__ == "__main__":
+    generate_library(sys.argv[1], int(sys.argv[2]))
@@ -0,0 +1,35 @@
+import subprocess
+import sys
+
+import pytest
+
+# most import time (in microseconds) allowed for the modules used by
+# short-lived scripts, e.g. hooks run once per file
+BUDGETS = {
+    "cheddar": 10000,
+}
+
+
+def import_time(module):
+    # cumulative import time of a module in a fresh interpreter, in
+    # microseconds, as reported by python -X importtime
+    output = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import " + module],
+        stderr=subprocess.PIPE, check=True
+    ).stderr.decode()
+    for line in reversed(output.splitlines()):
+        fields = [field.strip() for field in line.split("|")]
+        if len(fields) == 3 and fields[2] == module:
+            return int(fields[1])
+    raise ValueError("{} was not imported".format(module))
+
+
+@pytest.mark.parametrize(
+    "module", ["cheddar", "cheddar.utils", "cheddar.cli", "cheddar.library"]
+)
+def test_import(benchmark, module):
+    times = []
+    benchmark.pedantic(lambda: times.append(import_time(module)), rounds=5)
+    benchmark.extra_info["import_time"] = min(times)
+    if module in BUDGETS:
+        assert min(times) < BUDGETS[module]
@@ -0,0 +1,119 @@
+import datetime
+import shutil
+import tracemalloc
+
+import pytest
+
+import cheddar
+
+from generate import START
+
+requires_exiftool = pytest.mark.skipif(
+    shutil.which("exiftool") is None, reason="exiftool is not installed"
+)
+
+
+def test_scan(benchmark, library_directory):
+    media = benchmark(
+        lambda: list(cheddar.Library(library_directory).iter_media())
+    )
+    assert len(media) > 0
+
+
+def test_load_tags(benchmark, library_directory):
+    # the datetimes and cameras, read in-process (see cheddar.fastread)
+    def load():
+        library = cheddar.Library(library_directory)
+        library.load_tags()
+        return library
+
+    library = benchmark(load)
+    assert all(m._tags is not None for m in library.media)
+
+
+@requires_exiftool
+def test_load_tags_exiftool(benchmark, library_directory):
+    def load():
+        cheddar.fastread.ENABLED = False
+        try:
+            library = cheddar.Library(library_directory)
+            library.load_tags()
+        finally:
+            cheddar.fastread.ENABLED = True
+        return library
+
+    benchmark.pedantic(load, rounds=3)
+
+
+@requires_exiftool
+def test_load_metadata(benchmark, library_directory):
+    def load():
+        library = cheddar.Library(library_directory)
+        library.load_metadata()
+        return library
+
+    benchmark.pedantic(load, rounds=3)
+
+
+def test_plan_rename_by_date(benchmark, library_directory):
+    def plan():
+        return cheddar.Library(library_directory).plan_rename_by_date()
+
+    assert len(benchmark(plan)) > 0
+
+
+def test_rename_content_by_date(benchmark, library_copy):
+    def setup():
+        return (cheddar.Library(library_copy()),), {}
+
+    def rename(library):
+        library.rename_content_by_date(verbose=False)
+
+    benchmark.pedantic(rename, setup=setup, rounds=3)
+
+
+def test_media_by_camera(benchmark, library_directory):
+    library = cheddar.Library(library_directory)
+    library.load_tags()
+
+    def camera():
+        library._camera_index = None
+        return library.media_by_camera("canon")
+
+    assert len(benchmark(camera)) > 0
+
+
+def test_query(benchmark, library_directory):
+    library = cheddar.Library(library_directory)
+    library.load_tags()
+    start = START + datetime.timedelta(days=1)
+    end = START + datetime.timedelta(days=8)
+    # the index is built once, only the queries are timed
+    library.query()
+
+    def query():
+        return library.query(start=start, end=end, camera="canon")
+
+    assert len(benchmark(query)) > 0
+
+
+@pytest.mark.parametrize("kind", ["media", "records"])
+def test_memory(benchmark, library_directory, kind):
+    # peak memory of holding the datetimes and cameras of the library
+    def load():
+        tracemalloc.start()
+        try:
+            library = cheddar.Library(library_directory)
+            if kind == "media":
+                library.load_tags()
+                items = library.media
+            else:
+                items = library.records()
+            current, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+        benchmark.extra_info["memory"] = current
+        benchmark.extra_info["peak_memory"] = peak
+        return items
+
+    assert len(benchmark.pedantic(load, rounds=1)) > 0
@@ -2,11 +2,44 @@ from __future__ import print_function
 from __future__ import absolute_import
 from __future__ import unicode_literals
 
-from . import utils
-from .media import Media
-from .library import Library
+import importlib
 
 __version__ = u"0.0.1"
 __author__ = u"Lindsey Heagy"
 __license__ = u"MIT"
 __copyright__ = u"Copyright 2017 Lindsey Heagy"
+
+# the submodules (and the classes below) are imported the first time they
+# are used (PEP 562), so that importing cheddar is cheap, e.g. for scripts
+# that only need cheddar.utils
+SUBMODULES = [
+    "fastread", "utils", "pool", "aio", "cache", "plan", "duplicates",
+    "similarity", "thumbnails", "index", "record", "watch", "media",
+    "library", "collection", "table", "cli",
+]
+
+CLASSES = {
+    "Media": "media",
+    "Library": "library",
+    "LibraryCollection": "collection",
+}
+
+__all__ = SUBMODULES + sorted(CLASSES)
+
+
+def __getattr__(name):
+    if name in CLASSES:
+        module = importlib.import_module("." + CLASSES[name], __name__)
+        value = getattr(module, name)
+    elif name in SUBMODULES:
+        value = importlib.import_module("." + name, __name__)
+    else:
+        raise AttributeError(
+            "module {} has no attribute {}".format(__name__, name)
+        )
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
@@ -0,0 +1,286 @@
+import asyncio
+import contextlib
+import json
+import os
+import weakref
+
+from .pool import BLOCK_SIZE, DEFAULT_POOL_SIZE, SENTINEL, _match_source_files
+
+DEFAULT_EXECUTABLE = "exiftool"
+
+# same output format as the threaded pool, so that both can share the
+# directory caches
+COMMON_ARGS = ["-G", "-n"]
+
+
+class AsyncExifTool(object):
+    """
+    exiftool process started with ``-stay_open`` and driven over asyncio
+    pipes, so that waiting for its output does not block the event loop
+
+    .. code:: python
+
+        et = AsyncExifTool()
+        await et.start()
+        metadata = await et.execute_json('./IMG_001.jpg')
+        await et.terminate()
+
+    :param str executable: path to the exiftool executable
+    """
+
+    def __init__(self, executable=None):
+        self.executable = executable or DEFAULT_EXECUTABLE
+        self._process = None
+
+    @property
+    def running(self):
+        """
+        whether the exiftool process is running
+
+        :rtype: bool
+        :return: True if the process can serve requests
+        """
+        return self._process is not None and self._process.returncode is None
+
+    async def start(self):
+        """
+        Start the exiftool process
+        """
+        self._process = await asyncio.create_subprocess_exec(
+            self.executable, "-stay_open", "True", "-@", "-",
+            "-common_args", *COMMON_ARGS,
+            stdin=asyncio.subprocess.PIPE,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.DEVNULL
+        )
+
+    async def execute(self, *params):
+        """
+        Run exiftool with the given parameters
+
+        :rtype: bytes
+        :return: output of exiftool
+        """
+        if not self.running:
+            raise ValueError("ExifTool instance not running.")
+
+        params = [os.fsencode(p) for p in params]
+        self._process.stdin.write(b"\n".join(params + [b"-execute\n"]))
+        await self._process.stdin.drain()
+
+        output = b""
+        while not output[-32:].strip().endswith(SENTINEL):
+            chunk = await self._process.stdout.read(BLOCK_SIZE)
+            if not chunk:
+                raise IOError("exiftool process exited unexpectedly")
+            output += chunk
+        return output.strip()[:-len(SENTINEL)]
+
+    async def execute_json(self, *params):
+        """
+        Run exiftool with the given parameters and parse the JSON output
+
+        :rtype: list
+        :return: list of dictionaries, one per file
+        """
+        output = await self.execute("-j", *params)
+        try:
+            output = output.decode("utf-8")
+        except UnicodeDecodeError:
+            output = output.decode("latin-1")
+        # exiftool prints nothing when none of the files could be read
+        return json.loads(output) if output.strip() else []
+
+    async def terminate(self):
+        """
+        Stop the exiftool process
+        """
+        if not self.running:
+            return
+        try:
+            self._process.stdin.write(b"-stay_open\nFalse\n")
+            await self._process.stdin.drain()
+            await asyncio.wait_for(self._process.wait(), 5)
+        except (OSError, asyncio.TimeoutError):
+            self._process.kill()
+            await self._process.wait()
+
+
+class AsyncExifToolPool(object):
+    """
+    Pool of :class:`AsyncExifTool` processes for one event loop. The pool
+    size bounds the number of concurrent exiftool requests, the others wait
+    for a process to be free without blocking the loop.
+
+    .. code:: python
+
+        pool = AsyncExifToolPool(size=2)
+        metadata = await pool.get_metadata_batch(filepaths)
+        await pool.shutdown()
+
+    :param int size: maximum number of exiftool processes
+    :param str executable: path to the exiftool executable
+    """
+
+    def __init__(self, size=None, executable=None):
+        if size is None:
+            size = DEFAULT_POOL_SIZE
+        assert size > 0, "Pool size must be positive, not {}".format(size)
+
+        self.size = size
+        self.executable = executable
+
+        self._idle = []
+        self._semaphore = None
+
+    async def _acquire(self):
+        # created here, the semaphore belongs to the loop using the pool
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.size)
+        await self._semaphore.acquire()
+
+        try:
+            while self._idle:
+                worker = self._idle.pop()
+                if worker.running:
+                    return worker
+            worker = AsyncExifTool(self.executable)
+            await worker.start()
+            return worker
+        except BaseException:
+            self._semaphore.release()
+            raise
+
+    @contextlib.asynccontextmanager
+    async def worker(self):
+        """
+        Borrow an exiftool process from the pool
+
+        .. code:: python
+
+            async with pool.worker() as et:
+                metadata = await et.execute_json('./IMG_001.jpg')
+
+        :rtype: cheddar.aio.AsyncExifTool
+        :return: a running exiftool process
+        """
+        worker = await self._acquire()
+        try:
+            yield worker
+        except BaseException:
+            # the output of an interrupted request (e.g. a cancelled task)
+            # would be read by the next one, so the process is not reused
+            await worker.terminate()
+            raise
+        else:
+            self._idle.append(worker)
+        finally:
+            self._semaphore.release()
+
+    async def execute_json(self, *params):
+        """
+        Run exiftool with the given parameters and parse the JSON output.
+        If the exiftool process crashes, the request is retried once on a
+        fresh process.
+
+        :rtype: list
+        :return: list of dictionaries, one per file
+        """
+        for attempt in range(2):
+            try:
+                async with self.worker() as et:
+                    return await et.execute_json(*params)
+            except (OSError, IOError):
+                if attempt == 1:
+                    raise
+
+    async def get_metadata(self, filepath):
+        """
+        Get all of the metadata for a single file
+
+        :param str filepath: path to the file
+        :rtype: dict
+        :return: metadata
+        """
+        return (await self.execute_json(filepath))[0]
+
+    async def get_metadata_batch(self, filepaths):
+        """
+        Get all of the metadata for many files with a single exiftool call
+
+        :param list filepaths: paths to the files
+        :rtype: list
+        :return: metadata dictionaries, in the same order as the filepaths
+        """
+        filepaths = list(filepaths)
+        if len(filepaths) == 0:
+            return []
+        return _match_source_files(
+            filepaths, await self.execute_json(*filepaths)
+        )
+
+    async def shutdown(self):
+        """
+        Stop all of the idle exiftool processes
+        """
+        while self._idle:
+            await self._idle.pop().terminate()
+
+
+_pools = weakref.WeakKeyDictionary()
+_settings = {"size": None, "executable": None}
+
+
+def get_pool():
+    """
+    Get the exiftool pool of the running event loop, creating it if
+    necessary
+
+    :rtype: cheddar.aio.AsyncExifToolPool
+    :return: the pool of the running loop
+    """
+    loop = asyncio.get_running_loop()
+    if loop not in _pools:
+        _pools[loop] = AsyncExifToolPool(**_settings)
+    return _pools[loop]
+
+
+async def configure(size=None, executable=None):
+    """
+    Configure the exiftool pools used by cheddar's asyncio API. Idle
+    processes of the pool of the running loop are stopped.
+
+    .. code:: python
+
+        await cheddar.aio.configure(size=8)
+
+    :param int size: maximum number of exiftool processes per event loop
+    :param str executable: path to the exiftool executable
+    """
+    _settings.update(size=size, executable=executable)
+    loop = asyncio.get_running_loop()
+    if loop in _pools:
+        await _pools.pop(loop).shutdown()
+
+
+async def get_metadata(filepath):
+    """
+    Get Exchangeable image file format information from a file, without
+    blocking the event loop
+
+    .. code:: python
+
+        metadata = await get_metadata('./IMG_001.jpg')
+    """
+    return await get_pool().get_metadata(filepath)
+
+
+async def get_metadata_batch(filepaths):
+    """
+    Get Exchangeable image file format information from many files with a
+    single exiftool call, without blocking the event loop
+
+    The returned list is in the same order as the filepaths, files that
+    exiftool could not read are ``None``.
+    """
+    return await get_pool().get_metadata_batch(filepaths)
@@ -0,0 +1,387 @@
+import json
+import os
+import sqlite3
+import threading
+
+from . import utils
+
+SAYCHEESEINFO = '.cheddar'
+
+# set to False to never read or write the per-directory cache files
+ENABLED = True
+
+# up to this many files are looked up by name, more read the whole table
+LOOKUP_SIZE = 500
+
+# columns of each table, besides the name, size and mtime_ns of the file
+TABLES = {
+    "metadata": ["metadata TEXT"],
+    "hashes": ["partial TEXT", "full TEXT"],
+    "phash": ["phash TEXT"],
+    # some of the metadata, and the tags it was extracted for
+    "tags": ["tags TEXT", "metadata TEXT"],
+}
+
+
+class LibraryCache(object):
+    """
+    Per-directory cache of the information cheddar extracts from media
+    files. It is stored as a SQLite database in a ``.cheddar`` file in the
+    directory and every entry is keyed by the file name, size and
+    modification time (in ns), so an entry is ignored as soon as the file
+    changes.
+
+    .. code:: python
+
+        cache = LibraryCache('./banff')
+        metadata = cache.get_metadata('rundle.png', size, mtime_ns)
+
+    :param str directory: directory containing the media
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+        self.filepath = os.path.join(directory, SAYCHEESEINFO)
+
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(
+            self.filepath, check_same_thread=False
+        )
+        with self._connection:
+            for table, columns in TABLES.items():
+                self._connection.execute(
+                    "CREATE TABLE IF NOT EXISTS {} ("
+                    "name TEXT PRIMARY KEY, size INTEGER, mtime_ns INTEGER, "
+                    "{})".format(table, ", ".join(columns))
+                )
+            self._connection.execute(
+                "CREATE TABLE IF NOT EXISTS blobs "
+                "(key TEXT PRIMARY KEY, value TEXT)"
+            )
+
+    def _get(self, table, name, size, mtime_ns):
+        try:
+            with self._lock:
+                row = self._connection.execute(
+                    "SELECT * FROM {} "
+                    "WHERE name = ? AND size = ? AND mtime_ns = ?".format(
+                        table
+                    ),
+                    (name, size, mtime_ns)
+                ).fetchone()
+        except sqlite3.Error:
+            # e.g. the database is locked by another process, which is a
+            # cache miss like any other
+            return None
+        return None if row is None else row[3:]
+
+    def _get_many(self, table, keys):
+        wanted = dict(
+            (name, (size, mtime_ns)) for name, size, mtime_ns in keys
+        )
+        names = list(wanted)
+        try:
+            with self._lock:
+                if len(names) > LOOKUP_SIZE:
+                    rows = self._connection.execute(
+                        "SELECT * FROM {}".format(table)
+                    ).fetchall()
+                else:
+                    # a few files of a large directory, e.g. a batch of them
+                    rows = self._connection.execute(
+                        "SELECT * FROM {} WHERE name IN ({})".format(
+                            table, ", ".join(["?"] * len(names))
+                        ),
+                        names
+                    ).fetchall()
+        except sqlite3.Error:
+            return {}
+        return dict(
+            (row[0], row[3:]) for row in rows
+            if wanted.get(row[0]) == tuple(row[1:3])
+        )
+
+    def _set_many(self, table, rows):
+        rows = [tuple(row) for row in rows]
+        if len(rows) == 0:
+            return
+        try:
+            with self._lock, self._connection:
+                self._connection.executemany(
+                    "INSERT OR REPLACE INTO {} VALUES ({})".format(
+                        table, ", ".join(["?"] * len(rows[0]))
+                    ),
+                    rows
+                )
+        except sqlite3.Error:
+            # the cache is only an optimization, e.g. the directory may have
+            # become read-only
+            pass
+
+    def _fix_paths(self, name, metadata):
+        # the directory (or the file) may have been renamed since the
+        # metadata was extracted
+        metadata[u"SourceFile"] = os.path.join(self.directory, name)
+        if u"File:FileName" in metadata:
+            metadata[u"File:FileName"] = name
+        if u"File:Directory" in metadata:
+            metadata[u"File:Directory"] = self.directory
+        return metadata
+
+    def get_metadata(self, name, size, mtime_ns):
+        """
+        Get the cached metadata of a file
+
+        :param str name: filename (excluding path)
+        :param int size: file size in bytes
+        :param int mtime_ns: modification time in nanoseconds
+        :rtype: dict
+        :return: metadata, None if there is no up-to-date entry
+        """
+        row = self._get("metadata", name, size, mtime_ns)
+        if row is None:
+            return None
+        return self._fix_paths(name, json.loads(row[0]))
+
+    def get_metadata_many(self, keys):
+        """
+        Get the cached metadata of many files
+
+        :param list keys: (name, size, mtime_ns) of each file
+        :rtype: dict
+        :return: metadata of the files that have an up-to-date entry, keyed
+            by name
+        """
+        return dict(
+            (name, self._fix_paths(name, json.loads(row[0])))
+            for name, row in self._get_many("metadata", keys).items()
+        )
+
+    def set_metadata(self, name, size, mtime_ns, metadata):
+        """
+        Store the metadata of a file
+
+        :param str name: filename (excluding path)
+        :param int size: file size in bytes
+        :param int mtime_ns: modification time in nanoseconds
+        :param dict metadata: metadata
+        """
+        self.set_metadata_many([(name, size, mtime_ns, metadata)])
+
+    def set_metadata_many(self, entries):
+        """
+        Store the metadata of many files in a single transaction
+
+        :param list entries: (name, size, mtime_ns, metadata) of each file
+        """
+        self._set_many("metadata", [
+            (name, size, mtime_ns, json.dumps(metadata))
+            for name, size, mtime_ns, metadata in entries
+        ])
+
+    def get_tags_many(self, keys, tags):
+        """
+        Get the cached metadata of many files, for some tags only. Entries
+        with all of the metadata are used as well.
+
+        :param list keys: (name, size, mtime_ns) of each file
+        :param list tags: exiftool tags
+        :rtype: dict
+        :return: metadata of the files that have an up-to-date entry with
+            all of the tags, keyed by name
+        """
+        tags = set(tags)
+        found = dict(
+            (name, self._fix_paths(name, json.loads(row[1])))
+            for name, row in self._get_many("tags", keys).items()
+            if tags <= set(json.loads(row[0]))
+        )
+        missing = [key for key in keys if key[0] not in found]
+        if len(missing) > 0:
+            for name, metadata in self.get_metadata_many(missing).items():
+                found[name] = utils.select_tags(metadata, tags)
+        return found
+
+    def set_tags_many(self, entries, tags):
+        """
+        Store some of the metadata of many files in a single transaction
+
+        :param list entries: (name, size, mtime_ns, metadata) of each file
+        :param list tags: exiftool tags the metadata was extracted for
+        """
+        tags = json.dumps(sorted(tags))
+        self._set_many("tags", [
+            (name, size, mtime_ns, tags, json.dumps(metadata))
+            for name, size, mtime_ns, metadata in entries
+        ])
+
+    def get_hashes_many(self, keys):
+        """
+        Get the cached content hashes of many files
+
+        :param list keys: (name, size, mtime_ns) of each file
+        :rtype: dict
+        :return: (partial hash, full hash) of the files that have an
+            up-to-date entry, keyed by name. A hash that was not computed
+            yet is None.
+        """
+        return self._get_many("hashes", keys)
+
+    def set_hashes_many(self, entries):
+        """
+        Store the content hashes of many files in a single transaction
+
+        :param list entries: (name, size, mtime_ns, partial hash, full hash)
+            of each file
+        """
+        self._set_many("hashes", entries)
+
+    def get_phash(self, name, size, mtime_ns):
+        """
+        Get the cached perceptual hash of an image
+
+        :param str name: filename (excluding path)
+        :param int size: file size in bytes
+        :param int mtime_ns: modification time in nanoseconds
+        :rtype: int
+        :return: perceptual hash, None if there is no up-to-date entry
+        """
+        row = self._get("phash", name, size, mtime_ns)
+        return None if row is None else int(row[0], 16)
+
+    def set_phash_many(self, entries):
+        """
+        Store the perceptual hashes of many images in a single transaction
+
+        :param list entries: (name, size, mtime_ns, perceptual hash) of each
+            image
+        """
+        # stored as text, the hashes do not fit in a signed SQLite integer
+        self._set_many("phash", [
+            (name, size, mtime_ns, "{:x}".format(value))
+            for name, size, mtime_ns, value in entries
+        ])
+
+    def get_blob(self, key):
+        """
+        Get a value stored for the whole directory (e.g. an index of its
+        media)
+
+        :param str key: key of the value
+        :rtype: str
+        :return: the value, None if it was never stored
+        """
+        try:
+            with self._lock:
+                row = self._connection.execute(
+                    "SELECT value FROM blobs WHERE key = ?", (key,)
+                ).fetchone()
+        except sqlite3.Error:
+            return None
+        return None if row is None else row[0]
+
+    def set_blob(self, key, value):
+        """
+        Store a value for the whole directory
+
+        :param str key: key of the value
+        :param str value: the value
+        """
+        try:
+            with self._lock, self._connection:
+                self._connection.execute(
+                    "INSERT OR REPLACE INTO blobs VALUES (?, ?)", (key, value)
+                )
+        except sqlite3.Error:
+            pass
+
+    def rename(self, name, newname):
+        """
+        Move the entries of a file that has been renamed
+
+        :param str name: old filename (excluding path)
+        :param str newname: new filename (excluding path)
+        """
+        self.rename_many([(name, newname)])
+
+    def rename_many(self, names):
+        """
+        Move the entries of many renamed files in a single transaction
+
+        :param list names: (old filename, new filename) of each rename, in
+            the order the files were renamed
+        """
+        try:
+            with self._lock, self._connection:
+                for name, newname in names:
+                    for table in TABLES:
+                        self._connection.execute(
+                            "DELETE FROM {} WHERE name = ?".format(table),
+                            (newname,)
+                        )
+                        self._connection.execute(
+                            "UPDATE {} SET name = ? WHERE name = ?".format(
+                                table
+                            ),
+                            (newname, name)
+                        )
+        except sqlite3.Error:
+            pass
+
+    def close(self):
+        """
+        Close the database
+        """
+        with self._lock:
+            self._connection.close()
+
+
+_caches = {}
+_caches_lock = threading.Lock()
+
+
+def get_cache(directory, create=True):
+    """
+    Get the cache of a directory, creating it if necessary
+
+    :param str directory: directory containing the media
+    :param bool create: create the cache file if it does not exist yet
+    :rtype: cheddar.cache.LibraryCache
+    :return: the cache, None if caching is disabled or the directory can not
+        hold a cache (e.g. it is read-only)
+    """
+    if not ENABLED:
+        return None
+
+    if not create and not os.path.isfile(
+        os.path.join(directory, SAYCHEESEINFO)
+    ):
+        return None
+
+    with _caches_lock:
+        library_cache = _caches.get(directory)
+        if library_cache is not None and not os.path.isfile(
+            library_cache.filepath
+        ):
+            # the cache file was removed (e.g. along with the directory)
+            library_cache.close()
+            del _caches[directory]
+
+        if directory not in _caches:
+            try:
+                _caches[directory] = LibraryCache(directory)
+            except sqlite3.Error:
+                _caches[directory] = None
+        return _caches[directory]
+
+
+def close_cache(directory):
+    """
+    Close the cache of a directory (e.g. before the directory is moved)
+
+    :param str directory: directory containing the media
+    """
+    with _caches_lock:
+        cache = _caches.pop(directory, None)
+    if cache is not None:
+        cache.close()
@@ -0,0 +1,284 @@
+"""
+The :code:`cheddar` command
+
+.. code::
+
+    cheddar scan --jobs 8 /media/disk1/2017 /media/disk2/2018
+    cheddar rename-by-date --dry-run ~/Pictures/banff
+    cheddar dedupe -r ~/Pictures
+    cheddar stats -r ~/Pictures
+
+Each command takes one or more library directories and writes JSON lines
+to the standard output: a line per result, with an "event" field telling
+what it is, and a "progress" line once each library is done. The libraries
+are handled concurrently, one device at a time (see
+:class:`cheddar.collection.LibraryCollection`).
+
+The rest of cheddar (and exiftool) is only imported once a command runs,
+so that the command starts quickly.
+"""
+import argparse
+import json
+import os
+import sys
+import threading
+
+
+class JsonLines(object):
+    """
+    Thread-safe writer of JSON lines, flushed after each line so that they
+    can be streamed to another program
+
+    :param file stream: file to write to (defaults to the standard output)
+    """
+
+    def __init__(self, stream=None):
+        self.stream = sys.stdout if stream is None else stream
+        self._lock = threading.Lock()
+
+    def write(self, event, **fields):
+        """
+        Write a line
+
+        :param str event: kind of line
+        :param fields: other fields of the line
+        """
+        fields["event"] = event
+        line = json.dumps(fields, sort_keys=True, default=str)
+        with self._lock:
+            self.stream.write(line + "\n")
+            self.stream.flush()
+
+
+def _datetime(media):
+    # isoformat of the datetime of a media or a record, None if it has none
+    from .media import MissingDatetimeError
+
+    try:
+        return media.datetime.isoformat()
+    except MissingDatetimeError:
+        return None
+
+
+def _collection(args):
+    from .collection import LibraryCollection
+    from . import pool
+
+    if args.jobs is not None:
+        pool.configure(size=args.jobs)
+    return LibraryCollection(
+        args.directories, recursive=args.recursive, include=args.include,
+        exclude=args.exclude
+    )
+
+
+def _run(collection, output, function):
+    # call a function on each library and report the progress, returns the
+    # exit status
+    done = []
+    failed = []
+
+    def run(library):
+        try:
+            function(library)
+        except Exception as error:
+            failed.append(library)
+            output.write(
+                "error", directory=library.directory, message=str(error)
+            )
+        done.append(library)
+        output.write(
+            "progress", directory=library.directory, done=len(done),
+            total=len(collection.libraries)
+        )
+
+    collection.map(run)
+    return 1 if failed else 0
+
+
+def scan(args, output):
+    """
+    Write the datetime and camera of each media
+    """
+    def scan_library(library):
+        for record in library.records(workers=args.jobs):
+            output.write(
+                "media", path=record.filepath, size=record.size,
+                datetime=_datetime(record), camera_make=record.camera_make,
+                camera_model=record.camera_model
+            )
+
+    return _run(_collection(args), output, scan_library)
+
+
+def rename_by_date(args, output):
+    """
+    Rename the media by the date they were taken
+    """
+    def rename(library):
+        plan = library.plan_rename_by_date(
+            filename_format=args.format, workers=args.jobs
+        )
+        if args.dry_run:
+            for source, destination in plan.moves:
+                output.write(
+                    "rename", source=source, destination=destination,
+                    applied=False
+                )
+            return
+
+        from .plan import JOURNAL
+
+        # each rename is written as soon as it is done
+        plan.apply(
+            journal=os.path.join(library.directory, JOURNAL), verbose=False,
+            callback=lambda source, destination: output.write(
+                "rename", source=source, destination=destination,
+                applied=True
+            )
+        )
+
+    return _run(_collection(args), output, rename)
+
+
+def dedupe(args, output):
+    """
+    Write the groups of media with identical content
+    """
+    from .duplicates import find_duplicates
+
+    collection = _collection(args)
+    scanned = []
+
+    def scan_library(library):
+        library.media
+        scanned.append(library)
+
+    # the libraries are listed one device at a time, then the duplicates
+    # are found across the libraries that could be listed
+    status = _run(collection, output, scan_library)
+    libraries = [
+        library for library in collection.libraries if library in scanned
+    ]
+    workers = 4 if args.jobs is None else args.jobs
+    try:
+        for group in find_duplicates(libraries, workers=workers):
+            output.write(
+                "duplicates", paths=[m.filepath for m in group],
+                size=group[0].stat.st_size
+            )
+    except Exception as error:
+        output.write("error", message=str(error))
+        return 1
+    return status
+
+
+def stats(args, output):
+    """
+    Write the number of media, their size, time span and cameras, for each
+    library
+    """
+    from .library import IMAGE_EXTENSION
+
+    def library_stats(library):
+        records = library.records(workers=args.jobs)
+        datetimes = [d for d in map(_datetime, records) if d is not None]
+        cameras = {}
+        for record in records:
+            camera = "{} {}".format(record.camera_make, record.camera_model)
+            cameras[camera] = cameras.get(camera, 0) + 1
+        images = [
+            record for record in records
+            if record.file_extension.lower() in IMAGE_EXTENSION
+        ]
+        output.write(
+            "stats", directory=library.directory, media=len(records),
+            images=len(images), videos=len(records) - len(images),
+            size=sum(record.size for record in records),
+            first=min(datetimes) if datetimes else None,
+            last=max(datetimes) if datetimes else None,
+            cameras=cameras
+        )
+
+    return _run(_collection(args), output, library_stats)
+
+
+COMMANDS = {
+    "scan": scan,
+    "rename-by-date": rename_by_date,
+    "dedupe": dedupe,
+    "stats": stats,
+}
+
+
+def get_parser():
+    """
+    Parser of the command line arguments
+
+    :rtype: argparse.ArgumentParser
+    :return: parser of the cheddar command
+    """
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument(
+        "directories", nargs="+", metavar="directory",
+        help="library directories"
+    )
+    common.add_argument(
+        "-j", "--jobs", type=int, default=None,
+        help="number of exiftool processes and files handled concurrently"
+    )
+    common.add_argument(
+        "-r", "--recursive", action="store_true",
+        help="include the media in the subdirectories"
+    )
+    common.add_argument(
+        "--include", action="append", default=[], metavar="PATTERN",
+        help="glob pattern of the media to include"
+    )
+    common.add_argument(
+        "--exclude", action="append", default=[], metavar="PATTERN",
+        help="glob pattern of the media and subdirectories to exclude"
+    )
+
+    parser = argparse.ArgumentParser(
+        prog="cheddar", description="manage libraries of photos and videos"
+    )
+    commands = parser.add_subparsers(dest="command", metavar="command")
+    commands.required = True
+
+    for name, command in sorted(COMMANDS.items()):
+        subparser = commands.add_parser(
+            name, parents=[common], help=command.__doc__.strip()
+        )
+        if name == "rename-by-date":
+            subparser.add_argument(
+                "--format", default="%Y-%m-%d %H.%M.%S",
+                help="strftime format of the new names"
+            )
+            subparser.add_argument(
+                "-n", "--dry-run", action="store_true",
+                help="only write the planned renames"
+            )
+    return parser
+
+
+def main(argv=None, stream=None):
+    """
+    Run the cheddar command
+
+    :param list argv: command line arguments (defaults to sys.argv)
+    :param file stream: output of the command (defaults to the standard
+        output)
+    :rtype: int
+    :return: exit status
+    """
+    parser = get_parser()
+    args = parser.parse_args(argv)
+    for directory in args.directories:
+        if not os.path.isdir(directory):
+            parser.error("{} is not a directory".format(directory))
+    return COMMANDS[args.command](args, JsonLines(stream))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,268 @@
+import properties
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+from .library import (
+    IMAGE_EXTENSION, METADATA_BATCH_SIZE, VIDEO_EXTENSION, Library
+)
+from . import utils
+
+
+def device_of(directory):
+    """
+    Physical device a directory is stored on. On Linux, the partitions of a
+    disk are mapped to the disk (see /sys/dev/block), elsewhere each file
+    system is a device.
+
+    :param str directory: path of the directory
+    :rtype: str
+    :return: name of the device
+    """
+    st_dev = os.stat(directory).st_dev
+    sysfs = "/sys/dev/block/{}:{}".format(os.major(st_dev), os.minor(st_dev))
+    if os.path.exists(os.path.join(sysfs, "partition")):
+        return os.path.basename(os.path.dirname(os.path.realpath(sysfs)))
+    if os.path.exists(sysfs):
+        return os.path.basename(os.path.realpath(sysfs))
+    return "{}:{}".format(os.major(st_dev), os.minor(st_dev))
+
+
+class LibraryCollection(properties.HasProperties):
+    """
+    Many libraries handled as one, e.g. the event folders of an archive
+    spread over several disks
+
+    .. code:: python
+
+        collection = LibraryCollection(
+            ["/media/disk1/2016", "/media/disk2/2017", "/media/disk2/2018"]
+        )
+        collection.load_tags()
+        collection.rename_content_by_date()
+
+    The libraries are scanned and their metadata is loaded concurrently,
+    with one worker per physical device (see :func:`device_of`): the
+    libraries on a device are handled one after the other, so a spinning
+    disk is not read in several places at once.
+
+    :param list libraries: cheddar Library objects, or directories
+    :param bool recursive: include the media in the subdirectories of the
+        directories
+    :param list include: glob patterns of the media to include in the
+        libraries of the directories
+    :param list exclude: glob patterns of the media and subdirectories to
+        exclude from the libraries of the directories
+    """
+
+    libraries = properties.List(
+        "libraries in the collection",
+        properties.Instance("library", Library)
+    )
+
+    def __init__(self, libraries, recursive=False, include=None, exclude=None):
+        super(LibraryCollection, self).__init__()
+        self.libraries = [
+            Library(
+                library, recursive=recursive, include=include,
+                exclude=exclude
+            ) if isinstance(library, str) else library
+            for library in libraries
+        ]
+
+    @properties.validator('libraries')
+    def _ensure_unique(self, change):
+        directories = [library.directory for library in change['value']]
+        assert len(set(directories)) == len(directories), (
+            "A directory can only be in a collection once"
+        )
+        self._devices = None
+
+    @property
+    def devices(self):
+        """
+        libraries of the collection, by physical device
+
+        :rtype: dict
+        :return: list of the libraries stored on each device
+        """
+        if getattr(self, '_devices', None) is None:
+            self._devices = {}
+            for library in self.libraries:
+                self._devices.setdefault(
+                    device_of(library.directory), []
+                ).append(library)
+        return self._devices
+
+    def map(self, function):
+        """
+        Call a function on each library of the collection, concurrently on
+        the devices and sequentially on the libraries of a device
+
+        .. code:: python
+
+            tables = collection.map(lambda library: library.to_table())
+
+        :param function function: function taking a cheddar Library object
+        :rtype: list
+        :return: result of the function for each library, in collection
+            order
+        """
+        results = dict()
+
+        def run(libraries):
+            for library in libraries:
+                results[id(library)] = function(library)
+
+        devices = list(self.devices.values())
+        with ThreadPoolExecutor(max_workers=max(1, len(devices))) as executor:
+            list(executor.map(run, devices))
+        return [results[id(library)] for library in self.libraries]
+
+    def scan(self):
+        """
+        List the media of the libraries that were not listed yet
+        """
+        self.map(lambda library: library.media)
+
+    @property
+    def media(self):
+        """
+        media objects in the libraries of the collection
+
+        :rtype: list
+        :return: list of :class:cheddar.Media items, library after library
+        """
+        self.scan()
+        return [m for library in self.libraries for m in library.media]
+
+    @property
+    def images(self):
+        """
+        media object for each of the images in the collection
+
+        :rtype: list
+        :return: list of :class:cheddar.Media items for each image
+        """
+        self.scan()
+        return [m for library in self.libraries for m in library.images]
+
+    @property
+    def videos(self):
+        """
+        media object for each of the videos in the collection
+
+        :rtype: list
+        :return: list of :class:cheddar.Media items for each video
+        """
+        self.scan()
+        return [m for library in self.libraries for m in library.videos]
+
+    def load_metadata(
+        self, batch_size=METADATA_BATCH_SIZE, workers_per_device=1
+    ):
+        """
+        Load the metadata of all of the media in the collection (see
+        :meth:`cheddar.Library.load_metadata`)
+
+        :param int batch_size: number of files per exiftool call
+        :param int workers_per_device: number of batches loaded concurrently
+            from each device
+        """
+        self.map(lambda library: library.load_metadata(
+            batch_size=batch_size, workers=workers_per_device
+        ))
+
+    def load_tags(self, batch_size=METADATA_BATCH_SIZE, workers_per_device=1):
+        """
+        Load the datetimes and cameras of all of the media in the collection
+        (see :meth:`cheddar.Library.load_tags`)
+
+        :param int batch_size: number of files per exiftool call
+        :param int workers_per_device: number of batches loaded concurrently
+            from each device
+        """
+        self.map(lambda library: library.load_tags(
+            batch_size=batch_size, workers=workers_per_device
+        ))
+
+    def media_by_camera(self, camera):
+        """
+        media objects taken with a camera (see
+        :meth:`cheddar.Library.media_by_camera`)
+
+        :param str camera: camera name
+        :rtype: list
+        :return: list of :class:cheddar.Media items, library after library
+        """
+        self.load_tags()
+        return [
+            m for library in self.libraries
+            for m in library.media_by_camera(camera)
+        ]
+
+    def open_images(self, **kwargs):
+        """
+        open the images in the collection. With :code:`thumbnails=True`,
+        their thumbnails are opened instead.
+        """
+        images = self.images
+
+        if "camera" in kwargs:
+            images = [
+                m for m in self.media_by_camera(kwargs.pop("camera"))
+                if m.file_extension.lower() in IMAGE_EXTENSION
+            ]
+
+        if kwargs.pop("thumbnails", False):
+            from . import thumbnails
+
+            utils.open_files([
+                f for f in thumbnails.build_thumbnails(images) if f is not None
+            ])
+        else:
+            utils.open_files([m.filepath for m in images])
+
+    def open_videos(self, **kwargs):
+        """
+        open the videos in the collection
+        """
+        videos = self.videos
+
+        if "camera" in kwargs:
+            videos = [
+                m for m in self.media_by_camera(kwargs.pop("camera"))
+                if m.file_extension.lower() in VIDEO_EXTENSION
+            ]
+
+        utils.open_files([m.filepath for m in videos])
+
+    def open(self, **kwargs):
+        """
+        open the images and the videos in the collection
+        """
+        self.open_images(**kwargs)
+        self.open_videos(**kwargs)
+
+    def rename_content_by_date(
+        self,
+        lowercase_extension=True,
+        timeshift=None,
+        filename_format="%Y-%m-%d %H.%M.%S",
+        verbose=True,
+        workers_per_device=1
+    ):
+        """
+        rename the content of each library in the collection by date (see
+        :meth:`cheddar.Library.rename_content_by_date`), with a journal in
+        each library directory
+
+        :param int workers_per_device: number of metadata batches loaded
+            concurrently from each device
+        """
+        self.map(lambda library: library.rename_content_by_date(
+            lowercase_extension=lowercase_extension,
+            timeshift=timeshift,
+            filename_format=filename_format,
+            verbose=verbose,
+            workers=workers_per_device
+        ))
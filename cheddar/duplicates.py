@@ -0,0 +1,173 @@
+import hashlib
+import mmap
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+from . import cache
+
+# size of the blocks at the start and end of a file used for the partial hash
+PARTIAL_BLOCK_SIZE = 64 * 1024
+
+
+def partial_hash(filepath):
+    """
+    Cheap hash of a file from its first and last blocks, used to tell most
+    files of the same size apart without reading them entirely
+
+    :param str filepath: path to the file
+    :rtype: str
+    :return: hex digest
+    """
+    digest = hashlib.sha1()
+    with open(filepath, "rb") as f:
+        digest.update(f.read(PARTIAL_BLOCK_SIZE))
+        f.seek(0, os.SEEK_END)
+        if f.tell() > PARTIAL_BLOCK_SIZE:
+            f.seek(max(f.tell() - PARTIAL_BLOCK_SIZE, PARTIAL_BLOCK_SIZE))
+            digest.update(f.read(PARTIAL_BLOCK_SIZE))
+    return digest.hexdigest()
+
+
+def full_hash(filepath):
+    """
+    Hash of the whole content of a file, read through a memory map
+
+    :param str filepath: path to the file
+    :rtype: str
+    :return: hex digest
+    """
+    digest = hashlib.sha256()
+    with open(filepath, "rb") as f:
+        if os.fstat(f.fileno()).st_size > 0:
+            mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            try:
+                digest.update(mapped)
+            finally:
+                mapped.close()
+    return digest.hexdigest()
+
+
+def _hashes(media, kind, workers):
+    """
+    partial (kind=0) or full (kind=1) hash of each media, read from the
+    directory caches when possible and stored there otherwise
+    """
+    by_directory = {}
+    for m in media:
+        by_directory.setdefault(m.directory, []).append(m)
+
+    hashes = {}
+    missing = []
+    cached_rows = {}
+    for directory, items in by_directory.items():
+        library_cache = cache.get_cache(directory)
+        cached = {}
+        if library_cache is not None:
+            cached = library_cache.get_hashes_many(
+                [_key(m) for m in items]
+            )
+        for m in items:
+            row = cached.get(m.name, (None, None))
+            cached_rows[m.filepath] = row
+            if row[kind] is None:
+                missing.append(m)
+            else:
+                hashes[m.filepath] = row[kind]
+
+    function = partial_hash if kind == 0 else full_hash
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        computed = list(
+            executor.map(function, [m.filepath for m in missing])
+        )
+
+    updates = {}
+    for m, value in zip(missing, computed):
+        hashes[m.filepath] = value
+        row = list(cached_rows[m.filepath])
+        row[kind] = value
+        updates.setdefault(m.directory, []).append(_key(m) + tuple(row))
+
+    for directory, rows in updates.items():
+        library_cache = cache.get_cache(directory)
+        if library_cache is not None:
+            library_cache.set_hashes_many(rows)
+
+    return hashes
+
+
+def content_hashes(media, workers=4):
+    """
+    Hash of the content of media files (see :func:`full_hash`), read from
+    the caches of their directories when the files did not change
+
+    :param list media: cheddar Media objects
+    :param int workers: number of files hashed concurrently
+    :rtype: dict
+    :return: hex digest of each media, keyed by filepath
+    """
+    return _hashes(media, 1, workers)
+
+
+def partial_hashes(media, workers=4):
+    """
+    Partial hash of media files (see :func:`partial_hash`), read from the
+    caches of their directories when the files did not change
+
+    :param list media: cheddar Media objects
+    :param int workers: number of files hashed concurrently
+    :rtype: dict
+    :return: hex digest of each media, keyed by filepath
+    """
+    return _hashes(media, 0, workers)
+
+
+def _key(media):
+    return (media.name, media.stat.st_size, media.stat.st_mtime_ns)
+
+
+def _split_groups(groups, hashes):
+    split = []
+    for group in groups:
+        by_hash = {}
+        for m in group:
+            by_hash.setdefault(hashes[m.filepath], []).append(m)
+        split.extend(g for g in by_hash.values() if len(g) > 1)
+    return split
+
+
+def find_duplicates(libraries, workers=4):
+    """
+    Find the media with identical content in one or more libraries
+
+    .. code:: python
+
+        for group in find_duplicates([library1, library2]):
+            print([m.filepath for m in group])
+
+    The media are grouped by file size first, then by a partial hash of the
+    start and end of the files, and only the files that still collide are
+    hashed entirely. The hashes are stored in the cache of each directory
+    (see :mod:`cheddar.cache`) so that files that did not change are not
+    read again.
+
+    :param list libraries: cheddar Library objects
+    :param int workers: number of files hashed concurrently
+    :rtype: list
+    :return: groups (lists) of duplicate cheddar Media objects
+    """
+    by_size = {}
+    seen = set()
+    for library in libraries:
+        for m in library.media:
+            if m.filepath in seen:
+                continue
+            seen.add(m.filepath)
+            by_size.setdefault(m.stat.st_size, []).append(m)
+
+    groups = [group for group in by_size.values() if len(group) > 1]
+
+    for kind in [0, 1]:
+        hashes = _hashes([m for group in groups for m in group], kind, workers)
+        groups = _split_groups(groups, hashes)
+
+    return groups
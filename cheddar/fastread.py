@@ -0,0 +1,364 @@
+import binascii
+import datetime
+import mmap
+import os
+import struct
+import zlib
+
+# set to False to always extract the tags with exiftool
+ENABLED = True
+
+DATETIME_ORIGINAL_TAG = u"EXIF:DateTimeOriginal"
+FILE_MODIFY_DATE_TAG = u"File:FileModifyDate"
+MAKE_TAG = u"EXIF:Make"
+MODEL_TAG = u"EXIF:Model"
+CREATE_DATE_TAG = u"QuickTime:CreateDate"
+
+# tags the reader extracts, as exiftool would with -G -n
+TAGS = [
+    DATETIME_ORIGINAL_TAG, FILE_MODIFY_DATE_TAG, MAKE_TAG, MODEL_TAG,
+    CREATE_DATE_TAG
+]
+
+# TIFF tag ids
+IFD0_TAGS = {0x010f: MAKE_TAG, 0x0110: MODEL_TAG}
+EXIF_IFD_POINTER = 0x8769
+EXIF_IFD_TAGS = {0x9003: DATETIME_ORIGINAL_TAG}
+ASCII = 2
+SHORT = 3
+LONG = 4
+IFD = 13
+
+# IFD0 orientation, and offset and length of the JPEG preview in IFD1
+ORIENTATION = 0x0112
+PREVIEW_OFFSET = 0x0201
+PREVIEW_LENGTH = 0x0202
+
+JPEG_SIGNATURE = b"\xff\xd8"
+PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+EXIF_HEADER = b"Exif\x00\x00"
+
+# MP4 times are in seconds since 1904
+QUICKTIME_EPOCH = datetime.datetime(1904, 1, 1)
+
+
+class FormatError(ValueError):
+    """
+    The file is not in a format the reader understands, or it is corrupt
+    """
+
+
+def supports(tags):
+    """
+    Whether the reader can extract all of some tags
+
+    :param list tags: exiftool tags
+    :rtype: bool
+    :return: True if the reader knows all of the tags
+    """
+    return ENABLED and set(tags) <= set(TAGS)
+
+
+def read_tags(filepath, tags=None):
+    """
+    Read the datetimes and camera of a JPEG, PNG or MP4 file without
+    exiftool. The file is memory-mapped and only the structures that hold
+    the tags are parsed: the EXIF APP1 segment of a JPEG, the eXIf chunk (or
+    a raw EXIF profile in a text chunk, compressed or not) of a PNG and the
+    ``mvhd`` box of an MP4.
+
+    .. code:: python
+
+        tags = read_tags('./IMG_001.jpg')
+
+    The values are formatted as exiftool formats them with ``-G -n``, and
+    ``File:FileModifyDate`` is included, so the datetime of a media is the
+    same whichever way its tags are read.
+
+    :param str filepath: path to the file
+    :param list tags: exiftool tags to return, defaults to all of
+        :data:`TAGS`
+    :rtype: dict
+    :return: tags of the file, None if it can not be read without exiftool
+    """
+    try:
+        with open(filepath, "rb") as f:
+            stat = os.fstat(f.fileno())
+            if stat.st_size == 0:
+                return None
+            data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            if data[:2] == JPEG_SIGNATURE:
+                found = _read_jpeg(data)
+            elif data[:8] == PNG_SIGNATURE:
+                found = _read_png(data)
+            elif data[4:8] == b"ftyp":
+                found = _read_mp4(data)
+            else:
+                return None
+        finally:
+            data.close()
+    except (EnvironmentError, ValueError, struct.error):
+        return None
+
+    found[FILE_MODIFY_DATE_TAG] = _file_modify_date(stat.st_mtime)
+    if tags is None:
+        tags = TAGS
+    selected = dict((tag, found[tag]) for tag in tags if tag in found)
+    selected[u"SourceFile"] = filepath
+    return selected
+
+
+def _file_modify_date(mtime):
+    # exiftool reports the modification time in local time, with its offset
+    value = datetime.datetime.fromtimestamp(int(mtime)).astimezone()
+    offset = value.strftime("%z")
+    return u"{}{}:{}".format(
+        value.strftime("%Y:%m:%d %H:%M:%S"), offset[:3], offset[3:]
+    )
+
+
+def read_exif_preview(filepath):
+    """
+    Read the preview image a camera embeds in the EXIF data of a JPEG (in
+    IFD1), without decoding the photo
+
+    :param str filepath: path to the JPEG file
+    :rtype: tuple
+    :return: (JPEG data of the preview, EXIF orientation of the photo),
+        None if there is no preview
+    """
+    try:
+        with open(filepath, "rb") as f:
+            if os.fstat(f.fileno()).st_size == 0:
+                return None
+            data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            if data[:2] != JPEG_SIGNATURE:
+                return None
+            exif = _jpeg_exif(data)
+        finally:
+            data.close()
+        if exif is None:
+            return None
+
+        endian = _tiff_endian(exif)
+        ifd0, ifd1 = read_ifd(exif, struct.unpack(endian + "I", exif[4:8])[0])
+        if ifd1 == 0:
+            return None
+        thumbnail, _ = read_ifd(exif, ifd1)
+    except (EnvironmentError, ValueError, struct.error):
+        return None
+
+    if PREVIEW_OFFSET not in thumbnail or PREVIEW_LENGTH not in thumbnail:
+        return None
+    start = thumbnail[PREVIEW_OFFSET]
+    preview = exif[start:start + thumbnail[PREVIEW_LENGTH]]
+    if preview[:2] != JPEG_SIGNATURE:
+        return None
+    return preview, ifd0.get(ORIENTATION, 1)
+
+
+def _read_jpeg(data):
+    exif = _jpeg_exif(data)
+    return {} if exif is None else read_tiff(exif)
+
+
+def _jpeg_exif(data):
+    # TIFF data of the EXIF APP1 segment, None if there is none
+    position = 2
+    while position + 2 <= len(data):
+        if data[position] != 0xff:
+            raise FormatError("Expected a JPEG marker at {}".format(position))
+        marker = data[position + 1]
+        if marker == 0xff:
+            # fill byte
+            position += 1
+            continue
+        if marker == 0xd8 or marker == 0x01 or 0xd0 <= marker <= 0xd7:
+            position += 2
+            continue
+        if marker == 0xda or marker == 0xd9:
+            # the image data starts, there are no more metadata segments
+            return None
+
+        length = struct.unpack(">H", data[position + 2:position + 4])[0]
+        segment = position + 4
+        if marker == 0xe1 and data[segment:segment + 6] == EXIF_HEADER:
+            return data[segment + 6:segment + length - 2]
+        position = segment + length - 2
+
+    raise FormatError("The JPEG file is truncated")
+
+
+def _read_png(data):
+    found = {}
+    position = 8
+    while position + 8 <= len(data):
+        length, kind = struct.unpack(">I4s", data[position:position + 8])
+        chunk = data[position + 8:position + 8 + length]
+        if kind == b"eXIf":
+            found.update(read_tiff(_strip_exif_header(chunk)))
+        elif kind in [b"tEXt", b"zTXt", b"iTXt"]:
+            if chunk.startswith(b"Raw profile type "):
+                found.update(_read_raw_profile(*_read_text(kind, chunk)))
+        elif kind == b"IEND":
+            return found
+        position += 12 + length
+
+    raise FormatError("The PNG file is truncated")
+
+
+def _read_text(kind, chunk):
+    # (keyword, text) of a tEXt, zTXt or iTXt chunk. The compressed text is
+    # inflated, so that the EXIF in it is never silently skipped
+    keyword, _, text = chunk.partition(b"\x00")
+    if kind == b"tEXt":
+        return keyword, text
+    if kind == b"zTXt":
+        compressed, method, text = True, text[:1], text[1:]
+    else:
+        compressed, method = text[:1] == b"\x01", text[1:2]
+        # skip the language tag and the translated keyword
+        text = text[2:].split(b"\x00", 2)[-1]
+    if not compressed:
+        return keyword, text
+    if method != b"\x00":
+        raise FormatError("Unknown compression of the {!r} chunk".format(kind))
+    try:
+        return keyword, zlib.decompress(text)
+    except zlib.error as error:
+        raise FormatError("Invalid {!r} chunk: {}".format(kind, error))
+
+
+def _read_raw_profile(keyword, text):
+    # ImageMagick stores EXIF in a text chunk, as "\nexif\n<length>\n<hex>"
+    if keyword not in [b"Raw profile type exif", b"Raw profile type APP1"]:
+        return {}
+    lines = text.strip().split(b"\n")
+    profile = binascii.unhexlify(b"".join(line.strip() for line in lines[2:]))
+    return read_tiff(_strip_exif_header(profile))
+
+
+def _strip_exif_header(data):
+    if data[:6] == EXIF_HEADER:
+        return data[6:]
+    return data
+
+
+def read_tiff(data):
+    """
+    Read the datetime and camera from the TIFF structure of EXIF data
+
+    :param bytes data: EXIF data, starting with the TIFF header
+    :rtype: dict
+    :return: tags found in the data
+    """
+    endian = _tiff_endian(data)
+    ifd0, _ = read_ifd(data, struct.unpack(endian + "I", data[4:8])[0])
+
+    found = {}
+    for tag, name in IFD0_TAGS.items():
+        if tag in ifd0:
+            found[name] = ifd0[tag]
+    if EXIF_IFD_POINTER in ifd0:
+        exif_ifd, _ = read_ifd(data, ifd0[EXIF_IFD_POINTER])
+        for tag, name in EXIF_IFD_TAGS.items():
+            if tag in exif_ifd:
+                found[name] = exif_ifd[tag]
+    return found
+
+
+def _tiff_endian(data):
+    if data[:2] == b"II":
+        endian = "<"
+    elif data[:2] == b"MM":
+        endian = ">"
+    else:
+        raise FormatError("Unknown TIFF byte order")
+    if struct.unpack(endian + "H", data[2:4])[0] != 42:
+        raise FormatError("Not a TIFF header")
+    return endian
+
+
+def read_ifd(data, offset):
+    """
+    Read the ASCII entries and single SHORT and LONG (or IFD pointer)
+    entries of an image file directory
+
+    :param bytes data: TIFF data
+    :param int offset: offset of the directory in the data
+    :rtype: tuple
+    :return: (entries keyed by tag id, offset of the next directory)
+    """
+    endian = _tiff_endian(data)
+    count = struct.unpack(endian + "H", data[offset:offset + 2])[0]
+    entries = {}
+    for i in range(count):
+        entry = offset + 2 + 12 * i
+        tag, kind, n = struct.unpack(endian + "HHI", data[entry:entry + 8])
+        if kind == ASCII:
+            if n <= 4:
+                value = data[entry + 8:entry + 8 + n]
+            else:
+                start = struct.unpack(
+                    endian + "I", data[entry + 8:entry + 12]
+                )[0]
+                value = data[start:start + n]
+            if len(value) < n:
+                raise FormatError("Tag {:#06x} is truncated".format(tag))
+            entries[tag] = (
+                value.split(b"\x00")[0].decode("utf-8", "replace").strip()
+            )
+        elif kind == SHORT and n == 1:
+            entries[tag] = struct.unpack(
+                endian + "H", data[entry + 8:entry + 10]
+            )[0]
+        elif kind in [LONG, IFD] and n == 1:
+            entries[tag] = struct.unpack(
+                endian + "I", data[entry + 8:entry + 12]
+            )[0]
+
+    end = offset + 2 + 12 * count
+    next_ifd = struct.unpack(endian + "I", data[end:end + 4])[0]
+    return entries, next_ifd
+
+
+def _read_mp4(data):
+    moov = _find_box(data, 0, len(data), b"moov")
+    if moov is None:
+        raise FormatError("The MP4 file has no moov box")
+    mvhd = _find_box(data, moov[0], moov[1], b"mvhd")
+    if mvhd is None:
+        raise FormatError("The MP4 file has no mvhd box")
+
+    start = mvhd[0]
+    if data[start] == 1:
+        seconds = struct.unpack(">Q", data[start + 4:start + 12])[0]
+    else:
+        seconds = struct.unpack(">I", data[start + 4:start + 8])[0]
+
+    if seconds == 0:
+        # not set by the camera
+        return {CREATE_DATE_TAG: u"0000:00:00 00:00:00"}
+    value = QUICKTIME_EPOCH + datetime.timedelta(seconds=seconds)
+    return {CREATE_DATE_TAG: value.strftime(u"%Y:%m:%d %H:%M:%S")}
+
+
+def _find_box(data, start, end, kind):
+    # (start, end) of the content of the first box of a kind
+    position = start
+    while position + 8 <= end:
+        size, box = struct.unpack(">I4s", data[position:position + 8])
+        header = 8
+        if size == 1:
+            size = struct.unpack(">Q", data[position + 8:position + 16])[0]
+            header = 16
+        elif size == 0:
+            size = end - position
+        if size < header or position + size > end:
+            raise FormatError("Invalid box {!r}".format(box))
+        if box == kind:
+            return position + header, position + size
+        position += size
+    return None
@@ -0,0 +1,185 @@
+import bisect
+import datetime
+import hashlib
+import heapq
+import json
+
+from .media import MissingDatetimeError
+
+EPOCH = datetime.datetime(1970, 1, 1)
+
+
+def _timestamp(value):
+    return (value - EPOCH).total_seconds()
+
+
+class MediaIndex(object):
+    """
+    Index of media by datetime, camera and file extension.
+
+    The media are sorted by datetime, so a time range is found by bisection,
+    and each camera and extension has a posting list of positions in that
+    order. Media without a datetime are not indexed.
+
+    .. code:: python
+
+        index = MediaIndex.build(library.media, library.directory)
+        positions = index.query(start=start, end=end, camera="canon")
+
+    :param list paths: path of each media, relative to the library, sorted
+        by datetime
+    :param list times: datetime of each media, as seconds since 1970
+    :param dict cameras: positions of the media of each (make, model)
+    :param dict extensions: positions of the media of each file extension
+    :param str signature: signature of the files the index was built from
+    """
+
+    def __init__(self, paths, times, cameras, extensions, signature=None):
+        self.paths = paths
+        self.times = times
+        self.cameras = cameras
+        self.extensions = extensions
+        self.signature = signature
+
+    def __len__(self):
+        return len(self.paths)
+
+    @staticmethod
+    def signature_of(media, directory):
+        """
+        Signature of a list of media, which changes when a file is added,
+        removed, renamed or modified
+
+        :param list media: cheddar Media objects
+        :param str directory: library directory
+        :rtype: str
+        :return: hex digest
+        """
+        digest = hashlib.sha1()
+        for line in sorted(
+            u"{}\0{}\0{}\n".format(
+                _relpath(m, directory), m.stat.st_size, m.stat.st_mtime_ns
+            )
+            for m in media
+        ):
+            digest.update(line.encode("utf-8"))
+        return digest.hexdigest()
+
+    @classmethod
+    def build(cls, media, directory):
+        """
+        Index a list of media
+
+        :param list media: cheddar Media objects, with their metadata
+        :param str directory: library directory
+        :rtype: cheddar.index.MediaIndex
+        :return: index
+        """
+        dated = []
+        for m in media:
+            try:
+                dated.append(
+                    (_timestamp(m.datetime), _relpath(m, directory), m)
+                )
+            except MissingDatetimeError:
+                continue
+        dated.sort(key=lambda item: item[:2])
+
+        cameras = {}
+        extensions = {}
+        for position, (_, _, m) in enumerate(dated):
+            camera = u"{}\0{}".format(
+                m.camera_make.lower(), m.camera_model.lower()
+            )
+            cameras.setdefault(camera, []).append(position)
+            extensions.setdefault(m.file_extension.lower(), []).append(
+                position
+            )
+
+        return cls(
+            paths=[path for _, path, _ in dated],
+            times=[time for time, _, _ in dated],
+            cameras=cameras,
+            extensions=extensions,
+            signature=cls.signature_of(media, directory)
+        )
+
+    def to_json(self):
+        """
+        Serialize the index
+
+        :rtype: str
+        :return: JSON representation of the index
+        """
+        return json.dumps({
+            "paths": self.paths,
+            "times": self.times,
+            "cameras": self.cameras,
+            "extensions": self.extensions,
+            "signature": self.signature,
+        })
+
+    @classmethod
+    def from_json(cls, text):
+        """
+        Load an index serialized with :meth:`to_json`
+
+        :param str text: JSON representation of the index
+        :rtype: cheddar.index.MediaIndex
+        :return: index
+        """
+        return cls(**json.loads(text))
+
+    def _range(self, positions, lo, hi):
+        return positions[
+            bisect.bisect_left(positions, lo):bisect.bisect_left(positions, hi)
+        ]
+
+    def query(self, start=None, end=None, camera=None, extension=None):
+        """
+        Find the media in a time range, taken with a camera and / or with a
+        file extension
+
+        :param datetime.datetime start: earliest datetime (inclusive)
+        :param datetime.datetime end: latest datetime (exclusive)
+        :param str camera: part of the camera make or model (case
+            insensitive)
+        :param str extension: file extension (case insensitive)
+        :rtype: list
+        :return: positions of the matching media, in datetime order
+        """
+        lo = 0 if start is None else bisect.bisect_left(
+            self.times, _timestamp(start)
+        )
+        hi = len(self.times) if end is None else bisect.bisect_left(
+            self.times, _timestamp(end)
+        )
+        if lo >= hi:
+            return []
+
+        candidates = None
+        if camera is not None:
+            camera = camera.lower()
+            candidates = list(heapq.merge(*[
+                self._range(positions, lo, hi)
+                for key, positions in self.cameras.items()
+                if any(camera in part for part in key.split(u"\0"))
+            ]))
+
+        if extension is not None:
+            positions = self._range(
+                self.extensions.get(extension.lower(), []), lo, hi
+            )
+            if candidates is None:
+                candidates = positions
+            else:
+                positions = set(positions)
+                candidates = [p for p in candidates if p in positions]
+
+        if candidates is None:
+            return list(range(lo, hi))
+        return candidates
+
+
+def _relpath(media, directory):
+    return media.filepath[len(directory) + 1:]
@@ -1,15 +1,105 @@
 import properties
 import shutil
+import fnmatch
+import itertools
 import os
+import time
+from concurrent.futures import ThreadPoolExecutor
 
-from .media import Media
+from .cache import SAYCHEESEINFO
+from .media import CORE_TAGS, Media, find_datetime
+from . import cache
 from . import utils
 
 IMAGE_EXTENSION = ["jpg", "png"]
 VIDEO_EXTENSION = ["mp4"]
 
 IGNORE_STR = "._"
-SAYCHEESEINFO = '.cheddar'
+
+METADATA_BATCH_SIZE = 200
+
+SCAN_CHUNK_SIZE = 256
+
+# seconds to wait for more events before refreshing a watched library, a
+# copy of many files is then handled by a single refresh
+WATCH_DELAY = 0.5
+
+# seconds between refreshes of a watched library without inotify
+POLL_INTERVAL = 5.0
+
+
+def _cache_key(media):
+    return (media.name, media.stat.st_size, media.stat.st_mtime_ns)
+
+
+def _read_cached(media, tags=None):
+    # metadata (or the tags) of the media from the caches of their
+    # directories (the media of a recursive library are cached in their own
+    # directory), returns the media that are not cached
+    attr = '_metadata' if tags is None else '_tags'
+    by_directory = {}
+    for m in media:
+        by_directory.setdefault(m.directory, []).append(m)
+
+    for directory, items in by_directory.items():
+        library_cache = cache.get_cache(directory)
+        if library_cache is not None:
+            keys = [_cache_key(m) for m in items]
+            if tags is None:
+                cached = library_cache.get_metadata_many(keys)
+            else:
+                cached = library_cache.get_tags_many(keys, tags)
+            for m in items:
+                setattr(m, attr, cached.get(m.name))
+
+    return [m for m in media if getattr(m, attr, None) is None]
+
+
+def _store(batch, metadata, tags=None):
+    # keep the extracted metadata (or tags) on the media and in the
+    # directory caches
+    attr = '_metadata' if tags is None else '_tags'
+    by_directory = {}
+    for m, md in zip(batch, metadata):
+        if md is not None:
+            setattr(m, attr, md)
+            by_directory.setdefault(m.directory, []).append(
+                _cache_key(m) + (md,)
+            )
+
+    for directory, entries in by_directory.items():
+        library_cache = cache.get_cache(directory)
+        if library_cache is None:
+            continue
+        if tags is None:
+            library_cache.set_metadata_many(entries)
+        else:
+            library_cache.set_tags_many(entries, tags)
+
+
+class LibraryChanges(object):
+    """
+    Media added to, removed from and modified in a library since it was
+    last listed (see :meth:`Library.refresh`)
+
+    :param list added: new cheddar Media objects
+    :param list removed: cheddar Media objects of the files that are gone
+    :param list modified: cheddar Media objects of the files whose size or
+        modification time changed
+    """
+
+    def __init__(self, added=None, removed=None, modified=None):
+        self.added = added or []
+        self.removed = removed or []
+        self.modified = modified or []
+
+    def __len__(self):
+        return len(self.added) + len(self.removed) + len(self.modified)
+
+    def __repr__(self):
+        return "<LibraryChanges: {} added, {} removed, {} modified>".format(
+            len(self.added), len(self.removed), len(self.modified)
+        )
 
 
 class Library(properties.HasProperties):
@@ -18,11 +108,34 @@ class Library(properties.HasProperties):
         "directory containing the media"
     )
 
-    _clear_on_update = ['_media', '_videos', '_images', '_name']
+    recursive = properties.Bool(
+        "include the media in the subdirectories",
+        default=False
+    )
+
+    include = properties.List(
+        "glob patterns (relative to the directory) of the media to include",
+        properties.String("glob pattern")
+    )
 
-    def __init__(self, directory):
+    exclude = properties.List(
+        "glob patterns (relative to the directory) of the media and "
+        "subdirectories to exclude",
+        properties.String("glob pattern")
+    )
+
+    _clear_on_update = [
+        '_media', '_videos', '_images', '_name', '_name_index',
+        '_extension_index', '_camera_index', '_query_index', '_indexed_media',
+        '_snapshot'
+    ]
+
+    def __init__(self, directory, recursive=False, include=None, exclude=None):
         super(Library, self).__init__()
         self.directory = directory
+        self.recursive = recursive
+        self.include = [] if include is None else include
+        self.exclude = [] if exclude is None else exclude
 
     @properties.validator('directory')
     def _ensure_abspath(self, change):
@@ -53,15 +166,261 @@ class Library(properties.HasProperties):
         :return: cheddar Media object
         """
         if getattr(self, '_media', None) is None:
-            files = os.listdir(self.directory)
-            self._media = [
-                Media(filepath = self.directory + os.path.sep + f)
-                for f in files if f.split('.')[-1].lower() in
-                IMAGE_EXTENSION + VIDEO_EXTENSION and
-                f[:len(IGNORE_STR)] != IGNORE_STR
-            ]
+            self._listed(list(self.iter_media()))
         return self._media
 
+    def _listed(self, media):
+        # keep the media of a listing, and the size and modification time of
+        # their files then, which the next refresh compares with
+        self._snapshot = dict(
+            (m.filepath, (m.stat.st_size, m.stat.st_mtime_ns)) for m in media
+        )
+        self._media = media
+
+    def iter_media(self, recursive=None, include=None, exclude=None):
+        """
+        Scan the library and yield the media objects one at a time. The scan
+        uses os.scandir, so the file type and status of each entry are not
+        looked up again.
+
+        .. code:: python
+
+            for media in library.iter_media(
+                recursive=True, include=["2017/*"], exclude=["*/trash/*"]
+            ):
+                print(media.name)
+
+        :param bool recursive: include the subdirectories (defaults to
+            the recursive property of the library)
+        :param list include: glob patterns, relative to the library
+            directory, of the media to include (defaults to the include
+            property of the library)
+        :param list exclude: glob patterns, relative to the library
+            directory, of the media and subdirectories to exclude (defaults
+            to the exclude property of the library)
+        :rtype: generator
+        :return: cheddar Media objects
+        """
+        if recursive is None:
+            recursive = self.recursive
+        if include is None:
+            include = self.include
+        if exclude is None:
+            exclude = self.exclude
+
+        def matches(relpath, patterns):
+            return any(fnmatch.fnmatch(relpath, p) for p in patterns)
+
+        directories = [(self.directory, "")]
+        while directories:
+            directory, reldir = directories.pop()
+            for entry in os.scandir(directory):
+                if (
+                    entry.name[:len(IGNORE_STR)] == IGNORE_STR or
+                    entry.name == SAYCHEESEINFO
+                ):
+                    continue
+
+                relpath = reldir + entry.name
+                if matches(relpath, exclude):
+                    continue
+
+                if entry.is_dir():
+                    if recursive:
+                        directories.append((entry.path, relpath + "/"))
+                    continue
+
+                if (
+                    entry.name.split('.')[-1].lower() not in
+                    IMAGE_EXTENSION + VIDEO_EXTENSION
+                ):
+                    continue
+
+                if include and not matches(relpath, include):
+                    continue
+
+                yield Media(filepath=entry.path, dir_entry=entry)
+
+    async def aiter_media(
+        self, recursive=None, include=None, exclude=None,
+        chunk_size=SCAN_CHUNK_SIZE
+    ):
+        """
+        :meth:`iter_media` for asyncio code. The directories are scanned in
+        a thread, a chunk of media at a time, so the event loop is not
+        blocked by the file system.
+
+        .. code:: python
+
+            async for m in library.aiter_media():
+                print(m.name)
+
+        :param bool recursive: include the media in the subdirectories
+            (defaults to :attr:`recursive`)
+        :param list include: glob patterns of the media to include (defaults
+            to :attr:`include`)
+        :param list exclude: glob patterns of the media and subdirectories
+            to exclude (defaults to :attr:`exclude`)
+        :param int chunk_size: number of media scanned per call to the thread
+        :rtype: cheddar.Media
+        :return: cheddar Media objects
+        """
+        import asyncio
+
+        loop = asyncio.get_running_loop()
+        media = self.iter_media(
+            recursive=recursive, include=include, exclude=exclude
+        )
+        while True:
+            chunk = await loop.run_in_executor(
+                None, list, itertools.islice(media, chunk_size)
+            )
+            if len(chunk) == 0:
+                return
+            for m in chunk:
+                yield m
+
+    def refresh(self):
+        """
+        Update the media of the library after files were added, removed or
+        modified, without listing it from scratch. The directory is scanned
+        again and compared with the name, size and modification time of
+        the media already listed: new files are added, the media of the
+        files that are gone are removed, and the metadata of the modified
+        files is forgotten. The other media, and what was loaded for them,
+        are kept.
+
+        .. code:: python
+
+            changes = library.refresh()
+            library.load_tags()  # only for the new and modified media
+
+        The files are compared with their size and modification time when
+        the media were listed (see :attr:`media`), or by the previous
+        refresh.
+
+        :rtype: cheddar.library.LibraryChanges
+        :return: the added, removed and modified media
+        """
+        if getattr(self, '_media', None) is None:
+            self._listed(list(self.iter_media()))
+            return LibraryChanges(added=list(self._media))
+
+        existing = dict((m.filepath, m) for m in self._media)
+        snapshot = getattr(self, '_snapshot', None) or {}
+        media = []
+        changes = LibraryChanges()
+        for scanned in self.iter_media():
+            m = existing.pop(scanned.filepath, None)
+            if m is None:
+                changes.added.append(scanned)
+                media.append(scanned)
+                continue
+
+            stat = scanned.stat
+            if snapshot.get(m.filepath) != (stat.st_size, stat.st_mtime_ns):
+                m._changed(scanned._dir_entry)
+                changes.modified.append(m)
+            media.append(m)
+
+        changes.removed = [m for m in self._media if m.filepath in existing]
+
+        if len(changes) > 0:
+            for attr in self._clear_on_update:
+                if attr not in ['_media', '_name']:
+                    setattr(self, attr, None)
+        self._listed(media)
+        return changes
+
+    def _directories(self):
+        # directories of the library, that are watched for changes
+        directories = [self.directory]
+        if not self.recursive:
+            return directories
+        for root, subdirectories, _ in os.walk(self.directory):
+            subdirectories[:] = [
+                d for d in subdirectories
+                if d[:len(IGNORE_STR)] != IGNORE_STR and d != SAYCHEESEINFO
+            ]
+            directories.extend(os.path.join(root, d) for d in subdirectories)
+        return directories
+
+    def watch(self, timeout=None, delay=WATCH_DELAY, interval=POLL_INTERVAL):
+        """
+        Watch the library, and refresh it (see :meth:`refresh`) whenever
+        files are added, removed or modified, e.g. for an ingest daemon.
+
+        .. code:: python
+
+            for changes in library.watch():
+                for m in changes.added:
+                    print(m.name, m.datetime)
+
+        On Linux, the directories are watched with inotify (see
+        :mod:`cheddar.watch`) and the library is refreshed shortly after
+        the files changed. Elsewhere, it is refreshed every few seconds. If
+        the library was not listed yet, its media are first reported as
+        added.
+
+        :param float timeout: seconds to watch the library for, None to
+            watch it until the generator is closed
+        :param float delay: seconds to wait for more events before the
+            library is refreshed
+        :param float interval: seconds between refreshes when inotify is
+            not available
+        :rtype: generator
+        :return: cheddar.library.LibraryChanges, for each refresh that found
+            changes
+        """
+        from . import watch
+
+        deadline = None if timeout is None else time.time() + timeout
+
+        def remaining():
+            if deadline is None:
+                return None
+            return max(0, deadline - time.time())
+
+        inotify = watch.Inotify() if watch.available() else None
+        try:
+            if inotify is not None:
+                for directory in self._directories():
+                    inotify.add_watch(directory)
+
+            changes = self.refresh()
+            if len(changes) > 0:
+                yield changes
+
+            while remaining() != 0:
+                if inotify is None:
+                    wait = remaining()
+                    time.sleep(
+                        interval if wait is None else min(wait, interval)
+                    )
+                else:
+                    events = [
+                        event for event in inotify.read(remaining())
+                        if event[0] is None or not (
+                            event[1][:len(IGNORE_STR)] == IGNORE_STR or
+                            event[1].startswith(SAYCHEESEINFO)
+                        )
+                    ]
+                    if len(events) == 0:
+                        continue
+                    time.sleep(delay)
+                    inotify.read(0)
+                    if self.recursive:
+                        # watch the new subdirectories
+                        for directory in self._directories():
+                            inotify.add_watch(directory)
+
+                changes = self.refresh()
+                if len(changes) > 0:
+                    yield changes
+        finally:
+            if inotify is not None:
+                inotify.close()
+
     @property
     def media_names(self):
         """
@@ -74,7 +433,155 @@ class Library(properties.HasProperties):
 
     @property
     def _media_dict(self):
-        return dict(zip(self.media_names, self.media))
+        if getattr(self, '_name_index', None) is None:
+            self._name_index = dict(zip(self.media_names, self.media))
+        return self._name_index
+
+    def _clear_indexes(self):
+        # media were renamed
+        self._name_index = None
+        self._extension_index = None
+        self._query_index = None
+        self._indexed_media = None
+
+    def get_media(self, name):
+        """
+        media object with the given filename. The lookup uses an index of
+        the filenames, which is rebuilt if media were renamed.
+
+        :param str name: filename (excluding path)
+        :rtype: cheddar.Media
+        :return: cheddar Media object
+        """
+        media = self._media_dict.get(name)
+        if media is None or media.name != name:
+            self._clear_indexes()
+            media = self._media_dict.get(name)
+        if media is None:
+            raise KeyError(
+                "No media named {} in {}".format(name, self.directory)
+            )
+        return media
+
+    def media_by_extension(self, extension):
+        """
+        media objects with the given file extension
+
+        :param str extension: file extension (case insensitive)
+        :rtype: list
+        :return: list of :class:cheddar.Media items
+        """
+        if getattr(self, '_extension_index', None) is None:
+            self._extension_index = {}
+            for m in self.media:
+                self._extension_index.setdefault(
+                    m.file_extension.lower(), []
+                ).append(m)
+        return list(self._extension_index.get(extension.lower(), []))
+
+    def media_by_camera(self, camera):
+        """
+        media objects taken with a camera. The camera matches if it is part
+        of the camera make or model (case insensitive). The media are
+        indexed by camera, so only the distinct cameras are compared.
+
+        :param str camera: camera name
+        :rtype: list
+        :return: list of :class:cheddar.Media items, in library order
+        """
+        if getattr(self, '_camera_index', None) is None:
+            self.load_tags()
+            self._camera_index = {}
+            for i, m in enumerate(self.media):
+                self._camera_index.setdefault(
+                    (m.camera_make.lower(), m.camera_model.lower()), []
+                ).append(i)
+
+        camera = camera.lower()
+        positions = sorted(
+            i for (make, model), indices in self._camera_index.items()
+            if camera in make or camera in model
+            for i in indices
+        )
+        return [self.media[i] for i in positions]
+
+    @property
+    def index(self):
+        """
+        index of the media by datetime, camera and file extension (see
+        :class:`cheddar.index.MediaIndex`). It is stored in the cache of the
+        library directory and only rebuilt when files were added, removed,
+        renamed or modified.
+
+        :rtype: cheddar.index.MediaIndex
+        :return: index of the media
+        """
+        from .index import MediaIndex
+
+        if getattr(self, '_query_index', None) is None:
+            signature = MediaIndex.signature_of(self.media, self.directory)
+            library_cache = cache.get_cache(self.directory)
+
+            index = None
+            if library_cache is not None:
+                stored = library_cache.get_blob("index")
+                if stored is not None:
+                    index = MediaIndex.from_json(stored)
+                    if index.signature != signature:
+                        index = None
+
+            if index is None:
+                self.load_tags()
+                index = MediaIndex.build(self.media, self.directory)
+                if library_cache is not None:
+                    library_cache.set_blob("index", index.to_json())
+
+            self._query_index = index
+            self._indexed_media = None
+        return self._query_index
+
+    def _media_at_positions(self):
+        # media at each position of the index, found once per index
+        if getattr(self, '_indexed_media', None) is None:
+            by_path = dict(
+                (m.filepath[len(self.directory) + 1:], m) for m in self.media
+            )
+            index = self.index
+            if any(path not in by_path for path in index.paths):
+                # media were renamed since the index was built
+                self._query_index = None
+                index = self.index
+            self._indexed_media = [by_path[path] for path in index.paths]
+        return self._indexed_media
+
+    def query(self, start=None, end=None, camera=None, extension=None):
+        """
+        media taken in a time range, with a camera and / or with a file
+        extension, found with the library :attr:`index`. Media without a
+        datetime are never returned.
+
+        .. code:: python
+
+            media = library.query(
+                start=datetime.datetime(2017, 9, 14),
+                end=datetime.datetime(2017, 9, 15),
+                camera="canon"
+            )
+
+        :param datetime.datetime start: earliest datetime (inclusive)
+        :param datetime.datetime end: latest datetime (exclusive)
+        :param str camera: part of the camera make or model (case
+            insensitive)
+        :param str extension: file extension (case insensitive)
+        :rtype: list
+        :return: list of :class:cheddar.Media items, in datetime order
+        """
+        media = self._media_at_positions()
+        return [
+            media[i] for i in self.index.query(
+                start=start, end=end, camera=camera, extension=extension
+            )
+        ]
 
     @property
     def videos(self):
@@ -126,48 +633,273 @@ class Library(properties.HasProperties):
         """
         return [m.name for m in self.images]
 
+    def load_metadata(self, batch_size=METADATA_BATCH_SIZE, workers=None):
+        """
+        Load the metadata of all of the media in the library. Metadata is
+        read from the directory's cache when possible, the remaining files
+        are sent to exiftool in batches, and batches are spread over the
+        exiftool pool, rather than one request per file.
+
+        :param int batch_size: number of files per exiftool call
+        :param int workers: number of batches loaded concurrently (defaults
+            to the size of the exiftool pool)
+        """
+        self._load(None, batch_size, workers)
+
+    def load_tags(self, batch_size=METADATA_BATCH_SIZE, workers=None):
+        """
+        Load the part of the metadata cheddar uses (see
+        :attr:`cheddar.Media.tags`) for all of the media in the library,
+        like :meth:`load_metadata` but much cheaper. This is enough for the
+        datetimes and cameras of the media.
+
+        :param int batch_size: number of files per exiftool call
+        :param int workers: number of batches loaded concurrently (defaults
+            to the size of the exiftool pool)
+        """
+        self._load(CORE_TAGS, batch_size, workers)
+
+    def _load(self, tags, batch_size, workers):
+        batches = self._batches(batch_size, tags)
+
+        if workers is None:
+            from . import pool
+
+            workers = pool.get_pool().size
+
+        def load(batch):
+            filepaths = [m.filepath for m in batch]
+            if tags is None:
+                metadata = utils.get_metadata_batch(filepaths)
+            else:
+                metadata = utils.get_tags_batch(filepaths, tags)
+            _store(batch, metadata, tags)
+
+        with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+            list(executor.map(load, batches))
+
+    async def aload(self, batch_size=METADATA_BATCH_SIZE):
+        """
+        Scan the library and load the metadata of all of its media, like
+        :meth:`load_metadata` but without blocking the event loop, so that
+        several libraries can be loaded concurrently.
+
+        .. code:: python
+
+            await asyncio.gather(library1.aload(), library2.aload())
+
+        The batches are sent to the exiftool processes of
+        :func:`cheddar.aio.get_pool`, whose size bounds the number of
+        concurrent requests.
+
+        :param int batch_size: number of files per exiftool call
+        :rtype: list
+        :return: list of :class:cheddar.Media items
+        """
+        import asyncio
+        from . import aio
+
+        loop = asyncio.get_running_loop()
+        if getattr(self, '_media', None) is None:
+            media = [m async for m in self.aiter_media()]
+            await loop.run_in_executor(None, self._listed, media)
+
+        batches = await loop.run_in_executor(
+            None, self._batches, batch_size
+        )
+        exiftool = aio.get_pool()
+
+        async def load(batch):
+            metadata = await exiftool.get_metadata_batch(
+                [m.filepath for m in batch]
+            )
+            await loop.run_in_executor(None, _store, batch, metadata)
+
+        await asyncio.gather(*[load(batch) for batch in batches])
+        return self.media
+
+    def _batches(self, batch_size, tags=None):
+        # read what is cached, and split the remaining media in batches
+        attr = '_metadata' if tags is None else '_tags'
+        missing = [m for m in self.media if getattr(m, attr, None) is None]
+        if tags is not None:
+            # the tags of the media whose metadata is loaded are known
+            for m in missing:
+                if getattr(m, '_metadata', None) is not None:
+                    m._tags = utils.select_tags(m._metadata, tags)
+            missing = [m for m in missing if getattr(m, '_tags', None) is None]
+
+        missing = _read_cached(missing, tags)
+        return [
+            missing[i:i + batch_size]
+            for i in range(0, len(missing), batch_size)
+        ]
+
+    def records(self, batch_size=METADATA_BATCH_SIZE, workers=None):
+        """
+        compact, read-only records of the media in the library (see
+        :class:`cheddar.record.MediaRecord`), for libraries too large to
+        keep a :class:`cheddar.Media` object and its full metadata per file.
+        The directory is scanned and the metadata loaded a batch at a time,
+        and only the records are kept.
+
+        :param int batch_size: number of files per exiftool call
+        :param int workers: number of batches loaded concurrently (defaults
+            to the size of the exiftool pool)
+        :rtype: list
+        :return: list of :class:`cheddar.record.MediaRecord` items, in
+            library order
+        """
+        from .record import MediaRecord
+
+        if workers is None:
+            from . import pool
+
+            workers = pool.get_pool().size
+        workers = max(1, workers)
+
+        def load(batch):
+            missing = _read_cached([
+                m for m in batch
+                if getattr(m, '_metadata', None) is None and
+                getattr(m, '_tags', None) is None
+            ], CORE_TAGS)
+            _store(
+                missing,
+                utils.get_tags_batch([m.filepath for m in missing], CORE_TAGS),
+                CORE_TAGS
+            )
+            return [MediaRecord.from_media(m) for m in batch]
+
+        media = iter(
+            self.media if getattr(self, '_media', None) is not None
+            else self.iter_media()
+        )
+        batches = iter(lambda: list(itertools.islice(media, batch_size)), [])
+
+        records = []
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            while True:
+                # only a few batches of Media objects exist at any time
+                window = list(itertools.islice(batches, workers))
+                if len(window) == 0:
+                    return records
+                for batch_records in executor.map(load, window):
+                    records.extend(batch_records)
+
+    def datetimes(self):
+        """
+        date and time of creation of every media in the library, parsed in
+        one call (see :func:`cheddar.utils.parse_datetimes`) after a batched
+        load of the tags (see :meth:`load_tags`). Requires numpy.
+
+        :rtype: numpy.ndarray
+        :return: datetime64[s] array in library order, NaT where there is no
+            datetime
+        """
+        self.load_tags()
+        return utils.parse_datetimes(
+            [find_datetime(m.tags)[1] for m in self.media]
+        )
+
+    def to_table(self, fields=None, format="numpy"):
+        """
+        Columnar table of the media in the library, e.g. for sorting,
+        grouping and filtering them. The metadata is loaded in batches first
+        (see :meth:`load_metadata`), or only the tags when they are enough
+        for the fields (see :meth:`load_tags`).
+
+        .. code:: python
+
+            df = library.to_table(
+                fields=["name", "datetime", "camera_model"], format="pandas"
+            )
+
+        :param list fields: columns of the table, defaults to all of
+            :data:`cheddar.table.FIELDS`
+        :param str format: "numpy" (structured array), "pandas" (DataFrame)
+            or "arrow" (pyarrow Table)
+        :return: table with one row per media
+        """
+        from . import table
+
+        metadata_fields = set(table.METADATA_FIELDS) - set(table.TAG_FIELDS)
+        if fields is None or set(fields) & metadata_fields:
+            self.load_metadata()
+        elif set(fields) & set(table.TAG_FIELDS):
+            self.load_tags()
+        return table.media_table(self.media, fields=fields, format=format)
+
+    def find_similar(self, threshold=4):
+        """
+        Find the pairs of similar images in the library (e.g. burst shots or
+        re-exported copies) by the hamming distance of their perceptual
+        hashes, searched with a BK-tree (see
+        :func:`cheddar.similarity.find_similar`). Requires numpy and Pillow.
+
+        :param int threshold: maximum hamming distance of similar images
+        :rtype: list
+        :return: (media, media, distance) of each pair of similar images
+        """
+        from . import similarity
+
+        return similarity.find_similar(self.images, threshold)
+
+    def build_thumbnails(self, size=None, workers=None):
+        """
+        Make the thumbnails of the images in the library that are not in
+        the thumbnail cache yet, in a process pool (see
+        :func:`cheddar.thumbnails.build_thumbnails`). Requires Pillow.
+
+        :param int size: maximum width and height of the thumbnails
+            (defaults to :data:`cheddar.thumbnails.DEFAULT_SIZE`)
+        :param int workers: number of processes (defaults to the number of
+            CPUs)
+        :rtype: list
+        :return: path of the thumbnail of each image, None for the images
+            whose thumbnail could not be made
+        """
+        from . import thumbnails
+
+        return thumbnails.build_thumbnails(
+            self.images, size=size, workers=workers
+        )
+
     def open_images(self, **kwargs):
         """
-        open the images in the library
+        open the images in the library. With :code:`thumbnails=True`, their
+        thumbnails are opened instead, which is much faster for browsing.
         """
-        images = self.image_names
+        images = self.images
 
         if "camera" in kwargs:
-            camera = kwargs.pop("camera").lower()
             images = [
-                im for im in self.image_names if
-                (
-                    camera in self._media_dict[im].camera_make.lower() or
-                    camera in self._media_dict[im].camera_model.lower()
-                )
+                m for m in self.media_by_camera(kwargs.pop("camera"))
+                if m.file_extension.lower() in IMAGE_EXTENSION
             ]
 
-        images = [self.directory + os.path.sep + img for img in images]
+        if kwargs.pop("thumbnails", False):
+            from . import thumbnails
 
-        utils.open_files(images)
+            utils.open_files([
+                f for f in thumbnails.build_thumbnails(images) if f is not None
+            ])
+        else:
+            utils.open_files([m.filepath for m in images])
 
     def open_videos(self, **kwargs):
         """
         open the videos in the library
         """
-
-        videos = self.video_names
+        videos = self.videos
 
         if "camera" in kwargs:
-            camera = kwargs.pop("camera").lower()
             videos = [
-                vid for vid in self.video_names if
-                (
-                    camera in self._media_dict[vid].camera_make.lower() or
-                    camera in self._media_dict[vid].camera_model.lower()
-                )
+                m for m in self.media_by_camera(kwargs.pop("camera"))
+                if m.file_extension.lower() in VIDEO_EXTENSION
             ]
 
-        videos = [
-            self.directory + os.path.sep + vid for vid in videos
-        ]
-
-        utils.open_files(videos)
+        utils.open_files([m.filepath for m in videos])
 
     def open(self, **kwargs):
         """
@@ -194,15 +926,12 @@ class Library(properties.HasProperties):
         )
 
         # check if file already named the same, if so, add a (1)
-        while os.path.isdir(rootpath  + newname):
-            newname = newname.split(" (")
-            if len(newname) > 1:
-                nameend = newname[-1][:-1]
-                print(nameend)
-                newname[-1] = "{})".format(int(nameend[0]) + 1)
-            else:
-                newname += ["1)"]
-            newname = " (".join(newname)
+        resolver = utils.NameResolver(
+            suffix=" ({})",
+            split_extension=False,
+            exists=lambda name: os.path.lexists(rootpath + name)
+        )
+        newname = resolver.claim(newname)
 
         newnamefull = rootpath + newname
 
@@ -211,6 +940,7 @@ class Library(properties.HasProperties):
             print("renaming {} to {}".format(self.directory, newnamefull))
 
         # rename file
+        cache.close_cache(self.directory)
         shutil.move(self.directory, newnamefull)
 
         # clear attributes
@@ -220,20 +950,117 @@ class Library(properties.HasProperties):
         self.directory = newnamefull
         return
 
+    def plan_rename_by_date(
+        self,
+        lowercase_extension=True,
+        timeshift=None,
+        filename_format="%Y-%m-%d %H.%M.%S",
+        workers=None
+    ):
+        """
+        Plan the renaming of the content in the library by date, without
+        touching the files
+
+        .. code:: python
+
+            plan = library.plan_rename_by_date()
+            print(plan.to_json())
+            plan.apply()
+
+        The datetimes of all of the media are first loaded in parallel (see
+        :meth:`load_tags`). Name collisions are resolved in memory (see
+        :class:`cheddar.utils.NameResolver`), against a single listing of
+        each directory. Media that already have their new name, or their new
+        name with a counter (e.g. photos of a burst, taken in the same
+        second), keep it. The other media get their names by datetime, then
+        name, so planning the rename of a renamed library gives an empty
+        plan.
+
+        :param int workers: number of metadata batches loaded concurrently
+        :rtype: cheddar.plan.RenamePlan
+        :return: rename plan
+        """
+        self.load_tags(workers=workers)
+
+        media = self.media
+        newnames = [
+            m.filename_by_date(lowercase_extension, timeshift, filename_format)
+            for m in media
+        ]
+
+        # the names of the media are free, unless a media keeps its name
+        resolvers = {}
+        for m in media:
+            if m.directory not in resolvers:
+                resolvers[m.directory] = (
+                    utils.NameResolver.from_directory(m.directory)
+                )
+            resolvers[m.directory].discard(m.name)
+
+        order = sorted(
+            range(len(media)), key=lambda i: (media[i].datetime, media[i].name)
+        )
+        finalnames = [None] * len(media)
+        for i in order:
+            if media[i].name == newnames[i]:
+                finalnames[i] = resolvers[media[i].directory].claim(
+                    newnames[i]
+                )
+        for i in order:
+            resolver = resolvers[media[i].directory]
+            if finalnames[i] is None and resolver.is_variant(
+                media[i].name, newnames[i]
+            ):
+                finalnames[i] = resolver.claim(media[i].name)
+        for i in order:
+            if finalnames[i] is None:
+                finalnames[i] = resolvers[media[i].directory].claim(
+                    newnames[i]
+                )
+
+        moved = [
+            (m, finalname) for m, finalname in zip(media, finalnames)
+            if finalname != m.name
+        ]
+        from .plan import RenamePlan
+
+        return RenamePlan(
+            moves=[
+                (m.filepath, m.directory + os.path.sep + finalname)
+                for m, finalname in moved
+            ],
+            media=[m for m, _ in moved]
+        )
+
     def rename_content_by_date(
         self,
         lowercase_extension=True,
         timeshift=None,
         filename_format="%Y-%m-%d %H.%M.%S",
-        verbose=True
+        verbose=True,
+        workers=None,
+        journal=None
     ):
         """
         rename the content in the library by date
+
+        The renames are planned up front (see :meth:`plan_rename_by_date`)
+        and then applied with a write-ahead journal. If the rename is
+        interrupted, finish it with :meth:`cheddar.plan.RenamePlan.resume`
+        or undo it with :meth:`cheddar.plan.RenamePlan.rollback`.
+
+        :param int workers: number of metadata batches loaded concurrently
+        :param str journal: path of the journal (defaults to
+            :code:`.cheddar-rename-journal` in the library directory)
         """
-        for m in self.media:
-            m.rename_by_date(
-                lowercase_extension,
-                timeshift,
-                filename_format,
-                verbose
-            )
+        plan = self.plan_rename_by_date(
+            lowercase_extension, timeshift, filename_format, workers
+        )
+
+        if journal is None:
+            from .plan import JOURNAL
+
+            journal = os.path.join(self.directory, JOURNAL)
+
+        plan.apply(journal=journal, verbose=verbose)
+        self._clear_indexes()
@@ -3,36 +3,125 @@ import properties
 import datetime
 import parse
 
+from . import cache
 from . import utils
 
+# formats of the first 19 characters of the datetimes, anything after the
+# seconds (e.g. the "+02:00", "-06:00" or "Z" timezone of the
+# FileModifyDate) is ignored. The QuickTime:CreateDate of videos comes last
+# so that it is used rather than the FileModifyDate
 DATETIMEKEY = {
     u"EXIF:DateTimeOriginal": "{year:d}:{month:d}:{day:d} {hour:d}:{minute:d}:{second:d}",
-    u"File:FileModifyDate": "{year:d}:{month:d}:{day:d} {hour:d}:{minute:d}:{second:d}-{}"
+    u"File:FileModifyDate": "{year:d}:{month:d}:{day:d} {hour:d}:{minute:d}:{second:d}",
+    u"QuickTime:CreateDate": "{year:d}:{month:d}:{day:d} {hour:d}:{minute:d}:{second:d}"
 }
 
+# parsers compiled once rather than every time a datetime is read
+DATETIME_PARSERS = dict(
+    (key, parse.compile(datetime_format))
+    for key, datetime_format in DATETIMEKEY.items()
+)
+
 CAMERA_MAKE_KEY = u"EXIF:Make"
 CAMERA_MODEL_KEY = u"EXIF:Model"
 
+# the tags datetime, camera_make and camera_model are read from
+CORE_TAGS = list(DATETIMEKEY) + [CAMERA_MAKE_KEY, CAMERA_MODEL_KEY]
+
+WIDTH_KEYS = [
+    u"File:ImageWidth", u"PNG:ImageWidth", u"QuickTime:ImageWidth",
+    u"EXIF:ExifImageWidth"
+]
+HEIGHT_KEYS = [
+    u"File:ImageHeight", u"PNG:ImageHeight", u"QuickTime:ImageHeight",
+    u"EXIF:ExifImageHeight"
+]
+
+
+class MissingDatetimeError(Exception):
+    """
+    Raised when there is no datetime, or no valid one, in the metadata of a
+    media
+    """
+
+
+def parse_datetime(key, value):
+    """
+    Parse a datetime of the metadata (see :data:`DATETIMEKEY`). The
+    timezone is ignored, like in :func:`cheddar.utils.parse_datetimes`.
+
+    :param str key: key of the datetime in the metadata
+    :param str value: datetime, e.g. :code:`2017:09:14 01:54:30-06:00`
+    :rtype: datetime.datetime
+    :return: the datetime, None if it is not valid (e.g.
+        :code:`0000:00:00 00:00:00`)
+    """
+    parsed = DATETIME_PARSERS[key].parse(value[:19])
+    if parsed is None:
+        return None
+    try:
+        return datetime.datetime(**parsed.named)
+    except ValueError:
+        return None
+
+
+def find_datetime(metadata):
+    """
+    Find the date and time of creation in the metadata of a media. If
+    several of the keys in DATETIMEKEY are in the metadata, the last one
+    with a valid datetime is used (e.g. the :code:`0000:00:00 00:00:00`
+    CreateDate of a video without one is skipped).
+
+    :param dict metadata: metadata
+    :rtype: tuple
+    :return: (key, value) of the datetime in the metadata, (None, None) if
+        there is none
+    """
+    key, value, valid = None, None, False
+    for datetime_key in DATETIMEKEY:
+        if datetime_key not in metadata:
+            continue
+        candidate = metadata[datetime_key]
+        candidate_valid = parse_datetime(datetime_key, candidate) is not None
+        if candidate_valid or not valid:
+            key, value, valid = datetime_key, candidate, candidate_valid
+    return key, value
+
 
 class Media(properties.HasProperties):
     """
     class for media objects
+
+    :param str filepath: path to the media file
+    :param os.DirEntry dir_entry: directory entry of the file from
+        os.scandir, used to avoid extra system calls when given
     """
 
     filepath = properties.String(
         "filepath to the media"
     )
 
-    _clear_on_update = ['_name', '_file_extension', '_metadata']
+    _clear_on_update = [
+        '_name', '_file_extension', '_metadata', '_tags', '_stat',
+        '_dir_entry', '_datetime', '_phash'
+    ]
 
-    def __init__(self, filepath):
+    def __init__(self, filepath, dir_entry=None):
         super(Media, self).__init__()
+        self._dir_entry = dir_entry
         self.filepath = filepath
 
     @properties.validator('filepath')
     def _ensure_abspath(self, change):
         value = change['value']
-        assert os.path.isfile(value), "File {} does not exist".format(value)
+        dir_entry = getattr(self, '_dir_entry', None)
+        if dir_entry is not None and dir_entry.path == value:
+            # a directory entry from os.scandir already knows the file type
+            assert dir_entry.is_file(), "File {} does not exist".format(value)
+        else:
+            assert os.path.isfile(value), (
+                "File {} does not exist".format(value)
+            )
         change['value'] = os.path.abspath(os.path.expanduser(value))
 
     @property
@@ -73,18 +162,116 @@ class Media(properties.HasProperties):
             self._file_extension = self.name.split('.')[-1]
         return self._file_extension
 
+    @property
+    def stat(self):
+        """
+        status of the file (size, modification time, ...)
+
+        :rtype: os.stat_result
+        :return: result of os.stat on the file
+        """
+        if getattr(self, '_stat', None) is None:
+            if getattr(self, '_dir_entry', None) is not None:
+                self._stat = self._dir_entry.stat()
+            else:
+                self._stat = os.stat(self.filepath)
+        return self._stat
+
     @property
     def metadata(self):
         """
-        Exchangeable media file format information
+        Exchangeable media file format information. The metadata is read from
+        the directory's cache when the file has not changed since it was
+        extracted.
+
+        :rtype: dict
+        :return: EXIF metadata
+        """
+        if getattr(self, '_metadata', None) is None:
+            self._metadata = self._cached_metadata()
+            if self._metadata is None:
+                self._cache_metadata(utils.get_metadata(self.filepath))
+
+        return self._metadata
+
+    async def ametadata(self):
+        """
+        :attr:`metadata` for asyncio code. exiftool is driven over asyncio
+        pipes (see :mod:`cheddar.aio`) and the directory cache is read and
+        written in the default executor, so the event loop is not blocked
+        while the metadata is extracted.
+
+        .. code:: python
+
+            metadata = await media.ametadata()
 
         :rtype: dict
         :return: EXIF metadata
         """
+        import asyncio
+        from . import aio
+
         if getattr(self, '_metadata', None) is None:
-            self._metadata = utils.get_metadata(self.filepath)
+            loop = asyncio.get_running_loop()
+            metadata = await loop.run_in_executor(None, self._cached_metadata)
+            if metadata is None:
+                metadata = await aio.get_metadata(self.filepath)
+                await loop.run_in_executor(
+                    None, self._cache_metadata, metadata
+                )
+            self._metadata = metadata
+
         return self._metadata
 
+    @property
+    def tags(self):
+        """
+        The part of the metadata cheddar uses (:data:`CORE_TAGS`). Unless
+        all of the :attr:`metadata` was already loaded, only these tags are
+        extracted (see :func:`cheddar.utils.get_tags`), which is much
+        cheaper. They are cached in the directory like the metadata.
+
+        :rtype: dict
+        :return: EXIF metadata of the core tags
+        """
+        if getattr(self, '_tags', None) is None:
+            if getattr(self, '_metadata', None) is not None:
+                self._tags = utils.select_tags(self._metadata, CORE_TAGS)
+                return self._tags
+
+            library_cache = cache.get_cache(self.directory)
+            key = (self.name, self.stat.st_size, self.stat.st_mtime_ns)
+            self._tags = None
+            if library_cache is not None:
+                self._tags = library_cache.get_tags_many(
+                    [key], CORE_TAGS
+                ).get(self.name)
+
+            if self._tags is None:
+                self._tags = utils.get_tags(self.filepath, CORE_TAGS)
+                if library_cache is not None:
+                    library_cache.set_tags_many(
+                        [key + (self._tags,)], CORE_TAGS
+                    )
+
+        return self._tags
+
+    def _cached_metadata(self):
+        library_cache = cache.get_cache(self.directory)
+        if library_cache is None:
+            return None
+        return library_cache.get_metadata(
+            self.name, self.stat.st_size, self.stat.st_mtime_ns
+        )
+
+    def _cache_metadata(self, metadata):
+        self._metadata = metadata
+        library_cache = cache.get_cache(self.directory)
+        if library_cache is not None:
+            library_cache.set_metadata(
+                self.name, self.stat.st_size, self.stat.st_mtime_ns, metadata
+            )
+
     @property
     def datetime(self):
         """
@@ -93,20 +280,24 @@ class Media(properties.HasProperties):
         :rtype: datetime.datetime
         :return: datetime object of when the media was created
         """
+        if getattr(self, '_datetime', None) is None:
+            key, img_datetime = find_datetime(self.tags)
+
+            if img_datetime is None:
+                raise MissingDatetimeError(
+                    "Could not find datetime info in metadata of {}".format(
+                        self.filepath
+                    )
+                )
 
-        img_datetime = None
-
-        for key in DATETIMEKEY:
-            if key in self.metadata:
-                img_datetime = self.metadata[key]
-                datetime_format = DATETIMEKEY[key]
-
-        if img_datetime is None:
-            raise Exception("Could not find datetime info in metadata")
-
-        parsed_datetime = parse.parse(datetime_format, img_datetime)
-
-        return datetime.datetime(**parsed_datetime.named)
+            self._datetime = parse_datetime(key, img_datetime)
+            if self._datetime is None:
+                raise MissingDatetimeError(
+                    "Could not parse the {} {} of {}".format(
+                        key, img_datetime, self.filepath
+                    )
+                )
+        return self._datetime
 
     @property
     def camera_make(self):
@@ -117,8 +308,8 @@ class Media(properties.HasProperties):
         :return: camera name
         """
 
-        if CAMERA_MAKE_KEY in self.metadata:
-            return self.metadata[CAMERA_MAKE_KEY]
+        if CAMERA_MAKE_KEY in self.tags:
+            return self.tags[CAMERA_MAKE_KEY]
         else:
             return 'UNKNOWN'
 
@@ -131,11 +322,58 @@ class Media(properties.HasProperties):
         :return: camera name
         """
 
-        if CAMERA_MODEL_KEY in self.metadata:
-            return self.metadata[CAMERA_MODEL_KEY]
+        if CAMERA_MODEL_KEY in self.tags:
+            return self.tags[CAMERA_MODEL_KEY]
         else:
             return 'UNKNOWN'
 
+    @property
+    def dimensions(self):
+        """
+        width and height of the image or video, in pixels
+
+        :rtype: tuple
+        :return: (width, height), None if they are not in the metadata
+        """
+        for width_key, height_key in zip(WIDTH_KEYS, HEIGHT_KEYS):
+            if width_key in self.metadata and height_key in self.metadata:
+                return (
+                    int(self.metadata[width_key]),
+                    int(self.metadata[height_key])
+                )
+        return None
+
+    @property
+    def phash(self):
+        """
+        perceptual hash of the image (see :func:`cheddar.similarity.phash`),
+        stored in the cache of the directory. Requires numpy and Pillow.
+
+        :rtype: int
+        :return: 64 bit hash
+        """
+        if getattr(self, '_phash', None) is None:
+            from . import similarity
+
+            self._phash = similarity.media_phash(self)
+        return self._phash
+
+    def thumbnail(self, size=None):
+        """
+        Thumbnail of the image, from the thumbnail cache (see
+        :mod:`cheddar.thumbnails`) or made from the preview embedded in the
+        EXIF data, or by downsampling the image. Requires Pillow.
+
+        :param int size: maximum width and height of the thumbnail
+            (defaults to :data:`cheddar.thumbnails.DEFAULT_SIZE`)
+        :rtype: str
+        :return: path of the JPEG thumbnail, None if the image can not be
+            read
+        """
+        from . import thumbnails
+
+        return thumbnails.build_thumbnails([self], size=size, workers=1)[0]
+
     def open(self):
         """
         Open the file with the default application
@@ -143,29 +381,33 @@ class Media(properties.HasProperties):
 
         utils.open_files([self.filepath])
 
-    def rename(self, newname, verbose=True):
+    def rename(self, newname, verbose=True, resolver=None):
         """
         Rename the media
 
         :param str newname: new filename (excluding path)
         :verbose bool verbose: print information about file changes
+        :param cheddar.utils.NameResolver resolver: names in use in the
+            directory, used (and kept up to date) to avoid name collisions.
+            By default, the filesystem is checked for the candidate names.
         """
 
         # return if current and new names are the same
         if self.name == newname:
             return
 
-        # check if file already named the same, if so, add a -1
-        while os.path.isfile(self.directory + os.path.sep + newname):
-            newname = newname.split(".")
-            if len(newname[-2].split("-")) > 1:
-                nameend = newname[-2].split("-")
-                newname[-2] = "-".join(
-                    nameend[:-1] + ["{}".format(int(nameend[-1]) + 1)]
+        if resolver is None:
+            resolver = utils.NameResolver(
+                exists=lambda name: name != self.name and os.path.lexists(
+                    self.directory + os.path.sep + name
                 )
-            else:
-                newname[-2] += "-1"
-            newname = ".".join(newname)
+            )
+
+        # check if file already named the same, if so, add a -1
+        resolver.discard(self.name)
+        newname = resolver.claim(newname)
+        if self.name == newname:
+            return
 
         newnamefull = self.directory + os.path.sep + newname
 
@@ -176,6 +418,11 @@ class Media(properties.HasProperties):
         # rename file
         os.rename(self.filepath, newnamefull)
 
+        # keep the cached information of the file
+        library_cache = cache.get_cache(self.directory, create=False)
+        if library_cache is not None:
+            library_cache.rename(self.name, newname)
+
         # clear attributes
         [setattr(self, attr, None) for attr in self._clear_on_update]
 
@@ -183,6 +430,17 @@ class Media(properties.HasProperties):
         self.filepath = newnamefull
         return
 
+    def _moved(self, filepath):
+        # the file was renamed by a cheddar.plan.RenamePlan
+        [setattr(self, attr, None) for attr in self._clear_on_update]
+        self.filepath = filepath
+
+    def _changed(self, dir_entry=None):
+        # the file was modified, what was read from it is stale (see
+        # cheddar.Library.refresh)
+        [setattr(self, attr, None) for attr in self._clear_on_update]
+        self._dir_entry = dir_entry
+
     def rename_by_date(
         self,
         lowercase_extension=True,
@@ -193,6 +451,24 @@ class Media(properties.HasProperties):
         """
         rename the photo by date
         """
+        newname = self.filename_by_date(
+            lowercase_extension, timeshift, filename_format
+        )
+        self.rename(newname, verbose)
+
+    def filename_by_date(
+        self,
+        lowercase_extension=True,
+        timeshift=None,
+        filename_format="%Y-%m-%d %H.%M.%S"
+    ):
+        """
+        filename of the media based on the date it was created (see
+        :func:`cheddar.utils.filename_by_date`)
+
+        :rtype: str
+        :return: new filename (excluding path)
+        """
 
         # get file extension
         file_extension = self.file_extension
@@ -200,14 +476,9 @@ class Media(properties.HasProperties):
             file_extension = file_extension.lower()
 
         # fetch new name
-        newname = utils.filename_by_date(
+        return utils.filename_by_date(
             self.datetime,
-            file_extension=self.file_extension.lower(),
+            file_extension=file_extension,
             timeshift=timeshift,
             filename_format=filename_format
         )
-
-        self.rename(newname, verbose)
-
-
-
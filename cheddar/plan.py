@@ -0,0 +1,264 @@
+import json
+import os
+
+from . import cache
+
+JOURNAL = '.cheddar-rename-journal'
+SWAP_PREFIX = '.cheddar-swap-'
+
+
+class RenamePlan(object):
+    """
+    A set of file moves (old path -> new path) that can be inspected and
+    serialized before it is applied.
+
+    .. code:: python
+
+        plan = library.plan_rename_by_date()
+        for source, destination in plan.moves:
+            print(source, destination)
+        plan.apply()
+
+    The moves may swap names or form cycles (e.g. :code:`a -> b` and
+    :code:`b -> a`), :attr:`steps` orders them and moves files aside to a
+    temporary name where needed. :meth:`apply` records its progress in a
+    write-ahead journal, so an interrupted rename can be finished with
+    :meth:`resume` or undone with :meth:`rollback`.
+
+    :param list moves: (source, destination) absolute paths
+    :param list media: optional cheddar.Media object of each move, updated
+        once the plan is applied
+    """
+
+    def __init__(self, moves=None, media=None):
+        self.moves = [tuple(move) for move in (moves or [])]
+        self._media = media
+
+        sources = set(source for source, _ in self.moves)
+        destinations = set(destination for _, destination in self.moves)
+        assert len(sources) == len(self.moves), (
+            "A file can only be moved once in a plan"
+        )
+        assert len(destinations) == len(self.moves), (
+            "Two files can not be moved to the same destination"
+        )
+
+    def __len__(self):
+        return len(self.moves)
+
+    def __iter__(self):
+        return iter(self.moves)
+
+    def to_json(self):
+        """
+        Serialize the plan
+
+        :rtype: str
+        :return: JSON representation of the moves
+        """
+        return json.dumps({"moves": self.moves})
+
+    @classmethod
+    def from_json(cls, text):
+        """
+        Load a plan serialized with :meth:`to_json`
+
+        :param str text: JSON representation of the moves
+        :rtype: cheddar.plan.RenamePlan
+        :return: rename plan
+        """
+        return cls(json.loads(text)["moves"])
+
+    @property
+    def steps(self):
+        """
+        The moves ordered so that no file is overwritten. A move whose
+        destination is still occupied by another file of the plan waits for
+        that file to move first, and cycles are broken by moving one file to
+        a temporary name.
+
+        :rtype: list
+        :return: (source, destination) of each rename, in order
+        """
+        remaining = dict(self.moves)
+        steps = []
+        swaps = 0
+
+        for start, _ in self.moves:
+            if start not in remaining:
+                continue
+
+            # follow the files sitting on each destination. Destinations
+            # are unique, so the chain can only loop back to its start
+            chain = [start]
+            while remaining[chain[-1]] in remaining:
+                if remaining[chain[-1]] == start:
+                    break
+                chain.append(remaining[chain[-1]])
+
+            cycle = remaining[chain[-1]] == start
+            if cycle:
+                swap = _swap_path(start, swaps)
+                swaps += 1
+                steps.append((start, swap))
+                remaining[swap] = remaining.pop(start)
+                chain[0] = swap
+
+            for source in reversed(chain):
+                steps.append((source, remaining.pop(source)))
+
+        return steps
+
+    def _check(self):
+        pending = set(source for source, _ in self.moves)
+        for source, destination in self.moves:
+            assert os.path.lexists(source), (
+                "File {} does not exist".format(source)
+            )
+            assert destination in pending or not os.path.lexists(
+                destination
+            ), "File {} already exists".format(destination)
+
+    def apply(self, journal=None, verbose=True, callback=None):
+        """
+        Rename the files
+
+        :param str journal: path of the write-ahead journal. It is removed
+            once all of the files are renamed
+        :verbose bool verbose: print information about file changes
+        :param function callback: function called with the (source,
+            destination) of each move as soon as it is done, e.g. to report
+            the progress
+        """
+        self._check()
+        steps = self.steps
+
+        if journal is not None:
+            assert not os.path.exists(journal), (
+                "Journal {} exists, resume or rollback the interrupted "
+                "rename first".format(journal)
+            )
+            with open(journal, "w") as f:
+                f.write(json.dumps({"steps": steps}) + "\n")
+                f.flush()
+                os.fsync(f.fileno())
+
+        done = None
+        if callback is not None:
+            # a move is done once its file reaches the destination, after
+            # going through a temporary name if it is in a cycle
+            sources = dict((d, s) for s, d in self.moves)
+
+            def done(step):
+                destination = steps[step][1]
+                if destination in sources:
+                    callback(sources[destination], destination)
+
+        _execute(steps, range(len(steps)), journal, verbose, done)
+        _finish(steps, journal)
+
+        if self._media is not None:
+            for m, (_, destination) in zip(self._media, self.moves):
+                m._moved(destination)
+
+    @staticmethod
+    def resume(journal, verbose=True):
+        """
+        Finish a rename that was interrupted
+
+        :param str journal: path of the journal of the interrupted rename
+        :verbose bool verbose: print information about file changes
+        """
+        steps, done = _read_journal(journal)
+        _execute(
+            steps, [i for i in range(len(steps)) if i not in done],
+            journal, verbose
+        )
+        _finish(steps, journal)
+
+    @staticmethod
+    def rollback(journal, verbose=True):
+        """
+        Undo a rename that was interrupted
+
+        :param str journal: path of the journal of the interrupted rename
+        :verbose bool verbose: print information about file changes
+        """
+        steps, done = _read_journal(journal)
+        for i in reversed(range(len(steps))):
+            source, destination = steps[i]
+            if i in done or (
+                os.path.lexists(destination) and not os.path.lexists(source)
+            ):
+                if verbose is True:
+                    print("renaming {} to {}".format(destination, source))
+                os.rename(destination, source)
+        os.remove(journal)
+
+
+def _swap_path(filepath, count):
+    directory = os.path.dirname(filepath)
+    swap = os.path.join(directory, "{}{}".format(SWAP_PREFIX, count))
+    while os.path.lexists(swap):
+        count += 1
+        swap = os.path.join(directory, "{}{}".format(SWAP_PREFIX, count))
+    return swap
+
+
+def _read_journal(journal):
+    with open(journal) as f:
+        lines = f.read().splitlines()
+    steps = [tuple(step) for step in json.loads(lines[0])["steps"]]
+    done = set()
+    for line in lines[1:]:
+        try:
+            done.add(json.loads(line)["done"])
+        except ValueError:
+            # the last record may have been cut off by the interruption
+            break
+    return steps, done
+
+
+def _execute(steps, indices, journal, verbose, done=None):
+    log = open(journal, "a") if journal is not None else None
+    try:
+        for i in indices:
+            source, destination = steps[i]
+            if not os.path.lexists(source) and os.path.lexists(destination):
+                # renamed before the interruption, but not recorded
+                continue
+
+            if verbose is True:
+                print("renaming {} to {}".format(source, destination))
+            os.rename(source, destination)
+
+            if log is not None:
+                # the record is on disk before the next step, so that a
+                # crash never loses a done step (e.g. of a swap file)
+                log.write(json.dumps({"done": i}) + "\n")
+                log.flush()
+                os.fsync(log.fileno())
+            if done is not None:
+                done(i)
+    finally:
+        if log is not None:
+            log.close()
+
+
+def _finish(steps, journal):
+    # keep the cached information of the renamed files
+    renames = {}
+    for source, destination in steps:
+        directory = os.path.dirname(source)
+        if os.path.dirname(destination) == directory:
+            renames.setdefault(directory, []).append(
+                (os.path.basename(source), os.path.basename(destination))
+            )
+
+    for directory, names in renames.items():
+        library_cache = cache.get_cache(directory, create=False)
+        if library_cache is not None:
+            library_cache.rename_many(names)
+
+    if journal is not None:
+        os.remove(journal)
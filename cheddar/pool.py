@@ -0,0 +1,334 @@
+import atexit
+import contextlib
+import json
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from exiftool import ExifTool
+
+DEFAULT_POOL_SIZE = min(4, multiprocessing.cpu_count())
+
+SENTINEL = b"{ready}"
+BLOCK_SIZE = 4096
+
+# exiftool processes receive a SIGTERM when the thread that started them
+# exits, so they are all started from this long-lived thread
+_spawner = ThreadPoolExecutor(max_workers=1)
+
+
+class _ExifToolProcess(ExifTool):
+    """
+    exiftool instance that raises an IOError, rather than waiting forever,
+    when the process dies while a command is running
+    """
+
+    def execute(self, *params):
+        if not self.running:
+            raise ValueError("ExifTool instance not running.")
+
+        self._process.stdin.write(b"\n".join(params + (b"-execute\n",)))
+        self._process.stdin.flush()
+
+        output = b""
+        fd = self._process.stdout.fileno()
+        while not output[-32:].strip().endswith(SENTINEL):
+            chunk = os.read(fd, BLOCK_SIZE)
+            if not chunk:
+                self.running = False
+                raise IOError("exiftool process exited unexpectedly")
+            output += chunk
+        return output.strip()[:-len(SENTINEL)]
+
+
+class ExifToolPool(object):
+    """
+    A thread-safe pool of long-lived exiftool processes. Each worker is
+    started with ``-stay_open`` so that many requests can be served without
+    spawning a new process per file.
+
+    .. code:: python
+
+        pool = ExifToolPool(size=2)
+        metadata = pool.get_metadata('./IMG_001.jpg')
+        pool.shutdown()
+
+    Workers are started lazily (only once they are needed) and a worker whose
+    process has died is replaced with a fresh one.
+
+    :param int size: maximum number of exiftool processes
+    :param str executable: path to the exiftool executable
+    """
+
+    def __init__(self, size=None, executable=None):
+        if size is None:
+            size = DEFAULT_POOL_SIZE
+        assert size > 0, "Pool size must be positive, not {}".format(size)
+
+        self.size = size
+        self.executable = executable
+
+        self._idle = []
+        self._started = 0
+        self._condition = threading.Condition()
+
+    @property
+    def started(self):
+        """
+        number of exiftool processes currently owned by the pool
+
+        :rtype: int
+        :return: number of workers that have been started
+        """
+        return self._started
+
+    def _spawn(self):
+        worker = _ExifToolProcess(executable_=self.executable)
+        worker.start()
+        return worker
+
+    def _start_worker(self):
+        return _spawner.submit(self._spawn).result()
+
+    @staticmethod
+    def _is_alive(worker):
+        process = getattr(worker, '_process', None)
+        return (
+            worker.running and process is not None and process.poll() is None
+        )
+
+    @staticmethod
+    def _stop_worker(worker):
+        try:
+            worker.terminate()
+        except Exception:
+            # the process is already gone, make sure it is not reused
+            worker.running = False
+
+    def _acquire(self):
+        with self._condition:
+            while not self._idle and self._started >= self.size:
+                self._condition.wait()
+            if self._idle:
+                worker = self._idle.pop()
+                if self._is_alive(worker):
+                    return worker
+                self._stop_worker(worker)
+            else:
+                self._started += 1
+
+        # start the process outside of the lock so that other threads can
+        # keep on using the idle workers
+        try:
+            return self._start_worker()
+        except Exception:
+            self._discard(None)
+            raise
+
+    def _release(self, worker):
+        with self._condition:
+            if self._started > self.size:
+                # the pool was shrunk while the worker was busy
+                self._started -= 1
+                self._stop_worker(worker)
+            else:
+                self._idle.append(worker)
+            self._condition.notify()
+
+    def _discard(self, worker):
+        if worker is not None:
+            self._stop_worker(worker)
+        with self._condition:
+            self._started -= 1
+            self._condition.notify()
+
+    @contextlib.contextmanager
+    def worker(self):
+        """
+        Borrow an exiftool process from the pool
+
+        .. code:: python
+
+            with pool.worker() as et:
+                metadata = et.get_metadata('./IMG_001.jpg')
+
+        :rtype: exiftool.ExifTool
+        :return: a running exiftool instance
+        """
+        worker = self._acquire()
+        try:
+            yield worker
+        except Exception:
+            if self._is_alive(worker):
+                self._release(worker)
+            else:
+                self._discard(worker)
+            raise
+        else:
+            self._release(worker)
+
+    def execute_json(self, *params):
+        """
+        Run exiftool with the given parameters and parse the JSON output.
+        If the exiftool process crashes, the request is retried once on a
+        fresh process.
+
+        :rtype: list
+        :return: list of dictionaries, one per file exiftool could read
+        """
+        params = [os.fsencode(param) for param in params]
+        for attempt in range(2):
+            try:
+                with self.worker() as et:
+                    output = et.execute(b"-j", *params)
+                break
+            except (OSError, IOError):
+                if attempt == 1:
+                    raise
+
+        try:
+            output = output.decode("utf-8")
+        except UnicodeDecodeError:
+            output = output.decode("latin-1")
+        # exiftool prints nothing when none of the files could be read
+        return json.loads(output) if output.strip() else []
+
+    def get_metadata(self, filepath):
+        """
+        Get all of the metadata for a single file
+
+        :param str filepath: path to the file
+        :rtype: dict
+        :return: metadata
+        """
+        return self.execute_json(filepath)[0]
+
+    def get_metadata_batch(self, filepaths):
+        """
+        Get all of the metadata for many files with a single exiftool call
+
+        :param list filepaths: paths to the files
+        :rtype: list
+        :return: metadata dictionaries, in the same order as the filepaths
+        """
+        filepaths = list(filepaths)
+        if len(filepaths) == 0:
+            return []
+        return _match_source_files(filepaths, self.execute_json(*filepaths))
+
+    def get_tags(self, filepath, tags, fast=True):
+        """
+        Get some of the metadata of a single file
+
+        :param str filepath: path to the file
+        :param list tags: exiftool tags (e.g. ``EXIF:Make``)
+        :param bool fast: pass ``-fast2`` to exiftool
+        :rtype: dict
+        :return: metadata
+        """
+        return self.get_tags_batch([filepath], tags, fast=fast)[0]
+
+    def get_tags_batch(self, filepaths, tags, fast=True):
+        """
+        Get some of the metadata of many files with a single exiftool call.
+        Only the requested tags are extracted, and with ``fast`` exiftool
+        does not read the maker notes or look for trailers at the end of the
+        files, which is much cheaper than extracting all of the metadata.
+
+        :param list filepaths: paths to the files
+        :param list tags: exiftool tags (e.g. ``EXIF:Make``)
+        :param bool fast: pass ``-fast2`` to exiftool
+        :rtype: list
+        :return: metadata dictionaries, in the same order as the filepaths
+        """
+        filepaths = list(filepaths)
+        if len(filepaths) == 0:
+            return []
+        params = ["-fast2"] if fast else []
+        params += ["-{}".format(tag) for tag in tags]
+        return _match_source_files(
+            filepaths, self.execute_json(*(params + filepaths))
+        )
+
+    def resize(self, size):
+        """
+        Change the maximum number of exiftool processes. Idle processes
+        beyond the new size are stopped immediately, busy ones once they are
+        returned to the pool.
+
+        :param int size: maximum number of exiftool processes
+        """
+        assert size > 0, "Pool size must be positive, not {}".format(size)
+        with self._condition:
+            self.size = size
+            while self._idle and self._started > self.size:
+                self._stop_worker(self._idle.pop())
+                self._started -= 1
+            self._condition.notify_all()
+
+    def shutdown(self):
+        """
+        Stop all of the idle exiftool processes. The pool can still be used
+        afterwards, workers are restarted as needed.
+        """
+        with self._condition:
+            while self._idle:
+                self._stop_worker(self._idle.pop())
+                self._started -= 1
+
+
+def _match_source_files(filepaths, results):
+    # exiftool skips files it can not read, so line up the results with the
+    # requested paths using the SourceFile it reports
+    by_source = dict(
+        (os.path.normpath(r["SourceFile"]), r) for r in results
+    )
+    return [by_source.get(os.path.normpath(f)) for f in filepaths]
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_pool():
+    """
+    Get the exiftool pool shared by cheddar, creating it if necessary
+
+    :rtype: cheddar.pool.ExifToolPool
+    :return: the shared pool
+    """
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ExifToolPool()
+    return _pool
+
+
+def configure(size=None, executable=None):
+    """
+    Configure the exiftool pool shared by cheddar. Running processes of the
+    previous pool are stopped.
+
+    .. code:: python
+
+        cheddar.pool.configure(size=8)
+
+    :param int size: maximum number of exiftool processes
+    :param str executable: path to the exiftool executable
+    """
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown()
+        _pool = ExifToolPool(size=size, executable=executable)
+
+
+@atexit.register
+def shutdown():
+    """
+    Stop the exiftool processes of the shared pool
+    """
+    if _pool is not None:
+        _pool.shutdown()
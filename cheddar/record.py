@@ -0,0 +1,198 @@
+import os
+import sys
+
+from .media import (
+    CAMERA_MAKE_KEY, CAMERA_MODEL_KEY, MissingDatetimeError, find_datetime,
+    parse_datetime
+)
+
+DATETIME_ORIGINAL_KEY = u"EXIF:DateTimeOriginal"
+FILE_MODIFY_DATE_KEY = u"File:FileModifyDate"
+CREATE_DATE_KEY = u"QuickTime:CreateDate"
+
+# metadata kept by a record, and the slot each key is stored in
+RECORD_KEYS = [
+    (DATETIME_ORIGINAL_KEY, "datetime_original"),
+    (FILE_MODIFY_DATE_KEY, "file_modify_date"),
+    (CREATE_DATE_KEY, "create_date"),
+    (CAMERA_MAKE_KEY, "make"),
+    (CAMERA_MODEL_KEY, "model"),
+]
+
+
+def _intern(value):
+    if value is None:
+        return None
+    return sys.intern(u"{}".format(value))
+
+
+class MediaRecord(object):
+    """
+    Compact, read-only view of a media file for very large libraries. Only
+    the fields cheddar uses are kept (location, size, modification time,
+    datetimes and camera), in slots rather than an instance dictionary, and
+    the directory and camera strings are interned so that they are shared
+    by all of the records.
+
+    .. code:: python
+
+        records = library.records()
+        canon = [r for r in records if r.camera_make == "Canon"]
+
+    A record has the same :attr:`datetime`, :attr:`camera_make` and
+    :attr:`camera_model` as the :class:`cheddar.Media` it was created from.
+
+    :param str directory: directory containing the file
+    :param str name: filename (excluding path)
+    :param int size: file size in bytes
+    :param int mtime_ns: modification time in nanoseconds
+    :param str datetime_original: exiftool EXIF:DateTimeOriginal
+    :param str file_modify_date: exiftool File:FileModifyDate
+    :param str create_date: exiftool QuickTime:CreateDate
+    :param str make: exiftool EXIF:Make
+    :param str model: exiftool EXIF:Model
+    """
+
+    __slots__ = (
+        "directory", "name", "size", "mtime_ns", "datetime_original",
+        "file_modify_date", "create_date", "make", "model"
+    )
+
+    def __init__(
+        self, directory, name, size, mtime_ns, datetime_original=None,
+        file_modify_date=None, create_date=None, make=None, model=None
+    ):
+        values = dict(
+            directory=sys.intern(directory), name=name, size=size,
+            mtime_ns=mtime_ns, datetime_original=datetime_original,
+            file_modify_date=file_modify_date, create_date=create_date,
+            make=_intern(make), model=_intern(model)
+        )
+        for slot in self.__slots__:
+            object.__setattr__(self, slot, values[slot])
+
+    def __setattr__(self, name, value):
+        raise AttributeError("MediaRecord is read-only")
+
+    def __delattr__(self, name):
+        raise AttributeError("MediaRecord is read-only")
+
+    def __repr__(self):
+        return "MediaRecord({!r})".format(self.filepath)
+
+    def __getstate__(self):
+        return tuple(getattr(self, slot) for slot in self.__slots__)
+
+    def __setstate__(self, state):
+        for slot, value in zip(self.__slots__, state):
+            object.__setattr__(self, slot, value)
+
+    @classmethod
+    def from_metadata(cls, filepath, size, mtime_ns, metadata):
+        """
+        Create a record from the metadata of a file
+
+        :param str filepath: path to the file
+        :param int size: file size in bytes
+        :param int mtime_ns: modification time in nanoseconds
+        :param dict metadata: exiftool metadata
+        :rtype: cheddar.record.MediaRecord
+        :return: record of the file
+        """
+        directory, name = os.path.split(filepath)
+        return cls(
+            directory, name, size, mtime_ns, **dict(
+                (slot, metadata.get(key)) for key, slot in RECORD_KEYS
+            )
+        )
+
+    @classmethod
+    def from_media(cls, media):
+        """
+        Create a record from a media
+
+        :param cheddar.Media media: media
+        :rtype: cheddar.record.MediaRecord
+        :return: record of the media
+        """
+        return cls.from_metadata(
+            media.filepath, media.stat.st_size, media.stat.st_mtime_ns,
+            media.tags
+        )
+
+    @property
+    def filepath(self):
+        """
+        path to the file
+
+        :rtype: str
+        :return: path to the file
+        """
+        return os.path.join(self.directory, self.name)
+
+    @property
+    def file_extension(self):
+        """
+        file extension
+
+        :rtype: str
+        :return: file extension
+        """
+        return self.name.split('.')[-1]
+
+    @property
+    def metadata(self):
+        """
+        the metadata kept by the record, under the exiftool keys
+
+        :rtype: dict
+        :return: metadata
+        """
+        return dict(
+            (key, getattr(self, slot)) for key, slot in RECORD_KEYS
+            if getattr(self, slot) is not None
+        )
+
+    @property
+    def datetime(self):
+        """
+        date and time of when the media was created
+
+        :rtype: datetime.datetime
+        :return: datetime object of when the media was created
+        """
+        key, img_datetime = find_datetime(self.metadata)
+        if img_datetime is None:
+            raise MissingDatetimeError(
+                "Could not find datetime info in metadata of {}".format(
+                    self.filepath
+                )
+            )
+        value = parse_datetime(key, img_datetime)
+        if value is None:
+            raise MissingDatetimeError(
+                "Could not parse the {} {} of {}".format(
+                    key, img_datetime, self.filepath
+                )
+            )
+        return value
+
+    @property
+    def camera_make(self):
+        """
+        camera
+
+        :rtype: string
+        :return: camera name
+        """
+        return 'UNKNOWN' if self.make is None else self.make
+
+    @property
+    def camera_model(self):
+        """
+        camera
+
+        :rtype: string
+        :return: camera name
+        """
+        return 'UNKNOWN' if self.model is None else self.model
@@ -0,0 +1,184 @@
+import math
+
+from . import cache
+
+# the image is reduced to PHASH_SIZE * PHASH_FACTOR pixels on a side before
+# its DCT, and the PHASH_SIZE x PHASH_SIZE lowest frequencies form the hash
+PHASH_SIZE = 8
+PHASH_FACTOR = 4
+
+
+def _dct_matrix(n):
+    import numpy as np
+
+    k = np.arange(n)[:, None]
+    i = np.arange(n)[None, :]
+    matrix = np.cos(math.pi * (2 * i + 1) * k / (2.0 * n))
+    matrix[0, :] *= 1.0 / math.sqrt(2)
+    return matrix * math.sqrt(2.0 / n)
+
+
+def phash(filepath):
+    """
+    Perceptual hash of an image: the sign, relative to their median, of the
+    lowest frequencies of the DCT of a small grayscale copy of the image.
+    Similar images (resized, recompressed, slightly edited) have hashes that
+    differ in few bits.
+
+    Requires numpy and Pillow.
+
+    :param str filepath: path to the image
+    :rtype: int
+    :return: 64 bit hash
+    """
+    import numpy as np
+    from PIL import Image
+
+    side = PHASH_SIZE * PHASH_FACTOR
+    image = Image.open(filepath)
+    # let the JPEG decoder downscale, rather than decoding every pixel
+    image.draft("L", (side, side))
+    image = image.convert("L").resize((side, side), Image.BILINEAR)
+
+    pixels = np.asarray(image, dtype=np.float64)
+    dct = _dct_matrix(side)
+    frequencies = dct.dot(pixels).dot(dct.T)[:PHASH_SIZE, :PHASH_SIZE]
+
+    # the DC term is excluded from the median, it only reflects brightness
+    median = np.median(frequencies.ravel()[1:])
+    bits = (frequencies > median).ravel()
+
+    value = 0
+    for bit in bits:
+        value = (value << 1) | int(bit)
+    return value
+
+
+def hamming_distance(hash1, hash2):
+    """
+    Number of bits that differ between two hashes
+
+    :param int hash1: hash
+    :param int hash2: hash
+    :rtype: int
+    :return: distance
+    """
+    return bin(hash1 ^ hash2).count("1")
+
+
+class BKTree(object):
+    """
+    Burkhard-Keller tree of hashes, to find all of the hashes within a
+    hamming distance of a hash without comparing it to every hash
+
+    .. code:: python
+
+        tree = BKTree()
+        tree.add(image1.phash, image1)
+        matches = tree.search(image2.phash, 4)
+    """
+
+    def __init__(self):
+        self._root = None
+        self._size = 0
+
+    def __len__(self):
+        return self._size
+
+    def add(self, value, item=None):
+        """
+        Add a hash to the tree
+
+        :param int value: hash
+        :param item: object stored along with the hash
+        """
+        self._size += 1
+        node = (value, item, {})
+        if self._root is None:
+            self._root = node
+            return
+
+        current = self._root
+        while True:
+            distance = hamming_distance(value, current[0])
+            child = current[2].get(distance)
+            if child is None:
+                current[2][distance] = node
+                return
+            current = child
+
+    def search(self, value, threshold):
+        """
+        Find the hashes within a distance of a hash
+
+        :param int value: hash
+        :param int threshold: maximum hamming distance
+        :rtype: list
+        :return: (distance, hash, item) of each match
+        """
+        if self._root is None:
+            return []
+
+        matches = []
+        candidates = [self._root]
+        while candidates:
+            node_value, node_item, children = candidates.pop()
+            distance = hamming_distance(value, node_value)
+            if distance <= threshold:
+                matches.append((distance, node_value, node_item))
+            # by the triangle inequality, only these subtrees can match
+            for child_distance, child in children.items():
+                if abs(child_distance - distance) <= threshold:
+                    candidates.append(child)
+        return matches
+
+
+def media_phash(media):
+    """
+    Perceptual hash of a media, read from the cache of its directory when
+    the file has not changed
+
+    :param cheddar.Media media: image
+    :rtype: int
+    :return: 64 bit hash
+    """
+    library_cache = cache.get_cache(media.directory)
+    key = (media.name, media.stat.st_size, media.stat.st_mtime_ns)
+
+    if library_cache is not None:
+        cached = library_cache.get_phash(*key)
+        if cached is not None:
+            return cached
+
+    value = phash(media.filepath)
+    if library_cache is not None:
+        library_cache.set_phash_many([key + (value,)])
+    return value
+
+
+def find_similar(media, threshold=4):
+    """
+    Find the pairs of similar images
+
+    .. code:: python
+
+        for image1, image2, distance in find_similar(library.images):
+            print(image1.name, image2.name, distance)
+
+    Each image is searched for in a BK-tree of the images before it, so the
+    images are not all compared with each other.
+
+    :param list media: cheddar Media objects of the images
+    :param int threshold: maximum hamming distance between the perceptual
+        hashes of similar images
+    :rtype: list
+    :return: (media, media, distance) of each pair of similar images
+    """
+    tree = BKTree()
+    pairs = []
+    for m in media:
+        value = m.phash
+        for distance, _, other in tree.search(value, threshold):
+            pairs.append((other, m, distance))
+        tree.add(value, m)
+    return pairs
@@ -0,0 +1,125 @@
+FIELDS = [
+    "name", "path", "extension", "datetime", "camera_make", "camera_model",
+    "size", "width", "height"
+]
+
+# fields read from the metadata of the media
+METADATA_FIELDS = [
+    "datetime", "camera_make", "camera_model", "width", "height"
+]
+
+# fields read from the core tags (see cheddar.Media.tags)
+TAG_FIELDS = ["datetime", "camera_make", "camera_model"]
+
+FORMATS = ["numpy", "pandas", "arrow"]
+
+
+def _column(media, field):
+    if field == "name":
+        return [m.name for m in media]
+    if field == "path":
+        return [m.filepath for m in media]
+    if field == "extension":
+        return [m.file_extension.lower() for m in media]
+    if field == "datetime":
+        return [_datetime(m) for m in media]
+    if field == "camera_make":
+        return [m.camera_make for m in media]
+    if field == "camera_model":
+        return [m.camera_model for m in media]
+    if field == "size":
+        return [m.stat.st_size for m in media]
+    if field in ["width", "height"]:
+        index = 0 if field == "width" else 1
+        return [
+            -1 if m.dimensions is None else m.dimensions[index]
+            for m in media
+        ]
+    raise ValueError(
+        "Unknown field {}, the available fields are {}".format(
+            field, ", ".join(FIELDS)
+        )
+    )
+
+
+def _datetime(media):
+    from .media import MissingDatetimeError
+
+    try:
+        return media.datetime
+    except MissingDatetimeError:
+        return None
+
+
+def _to_numpy(columns, fields):
+    import numpy as np
+
+    dtype = []
+    for field in fields:
+        if field == "datetime":
+            dtype.append((field, "datetime64[s]"))
+        elif field in ["size", "width", "height"]:
+            dtype.append((field, "int64"))
+        else:
+            width = max([len(value) for value in columns[field]] + [1])
+            dtype.append((field, "U{}".format(width)))
+
+    table = np.zeros(len(columns[fields[0]]) if fields else 0, dtype=dtype)
+    for field in fields:
+        values = columns[field]
+        if field == "datetime":
+            values = [
+                np.datetime64("NaT") if value is None else value
+                for value in values
+            ]
+        table[field] = values
+    return table
+
+
+def _to_pandas(columns, fields):
+    import pandas as pd
+
+    return pd.DataFrame(
+        dict((field, columns[field]) for field in fields), columns=fields
+    )
+
+
+def _to_arrow(columns, fields):
+    import pyarrow as pa
+
+    return pa.table([pa.array(columns[field]) for field in fields], fields)
+
+
+def media_table(media, fields=None, format="numpy"):
+    """
+    Columnar table of information about media objects
+
+    .. code:: python
+
+        table = media_table(library.media, fields=["name", "datetime"])
+
+    Missing datetimes are NaT (or null) and unknown dimensions are -1.
+
+    :param list media: cheddar Media objects
+    :param list fields: columns of the table, defaults to all of
+        :data:`FIELDS`
+    :param str format: "numpy" (structured array), "pandas" (DataFrame) or
+        "arrow" (pyarrow Table). numpy, pandas and pyarrow are optional
+        dependencies, only the one that is requested needs to be installed.
+    :return: table with one row per media
+    """
+    if fields is None:
+        fields = FIELDS
+    assert format in FORMATS, (
+        "Unknown format {}, the available formats are {}".format(
+            format, ", ".join(FORMATS)
+        )
+    )
+
+    columns = dict((field, _column(media, field)) for field in fields)
+
+    if format == "numpy":
+        return _to_numpy(columns, fields)
+    if format == "pandas":
+        return _to_pandas(columns, fields)
+    return _to_arrow(columns, fields)
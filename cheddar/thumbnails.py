@@ -0,0 +1,315 @@
+import io
+import os
+import threading
+
+from . import fastread
+
+# thumbnails are stored in this directory, named by the key of the image
+# (see image_key) and their size
+CACHE_DIR = os.path.join(
+    os.environ.get(
+        "XDG_CACHE_HOME", os.path.join(os.path.expanduser("~"), ".cache")
+    ),
+    "cheddar", "thumbnails"
+)
+
+# the least recently used thumbnails are removed beyond this many bytes
+MAX_CACHE_SIZE = 512 * 1024 ** 2
+
+# the size of the preview most cameras embed in the EXIF data of a JPEG
+# (160 x 120), so that the thumbnails of photos are made from their preview
+# by default. Larger thumbnails need the photo to be decoded.
+DEFAULT_SIZE = 160
+
+# transpositions (PIL.Image constants) that undo each EXIF orientation
+ORIENTATIONS = {
+    2: "FLIP_LEFT_RIGHT", 3: "ROTATE_180", 4: "FLIP_TOP_BOTTOM",
+    5: "TRANSPOSE", 6: "ROTATE_270", 7: "TRANSVERSE", 8: "ROTATE_90",
+}
+
+
+def make_thumbnail(filepath, destination, size=DEFAULT_SIZE):
+    """
+    Write a JPEG thumbnail of an image, no larger than size x size pixels.
+    The preview embedded in the EXIF data of a JPEG is used when it is at
+    least that large (typically for sizes up to 160), so the photo is not
+    decoded. Otherwise the photo is decoded at a reduced scale (see
+    :meth:`PIL.Image.Image.draft`) and downsampled.
+
+    Requires Pillow.
+
+    :param str filepath: path to the image
+    :param str destination: path of the thumbnail
+    :param int size: maximum width and height of the thumbnail
+    :rtype: str
+    :return: path of the thumbnail
+    """
+    from PIL import Image, ImageOps
+
+    image = None
+    preview = fastread.read_exif_preview(filepath)
+    if preview is not None:
+        data, orientation = preview
+        candidate = Image.open(io.BytesIO(data))
+        if max(candidate.size) >= size:
+            image = candidate
+            if orientation in ORIENTATIONS:
+                image = image.transpose(
+                    getattr(Image, ORIENTATIONS[orientation])
+                )
+
+    if image is None:
+        image = Image.open(filepath)
+        image.draft("RGB", (size, size))
+        image = ImageOps.exif_transpose(image)
+
+    image = image.convert("RGB")
+    image.thumbnail((size, size))
+
+    # written under a temporary name, so that a thumbnail is never seen half
+    # written by another process
+    partial = "{}.{}.partial".format(destination, os.getpid())
+    image.save(partial, "JPEG", quality=85)
+    os.rename(partial, destination)
+    return destination
+
+
+def _try_make_thumbnail(filepath, destination, size):
+    # a file that can not be read, is not an image or is corrupt does not
+    # stop the others (Pillow raises SyntaxError for some corrupt files)
+    try:
+        return make_thumbnail(filepath, destination, size)
+    except (OSError, ValueError, SyntaxError):
+        return None
+
+
+def image_key(media, partial_hash):
+    """
+    Key of an image in the thumbnail cache: its file size and the hash of
+    its first and last blocks (see :func:`cheddar.duplicates.partial_hash`).
+    Copies of an image share the key, and it survives renames, without
+    reading the whole image.
+
+    :param cheddar.Media media: cheddar Media object of the image
+    :param str partial_hash: partial hash of the image
+    :rtype: str
+    :return: key of the image
+    """
+    return u"{}-{}".format(partial_hash, media.stat.st_size)
+
+
+class ThumbnailCache(object):
+    """
+    Content-addressed cache of thumbnails on disk. A thumbnail is named by
+    the key of its image (see :func:`image_key`), so it is shared by copies
+    of the image and survives renames. When the cache grows beyond
+    ``max_size`` bytes, the least recently used thumbnails are removed.
+
+    .. code:: python
+
+        thumbnails = ThumbnailCache()
+        filepath = thumbnails.lookup(key, size=128)
+
+    :param str directory: directory of the thumbnails
+    :param int max_size: maximum size of the cache, in bytes
+    """
+
+    def __init__(self, directory=None, max_size=None):
+        self.directory = CACHE_DIR if directory is None else directory
+        self.max_size = MAX_CACHE_SIZE if max_size is None else max_size
+        self._size = None
+        self._lock = threading.Lock()
+
+    def path(self, key, size=DEFAULT_SIZE):
+        """
+        Path of the thumbnail of an image
+
+        :param str key: key of the image
+        :param int size: size of the thumbnail
+        :rtype: str
+        :return: path of the thumbnail, which may not exist yet
+        """
+        return os.path.join(
+            self.directory, key[:2], "{}-{}.jpg".format(key, size)
+        )
+
+    def lookup(self, key, size=DEFAULT_SIZE):
+        """
+        Find a thumbnail, and mark it as recently used
+
+        :param str key: key of the image
+        :param int size: size of the thumbnail
+        :rtype: str
+        :return: path of the thumbnail, None if it is not in the cache
+        """
+        filepath = self.path(key, size)
+        try:
+            os.utime(filepath, None)
+        except OSError:
+            return None
+        return filepath
+
+    def prepare(self, key, size=DEFAULT_SIZE):
+        """
+        Create the directory of a thumbnail before it is written
+
+        :param str key: key of the image
+        :param int size: size of the thumbnail
+        :rtype: str
+        :return: path of the thumbnail
+        """
+        filepath = self.path(key, size)
+        directory = os.path.dirname(filepath)
+        if not os.path.isdir(directory):
+            try:
+                os.makedirs(directory)
+            except OSError:
+                # created concurrently
+                pass
+        return filepath
+
+    def _entries(self):
+        entries = []
+        if not os.path.isdir(self.directory):
+            return entries
+        for subdirectory in os.scandir(self.directory):
+            if not subdirectory.is_dir():
+                continue
+            for entry in os.scandir(subdirectory.path):
+                if entry.name.endswith(".jpg"):
+                    stat = entry.stat()
+                    entries.append((stat.st_mtime, stat.st_size, entry.path))
+        return entries
+
+    @property
+    def size(self):
+        """
+        total size of the thumbnails, in bytes
+
+        :rtype: int
+        :return: size of the cache
+        """
+        with self._lock:
+            if self._size is None:
+                self._size = sum(size for _, size, _ in self._entries())
+            return self._size
+
+    def added(self, filepaths):
+        """
+        Account for new thumbnails, and remove the least recently used ones
+        if the cache is too large
+
+        :param list filepaths: paths of the new thumbnails
+        """
+        with self._lock:
+            if self._size is None:
+                # the new thumbnails are counted by the scan
+                self._size = sum(size for _, size, _ in self._entries())
+            else:
+                self._size += sum(os.path.getsize(f) for f in filepaths)
+            if self._size > self.max_size:
+                self._evict()
+
+    def _evict(self):
+        entries = sorted(self._entries())
+        self._size = sum(size for _, size, _ in entries)
+        for _, size, filepath in entries:
+            if self._size <= self.max_size:
+                break
+            try:
+                os.remove(filepath)
+            except OSError:
+                continue
+            self._size -= size
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_cache():
+    """
+    Get the thumbnail cache shared by cheddar, in :data:`CACHE_DIR`
+
+    :rtype: cheddar.thumbnails.ThumbnailCache
+    :return: the shared thumbnail cache
+    """
+    global _cache
+    with _cache_lock:
+        if _cache is None or _cache.directory != CACHE_DIR:
+            _cache = ThumbnailCache()
+        return _cache
+
+
+def build_thumbnails(media, size=DEFAULT_SIZE, workers=None):
+    """
+    Make the thumbnails of images that are not in the cache yet, in a
+    process pool. The images that can not be read do not stop the others,
+    they have no thumbnail.
+
+    .. code:: python
+
+        filepaths = build_thumbnails(library.images, workers=8)
+
+    The images are identified by their size and partial hash (see
+    :func:`image_key`), which is kept in the cache of their directory.
+
+    :param list media: cheddar Media objects of the images
+    :param int size: maximum width and height of the thumbnails (defaults
+        to :data:`DEFAULT_SIZE`)
+    :param int workers: number of processes (defaults to the number of
+        CPUs)
+    :rtype: list
+    :return: path of the thumbnail of each image, None for the images
+        whose thumbnail could not be made
+    """
+    from concurrent.futures import ProcessPoolExecutor
+    # fails here rather than for each image if Pillow is not installed
+    import PIL  # noqa: F401
+    from . import duplicates
+
+    if size is None:
+        size = DEFAULT_SIZE
+
+    thumbnails = get_cache()
+    hashes = duplicates.partial_hashes(media)
+
+    filepaths = []
+    missing = []
+    for m in media:
+        key = image_key(m, hashes[m.filepath])
+        filepath = thumbnails.lookup(key, size)
+        if filepath is None:
+            filepath = thumbnails.prepare(key, size)
+            missing.append((m.filepath, filepath))
+        filepaths.append(filepath)
+
+    # copies of an image need a single thumbnail
+    missing = list(dict((d, s) for s, d in missing).items())
+    if len(missing) == 1 or workers == 1:
+        made = [
+            _try_make_thumbnail(source, destination, size)
+            for destination, source in missing
+        ]
+    elif len(missing) > 1:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            made = list(executor.map(
+                _try_make_thumbnail,
+                [source for _, source in missing],
+                [destination for destination, _ in missing],
+                [size] * len(missing)
+            ))
+    else:
+        made = []
+
+    failed = set(
+        destination for (destination, _), result in zip(missing, made)
+        if result is None
+    )
+    thumbnails.added([
+        destination for destination, _ in missing
+        if destination not in failed
+    ])
+    return [
+        None if filepath in failed else filepath for filepath in filepaths
+    ]
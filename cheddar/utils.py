@@ -1,6 +1,11 @@
-from exiftool import ExifTool
+import collections
 import datetime
+import heapq
 import os
+import re
+import shutil
+
+from . import fastread
 
 
 def get_metadata(filepath):
@@ -12,11 +17,94 @@ def get_metadata(filepath):
         filepath = './IMG_001.jpg'
         metadata = get_metadata(filepath)
 
+    The metadata is read by one of the exiftool processes in the shared
+    pool (see :func:`cheddar.pool.configure`), so no process is spawned per
+    file.
+    """
+    # exiftool is only imported once it is needed
+    from . import pool
+
+    return pool.get_pool().get_metadata(filepath)
+
+
+def get_metadata_batch(filepaths):
+    """
+    Get Exchangeable image file format information from many files with a
+    single exiftool call
+
+    .. code:: python
+
+        filepaths = ['./IMG_001.jpg', './IMG_002.jpg']
+        metadata = get_metadata_batch(filepaths)
+
+    The returned list is in the same order as the filepaths, files that
+    exiftool could not read are ``None``.
+    """
+    from . import pool
+
+    return pool.get_pool().get_metadata_batch(filepaths)
+
+
+def get_tags(filepath, tags, fast=True):
+    """
+    Get some of the metadata of a file, e.g. only its datetimes. Extracting a
+    few tags is much cheaper than extracting all of the metadata.
+
+    .. code:: python
+
+        filepath = './IMG_001.jpg'
+        tags = get_tags(filepath, ['EXIF:Make', 'EXIF:Model'])
+
+    With ``fast``, the datetimes and camera of JPEG, PNG and MP4 files are
+    read in-process (see :func:`cheddar.fastread.read_tags`), and otherwise
+    exiftool is run with ``-fast2``: it does not read the maker notes or
+    look for trailers at the end of the file, which none of the tags
+    cheddar uses are stored in.
     """
-    with ExifTool() as et:
-        metadata = et.get_metadata(filepath)
+    return get_tags_batch([filepath], tags, fast=fast)[0]
 
-    return metadata
+
+def get_tags_batch(filepaths, tags, fast=True):
+    """
+    Get some of the metadata of many files with a single exiftool call (see
+    :func:`get_tags`)
+
+    The returned list is in the same order as the filepaths, files that
+    exiftool could not read are ``None``. Only the files that can not be
+    read in-process are sent to exiftool.
+    """
+    filepaths = list(filepaths)
+    tags = list(tags)
+    results = [None] * len(filepaths)
+    if fast and fastread.supports(tags):
+        results = [fastread.read_tags(f, tags) for f in filepaths]
+
+    missing = [i for i, result in enumerate(results) if result is None]
+    if len(missing) > 0:
+        from . import pool
+
+        extracted = pool.get_pool().get_tags_batch(
+            [filepaths[i] for i in missing], tags, fast=fast
+        )
+        for i, result in zip(missing, extracted):
+            results[i] = result
+    return results
+
+
+def select_tags(metadata, tags):
+    """
+    The subset of some metadata that :func:`get_tags` would have extracted
+
+    :param dict metadata: metadata
+    :param list tags: exiftool tags
+    :rtype: dict
+    :return: metadata
+    """
+    selected = dict(
+        (tag, metadata[tag]) for tag in tags if tag in metadata
+    )
+    selected[u"SourceFile"] = metadata[u"SourceFile"]
+    return selected
 
 
 def filename_by_date(
@@ -55,6 +143,204 @@ def filename_by_date(
     return filename
 
 
+class NameResolver(object):
+    """
+    Assign unique names in a directory. The names in use are kept in memory
+    along with a counter per name, so a clashing name gets a counter
+    appended (e.g. :code:`IMG.jpg`, :code:`IMG-1.jpg`, :code:`IMG-2.jpg`)
+    without probing the filesystem for every candidate.
+
+    .. code:: python
+
+        resolver = NameResolver.from_directory('./banff')
+        newname = resolver.claim('2017-07-16 11.23.57.jpg')
+
+    :param iterable names: names already in use
+    :param str suffix: format of the counter appended to a clashing name
+    :param bool split_extension: add the counter before the file extension
+    :param callable exists: optional check for names that are not in
+        :code:`names`, e.g. :code:`os.path.lexists`, for when listing the
+        whole directory is not worth it
+    """
+
+    def __init__(
+        self, names=(), suffix="-{}", split_extension=True, exists=None
+    ):
+        self.suffix = suffix
+        self.split_extension = split_extension
+        self.exists = exists
+
+        self._names = set(names)
+        self._counters = {}
+
+        prefix, postfix = suffix.split("{}")
+        self._pattern = re.compile(
+            "^(.*)" + re.escape(prefix) + r"(\d+)" + re.escape(postfix) + "$"
+        )
+
+    @classmethod
+    def from_directory(cls, directory, **kwargs):
+        """
+        Create a resolver from a single listing of a directory
+
+        :param str directory: directory
+        :rtype: cheddar.utils.NameResolver
+        :return: resolver with the names in the directory in use
+        """
+        return cls(os.listdir(directory), **kwargs)
+
+    def __contains__(self, name):
+        if name in self._names:
+            return True
+        return self.exists is not None and self.exists(name)
+
+    def add(self, name):
+        """
+        Mark a name as in use
+
+        :param str name: name
+        """
+        self._names.add(name)
+
+    def discard(self, name):
+        """
+        Mark a name as free (e.g. the file was renamed)
+
+        :param str name: name
+        """
+        self._names.discard(name)
+
+    def _split_extension(self, name):
+        if self.split_extension and "." in name:
+            return tuple(name.rsplit(".", 1))
+        return name, None
+
+    def _split(self, name):
+        name, extension = self._split_extension(name)
+
+        match = self._pattern.match(name)
+        if match is None:
+            return name, extension, 0
+        return match.group(1), extension, int(match.group(2))
+
+    def _join(self, base, extension, count):
+        name = base + self.suffix.format(count)
+        if extension is not None:
+            name += "." + extension
+        return name
+
+    def is_variant(self, name, requested):
+        """
+        Whether a name is a requested name, or the requested name with a
+        counter, as :meth:`claim` gives it when the requested name is in use
+        (e.g. :code:`IMG-2.jpg` for :code:`IMG.jpg`)
+
+        :param str name: name
+        :param str requested: requested name
+        :rtype: bool
+        :return: True if the name is a variant of the requested name
+        """
+        if name == requested:
+            return True
+
+        stem, extension = self._split_extension(name)
+        requested_stem, requested_extension = self._split_extension(
+            requested
+        )
+        prefix, postfix = self.suffix.split("{}")
+        if extension != requested_extension or not stem.startswith(
+            requested_stem + prefix
+        ):
+            return False
+        counter = stem[len(requested_stem + prefix):]
+        if postfix:
+            if not counter.endswith(postfix):
+                return False
+            counter = counter[:-len(postfix)]
+        return counter.isdigit() and int(counter) > 0
+
+    def claim(self, name):
+        """
+        Get a unique name, adding a counter if the name is already in use,
+        and mark it as in use
+
+        :param str name: requested name
+        :rtype: str
+        :return: unique name
+        """
+        if name not in self:
+            self.add(name)
+            return name
+
+        base, extension, count = self._split(name)
+        key = (base, extension)
+
+        count = max(count, self._counters.get(key, 0)) + 1
+        while self._join(base, extension, count) in self:
+            count += 1
+        self._counters[key] = count
+
+        name = self._join(base, extension, count)
+        self.add(name)
+        return name
+
+
+def parse_datetimes(values):
+    """
+    Convert many EXIF datetime strings (:code:`YYYY:MM:DD HH:MM:SS`,
+    anything after the seconds such as a timezone is ignored) to a NumPy
+    datetime64 array in one call.
+
+    .. code:: python
+
+        parse_datetimes(['2017:09:14 01:54:30', None])
+
+    Requires numpy.
+
+    :param list values: datetime strings, None where there is no datetime
+    :rtype: numpy.ndarray
+    :return: datetime64[s] array, NaT where there is no (valid) datetime
+    """
+    import numpy as np
+
+    values = list(values)
+    missing = np.array([value is None for value in values], dtype=bool)
+    strings = np.array(
+        [
+            u"1970:01:01 00:00:00" if value is None else value[:19]
+            for value in values
+        ],
+        dtype="U19"
+    ).reshape(-1)
+
+    # swap the separators in place: YYYY-MM-DDTHH:MM:SS
+    codes = strings.view(np.uint32).reshape(-1, 19).copy()
+    codes[:, [4, 7]] = ord(u"-")
+    codes[:, 10] = ord(u"T")
+    strings = codes.view("U19").reshape(-1)
+
+    try:
+        datetimes = strings.astype("datetime64[s]")
+    except ValueError:
+        # some of the values are invalid (e.g. 0000:00:00 00:00:00)
+        datetimes = np.array(
+            [_parse_datetime64(string) for string in strings],
+            dtype="datetime64[s]"
+        )
+
+    datetimes[missing] = np.datetime64("NaT")
+    return datetimes
+
+
+def _parse_datetime64(string):
+    import numpy as np
+
+    try:
+        return np.datetime64(string, "s")
+    except ValueError:
+        return np.datetime64("NaT")
+
+
 def compute_timeshift(media1, media2, delta=None):
     """
     Compute the timeshift between two images
@@ -65,6 +351,129 @@ def compute_timeshift(media1, media2, delta=None):
     return media2.datetime - media1.datetime + delta
 
 
+# largest histogram used to cross-correlate datetimes, coarser bins are used
+# (and the estimate refined afterwards) for longer time spans
+MAX_HISTOGRAM_BINS = 2 ** 20
+
+
+def _seconds(datetimes):
+    import numpy as np
+
+    datetimes = np.asarray(datetimes, dtype="datetime64[s]")
+    return np.sort(datetimes[~np.isnat(datetimes)].astype(np.int64))
+
+
+def _correlate(seconds1, seconds2, resolution, max_shift):
+    # lag (multiple of resolution) maximizing the cross-correlation of the
+    # histograms of both sets of datetimes, computed with an FFT
+    import numpy as np
+
+    origin = min(seconds1[0], seconds2[0])
+    bins1 = (seconds1 - origin) // resolution
+    bins2 = (seconds2 - origin) // resolution
+    nbins = int(max(bins1[-1], bins2[-1])) + 1
+
+    size = 1
+    while size < 2 * nbins:
+        size *= 2
+
+    histogram1 = np.bincount(bins1, minlength=nbins).astype(np.float64)
+    histogram2 = np.bincount(bins2, minlength=nbins).astype(np.float64)
+    correlation = np.fft.irfft(
+        np.fft.rfft(histogram1, size) * np.conj(np.fft.rfft(histogram2, size)),
+        size
+    )
+
+    lags = np.arange(size)
+    lags[lags >= size // 2] -= size
+    if max_shift is not None:
+        correlation[np.abs(lags) * resolution > max_shift] = -np.inf
+    return int(lags[np.argmax(correlation)]) * resolution
+
+
+def _refine(seconds1, seconds2, resolution, window):
+    # lag within +/- window maximizing the number of coinciding bins,
+    # without building a histogram of the whole time span
+    import numpy as np
+
+    bins1, counts1 = np.unique(seconds1 // resolution, return_counts=True)
+    best_lag, best_score = 0, -1
+    for lag in range(-window, window + 1, resolution):
+        bins2, counts2 = np.unique(
+            (seconds2 + lag) // resolution, return_counts=True
+        )
+        _, index1, index2 = np.intersect1d(
+            bins1, bins2, assume_unique=True, return_indices=True
+        )
+        score = np.sum(counts1[index1] * counts2[index2])
+        if score > best_score or (
+            score == best_score and abs(lag) < abs(best_lag)
+        ):
+            best_lag, best_score = lag, score
+    return best_lag
+
+
+def correlate_datetimes(
+    datetimes1, datetimes2, resolution=1, max_shift=None
+):
+    """
+    Estimate the clock offset between two cameras from the datetimes of
+    their media, as the lag that best lines up the shot density of both
+    cameras (cross-correlation of their histograms, computed with an FFT).
+    Requires numpy.
+
+    .. code:: python
+
+        shift = correlate_datetimes(library1.datetimes(), library2.datetimes())
+
+    :param numpy.ndarray datetimes1: datetimes of the first camera
+    :param numpy.ndarray datetimes2: datetimes of the second camera
+    :param int resolution: resolution of the estimate, in seconds
+    :param int max_shift: largest offset considered, in seconds
+    :rtype: int
+    :return: seconds to add to the second datetimes to match the first ones
+    """
+    import numpy as np
+
+    seconds1 = _seconds(datetimes1)
+    seconds2 = _seconds(datetimes2)
+    if len(seconds1) == 0 or len(seconds2) == 0:
+        raise ValueError("Both sets of datetimes need at least one datetime")
+
+    span = max(seconds1[-1], seconds2[-1]) - min(seconds1[0], seconds2[0])
+    coarse = max(resolution, int(np.ceil(span / float(MAX_HISTOGRAM_BINS))))
+    coarse = int(np.ceil(coarse / float(resolution))) * resolution
+
+    shift = _correlate(seconds1, seconds2, coarse, max_shift)
+    if coarse > resolution:
+        shift += _refine(seconds1, seconds2 + shift, resolution, coarse)
+    return shift
+
+
+def estimate_timeshift(library1, library2, resolution=1, max_shift=None):
+    """
+    Estimate the clock offset between the cameras of two libraries shot at
+    the same event (see :func:`correlate_datetimes`)
+
+    .. code:: python
+
+        timeshift = estimate_timeshift(library1, library2)
+        library2.rename_content_by_date(timeshift=timeshift)
+
+    :param cheddar.Library library1: reference library
+    :param cheddar.Library library2: library to synchronize
+    :param int resolution: resolution of the estimate, in seconds
+    :param int max_shift: largest offset considered, in seconds
+    :rtype: dict
+    :return: timeshift to apply to the second library
+    """
+    return {
+        "seconds": correlate_datetimes(
+            library1.datetimes(), library2.datetimes(), resolution, max_shift
+        )
+    }
+
+
 def open_files(filelist):
     system_calls = {
         "darwin": "open",
@@ -89,18 +498,162 @@ def open_files(filelist):
     except Exception:
         raise Exception("Couldn't open {} ".format(files))
 
-# def merge_libraries(
-#     library1,
-#     library2,
-#     destination="./merged",
-#     sync=None,
-#     delta=datetime.timedelta(seconds=-1)
-# ):
 
-#     if sync is not None:
-#         assert type(sync) is list, (
-#             "sync must be a list of media objects (one from library1, the "
-#             "other from library2)"
-#         )
+MERGE_MODES = ["copy", "hardlink", "reflink"]
+
+# ioctl request to clone a file on Linux (btrfs, xfs, ...)
+FICLONE = 0x40049409
+
+
+def _reflink(source, destination):
+    try:
+        import fcntl
+        with open(source, "rb") as src, open(destination, "wb") as dst:
+            fcntl.ioctl(dst.fileno(), FICLONE, src.fileno())
+        shutil.copystat(source, destination)
+    except (ImportError, IOError, OSError):
+        # the filesystem (or platform) can not share the data, copy it
+        shutil.copy2(source, destination)
+
+
+def _transfer(source, destination, mode):
+    if mode == "hardlink":
+        os.link(source, destination)
+    elif mode == "reflink":
+        _reflink(source, destination)
+    else:
+        shutil.copy2(source, destination)
+
+
+def _sorted_stream(index, library, timeshift, verbose):
+    from .media import MissingDatetimeError
+
+    library.load_tags()
+    dated = []
+    for position, media in enumerate(library.media):
+        try:
+            dated.append((media.datetime + timeshift, index, position, media))
+        except MissingDatetimeError:
+            if verbose is True:
+                print("skipping {}, it has no datetime".format(media.filepath))
+    dated.sort(key=lambda item: item[:3])
+    for item in dated:
+        yield item
+
+
+def _library_index(libraries, media):
+    for i, library in enumerate(libraries):
+        if (
+            media.directory == library.directory or
+            media.filepath.startswith(library.directory + os.path.sep)
+        ):
+            return i
+    raise ValueError(
+        "{} is not in any of the libraries".format(media.filepath)
+    )
+
+
+def merge_libraries(
+    libraries,
+    destination="./merged",
+    sync=None,
+    delta=datetime.timedelta(seconds=-1),
+    mode="copy",
+    filename_format="%Y-%m-%d %H.%M.%S",
+    workers=4,
+    verbose=True
+):
+    """
+    Merge the media of several libraries into a destination directory,
+    named by date.
+
+    .. code:: python
+
+        merged = merge_libraries(
+            [library1, library2], destination="./merged",
+            sync=[(library1.media[0], library2.media[3])]
+        )
+
+    The clocks of the cameras are synchronized with pairs of media of the
+    same moment: each pair is (media in the first library, media in another
+    library) and the other library is shifted by the timeshift between them
+    (see :func:`compute_timeshift`). Each library is sorted by (shifted)
+    datetime and the sorted libraries are merged with a heap, so the files
+    are named in chronological order. The files are transferred by a pool of
+    threads while the merge goes on.
+
+    :param list libraries: cheddar Library objects
+    :param str destination: directory the media are merged into (created if
+        it does not exist)
+    :param list sync: (reference media, media) pairs used to synchronize the
+        libraries with the first one
+    :param datetime.timedelta delta: added to the timeshift computed from
+        each sync pair
+    :param str mode: "copy", "hardlink" or "reflink" (copy-on-write clone
+        where the filesystem supports it, copy otherwise)
+    :param str filename_format: format of the new filenames
+    :param int workers: number of concurrent file transfers
+    :verbose bool verbose: print information about file changes
+    :rtype: cheddar.Library
+    :return: library of the destination directory
+    """
+    from concurrent.futures import ThreadPoolExecutor
+    from .library import Library
+
+    assert mode in MERGE_MODES, (
+        "Unknown mode {}, the available modes are {}".format(
+            mode, ", ".join(MERGE_MODES)
+        )
+    )
+
+    if sync is not None:
+        assert type(sync) is list, (
+            "sync must be a list of (reference media, media) pairs, the "
+            "reference media from the first library, the other from the "
+            "library to synchronize"
+        )
+
+    timeshifts = [datetime.timedelta(seconds=0)] * len(libraries)
+    for reference, media in sync or []:
+        assert _library_index(libraries, reference) == 0, (
+            "The reference media must be in the first library"
+        )
+        timeshifts[_library_index(libraries, media)] = compute_timeshift(
+            media, reference, delta
+        )
+
+    if not os.path.isdir(destination):
+        os.makedirs(destination)
+    resolver = NameResolver.from_directory(destination)
+
+    streams = [
+        _sorted_stream(i, library, timeshifts[i], verbose)
+        for i, library in enumerate(libraries)
+    ]
+
+    pending = collections.deque()
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        for media_datetime, _, _, media in heapq.merge(*streams):
+            newname = resolver.claim(
+                filename_by_date(
+                    media_datetime,
+                    file_extension=media.file_extension.lower(),
+                    filename_format=filename_format
+                )
+            )
+            newnamefull = os.path.join(destination, newname)
+
+            if verbose is True:
+                print("{} {} to {}".format(mode, media.filepath, newnamefull))
+
+            # bound the number of queued transfers
+            if len(pending) >= 2 * workers:
+                pending.popleft().result()
+            pending.append(
+                executor.submit(_transfer, media.filepath, newnamefull, mode)
+            )
 
+        while pending:
+            pending.popleft().result()
 
+    return Library(destination)
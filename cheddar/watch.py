@@ -0,0 +1,169 @@
+"""
+Notifications of the changes in directories, with inotify on Linux (see
+:meth:`cheddar.Library.watch`). inotify is called through ctypes, so there
+is no extra dependency.
+"""
+import ctypes
+import ctypes.util
+import errno
+import os
+import select
+import struct
+import sys
+
+IN_MODIFY = 0x00000002
+IN_ATTRIB = 0x00000004
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ISDIR = 0x40000000
+
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+
+# events that change the listing or the content of a directory. IN_MODIFY
+# is left out, a file being written is reported once it is closed.
+WATCH_MASK = (
+    IN_ATTRIB | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE |
+    IN_DELETE | IN_DELETE_SELF | IN_MOVE_SELF
+)
+
+# struct inotify_event: wd, mask, cookie, len, followed by the name
+EVENT = struct.Struct("iIII")
+
+_libc = None
+
+
+def _get_libc():
+    global _libc
+    if _libc is None:
+        _libc = ctypes.CDLL(
+            ctypes.util.find_library("c") or "libc.so.6", use_errno=True
+        )
+    return _libc
+
+
+def available():
+    """
+    Check if inotify can be used on this system
+
+    :rtype: bool
+    :return: True on Linux, when the C library provides inotify
+    """
+    if not sys.platform.startswith("linux"):
+        return False
+    try:
+        return hasattr(_get_libc(), "inotify_init1")
+    except OSError:
+        return False
+
+
+def _check(result):
+    if result < 0:
+        code = ctypes.get_errno()
+        raise OSError(code, os.strerror(code))
+    return result
+
+
+class Inotify(object):
+    """
+    Watch directories with inotify
+
+    .. code:: python
+
+        with Inotify() as inotify:
+            inotify.add_watch(directory)
+            for directory, name, mask in inotify.read(timeout=10):
+                print(directory, name)
+
+    :param int mask: inotify events to watch
+    """
+
+    def __init__(self, mask=WATCH_MASK):
+        self.mask = mask
+        self._watches = {}
+        self.fd = _check(_get_libc().inotify_init1(IN_NONBLOCK | IN_CLOEXEC))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    @property
+    def directories(self):
+        """
+        directories being watched
+
+        :rtype: list
+        :return: paths of the directories
+        """
+        return list(self._watches.values())
+
+    def add_watch(self, directory):
+        """
+        Watch a directory. Watching a directory twice has no effect.
+
+        :param str directory: path of the directory
+        """
+        wd = _check(_get_libc().inotify_add_watch(
+            self.fd, os.fsencode(directory), self.mask
+        ))
+        self._watches[wd] = directory
+
+    def read(self, timeout=None):
+        """
+        Wait for events and read all of the pending ones
+
+        :param float timeout: seconds to wait for an event, None to wait
+            until there is one
+        :rtype: list
+        :return: (directory, name, mask) of each event, the name is empty
+            for the events of the directory itself. The directory is None
+            if the queue overflowed and events were lost.
+        """
+        ready, _, _ = select.select([self.fd], [], [], timeout)
+        if not ready:
+            return []
+
+        events = []
+        while True:
+            try:
+                data = os.read(self.fd, 64 * 1024)
+            except OSError as error:
+                if error.errno in (errno.EAGAIN, errno.EWOULDBLOCK):
+                    return events
+                raise
+
+            position = 0
+            while position < len(data):
+                wd, mask, _, length = EVENT.unpack_from(data, position)
+                position += EVENT.size
+                name = data[position:position + length].rstrip(b"\x00")
+                position += length
+
+                if mask & IN_Q_OVERFLOW:
+                    events.append((None, "", mask))
+                    continue
+                directory = self._watches.get(wd)
+                if mask & IN_IGNORED:
+                    # the directory was removed or is no longer watched
+                    self._watches.pop(wd, None)
+                    continue
+                if directory is not None:
+                    events.append((directory, os.fsdecode(name), mask))
+
+    def close(self):
+        """
+        Stop watching
+        """
+        if self.fd is not None:
+            os.close(self.fd)
+            self.fd = None
+            self._watches = {}
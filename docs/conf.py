@@ -90,7 +90,7 @@ try:
     html_theme = 'sphinx_rtd_theme'
     html_theme_path = [sphinx_rtd_theme.get_html_theme_path()]
     pass
-except Exception, e:
+except Exception:
     html_theme = 'default'
 
 # Theme options are theme-specific and customize the look and feel of a theme
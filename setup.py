@@ -6,8 +6,7 @@ EM examples is a set up utility codes and jupyter notebooks
 that accompany the web-resource http://em.geosci.xyz
 """
 
-from distutils.core import setup
-from setuptools import find_packages
+from setuptools import setup, find_packages
 
 
 CLASSIFIERS = [
@@ -15,6 +14,10 @@ CLASSIFIERS = [
     'Intended Audience :: Developers',
     'License :: OSI Approved :: MIT License',
     'Programming Language :: Python',
+    'Programming Language :: Python :: 3',
+    'Programming Language :: Python :: 3 :: Only',
+    'Programming Language :: Python :: 3.7',
+    'Programming Language :: Python :: 3.8',
     'Operating System :: Microsoft :: Windows',
     'Operating System :: POSIX',
     'Operating System :: Unix',
@@ -29,12 +32,23 @@ setup(
     name = 'cheddar',
     version = '0.0.1',
     packages = find_packages(),
+    python_requires = '>=3.7',
     install_requires = [
         'future',
         'datetime',
         'parse',
         'properties'
     ],
+    entry_points = {
+        'console_scripts': ['cheddar = cheddar.cli:main'],
+    },
+    extras_require = {
+        'numpy': ['numpy'],
+        'pandas': ['pandas'],
+        'arrow': ['pyarrow'],
+        'images': ['numpy', 'Pillow'],
+        'benchmarks': ['pytest', 'pytest-benchmark'],
+    },
     author = 'Lindsey Heagy',
     author_email = 'lindseyheagy@gmail.com',
     description = 'cheddar',
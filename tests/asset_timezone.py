@@ -0,0 +1,31 @@
+"""
+The datetimes the asset tests expect are the modification times of the
+assets, which cheddar reads in local time, in the timezone the tests were
+written in. The test modules import :func:`setUpModule` and
+:func:`tearDownModule` to run in that timezone.
+"""
+import os
+import time
+
+import cheddar
+
+TIMEZONE = "America/Edmonton"
+_timezone = None
+
+
+def setUpModule():
+    global _timezone
+    _timezone = os.environ.get("TZ")
+    os.environ["TZ"] = TIMEZONE
+    time.tzset()
+    # exiftool processes report the times in the timezone they started in
+    cheddar.pool.configure()
+
+
+def tearDownModule():
+    if _timezone is None:
+        del os.environ["TZ"]
+    else:
+        os.environ["TZ"] = _timezone
+    time.tzset()
+    cheddar.pool.configure()
@@ -0,0 +1,122 @@
+import asyncio
+import unittest
+import os
+import shutil
+import tarfile
+import tempfile
+import threading
+
+import cheddar
+
+ASSET_TAR = (
+    os.path.dirname(os.path.abspath( __file__ )) + os.path.sep +
+    "assets.tar.gz"
+)
+ASSET_DIR = '.'.join(ASSET_TAR.split('.')[:-2])
+
+
+class TestAsyncAPI(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        tar = tarfile.open(ASSET_TAR, 'r')
+        tar.extractall(os.path.sep.join(ASSET_DIR.split(os.path.sep)[:-1]))
+        tar.close()
+
+    def setUp(self):
+        # make sure exiftool is called rather than the directory caches
+        cheddar.cache.ENABLED = False
+
+    def tearDown(self):
+        cheddar.cache.ENABLED = True
+
+    def test_pool(self):
+        filepaths = [
+            os.path.sep.join([ASSET_DIR, "banff", "rundle.png"]),
+            os.path.sep.join([ASSET_DIR, "banff", "missing.png"]),
+        ]
+
+        async def run():
+            pool = cheddar.aio.AsyncExifToolPool(size=1)
+            results = await asyncio.gather(
+                pool.get_metadata_batch(filepaths),
+                pool.get_metadata(filepaths[0])
+            )
+            assert len(pool._idle) == 1
+            await pool.shutdown()
+            return results
+
+        batch, metadata = asyncio.run(run())
+        assert batch[0]["SourceFile"] == filepaths[0]
+        assert batch[1] is None
+        assert metadata == batch[0]
+
+    def test_library_aload(self):
+        directories = [
+            ASSET_DIR + os.path.sep + "banff",
+            ASSET_DIR + os.path.sep + os.path.sep.join(
+                ["windmill", "library1"]
+            ),
+        ]
+
+        async def run():
+            libraries = [cheddar.Library(directory=d) for d in directories]
+            names = [
+                [m.name async for m in library.aiter_media(chunk_size=1)]
+                for library in libraries
+            ]
+            media = await asyncio.gather(*[
+                library.aload(batch_size=1) for library in libraries
+            ])
+            video = cheddar.Media(
+                filepath=directories[1] + os.path.sep +
+                "2017-09-14 01.54.30.mp4"
+            )
+            await video.ametadata()
+            await cheddar.aio.get_pool().shutdown()
+            return names, media, video
+
+        names, media, video = asyncio.run(run())
+        for directory, library_names, library_media in zip(
+            directories, names, media
+        ):
+            library = cheddar.Library(directory=directory)
+            assert library_names == library.media_names
+            assert [m.name for m in library_media] == library.media_names
+            for m, expected in zip(library_media, library.media):
+                assert m._metadata == expected.metadata
+
+        assert video._metadata == cheddar.utils.get_metadata(video.filepath)
+
+    def test_ametadata_cache(self):
+        # the directory cache is read and written off the event loop
+        cheddar.cache.ENABLED = True
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        self.addCleanup(cheddar.cache.close_cache, directory)
+        filepath = os.path.join(directory, "rundle.png")
+        shutil.copy2(
+            os.path.sep.join([ASSET_DIR, "banff", "rundle.png"]), filepath
+        )
+        get_cache = cheddar.cache.get_cache
+        threads = []
+
+        def get_cache_in_thread(*args, **kwargs):
+            threads.append(threading.current_thread())
+            return get_cache(*args, **kwargs)
+
+        async def run():
+            media = cheddar.Media(filepath=filepath)
+            metadata = await media.ametadata()
+            await cheddar.aio.get_pool().shutdown()
+            return metadata
+
+        cheddar.cache.get_cache = get_cache_in_thread
+        try:
+            metadata = asyncio.run(run())
+        finally:
+            cheddar.cache.get_cache = get_cache
+
+        assert metadata == cheddar.utils.get_metadata(filepath)
+        assert len(threads) > 0
+        assert threading.main_thread() not in threads
@@ -0,0 +1,111 @@
+import unittest
+import io
+import json
+import os
+import tarfile
+import shutil
+import tempfile
+
+import cheddar.cli
+
+# the asset tests run in the timezone their datetimes were written in
+from asset_timezone import setUpModule, tearDownModule  # noqa: F401
+
+ASSET_TAR = (
+    os.path.dirname(os.path.abspath(__file__)) + os.path.sep +
+    "assets.tar.gz"
+)
+
+
+class TestCli(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        tar = tarfile.open(ASSET_TAR, 'r')
+        tar.extractall(self.directory)
+        tar.close()
+        self.banff = os.path.join(self.directory, "assets", "banff")
+        self.windmill = os.path.join(
+            self.directory, "assets", "windmill", "library1"
+        )
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def run_command(self, *argv):
+        stream = io.StringIO()
+        status = cheddar.cli.main(list(argv), stream=stream)
+        lines = [json.loads(line) for line in stream.getvalue().splitlines()]
+        return status, lines
+
+    def events(self, lines, event):
+        return [line for line in lines if line["event"] == event]
+
+    def test_scan(self):
+        status, lines = self.run_command(
+            "scan", "--jobs", "2", self.banff, self.windmill
+        )
+        assert status == 0
+        media = self.events(lines, "media")
+        assert sorted(os.path.basename(m["path"]) for m in media) == [
+            "2017-09-14 01.34.21.jpg", "2017-09-14 01.54.30.mp4",
+            "kananaskis.jpg", "rundle.png"
+        ]
+        assert all(m["datetime"] is not None for m in media)
+        progress = self.events(lines, "progress")
+        assert sorted(p["done"] for p in progress) == [1, 2]
+        assert all(p["total"] == 2 for p in progress)
+
+    def test_rename_by_date(self):
+        status, lines = self.run_command(
+            "rename-by-date", "--dry-run", self.banff
+        )
+        assert status == 0
+        renames = self.events(lines, "rename")
+        assert len(renames) == 2
+        assert not any(r["applied"] for r in renames)
+        assert sorted(os.listdir(self.banff)) == [
+            ".cheddar", "kananaskis.jpg", "rundle.png"
+        ]
+
+        status, lines = self.run_command("rename-by-date", self.banff)
+        assert status == 0
+        renames = self.events(lines, "rename")
+        assert len(renames) == 2
+        assert all(r["applied"] for r in renames)
+        # the renames are written before the library is reported done
+        assert lines[-1]["event"] == "progress"
+        assert sorted(os.listdir(self.banff)) == [
+            ".cheddar", "2016-10-31 21.04.57.png", "2017-07-16 11.23.57.jpg"
+        ]
+
+    def test_dedupe(self):
+        shutil.copy2(
+            os.path.join(self.banff, "rundle.png"),
+            os.path.join(self.windmill, "copy.png")
+        )
+        status, lines = self.run_command("dedupe", self.banff, self.windmill)
+        assert status == 0
+        progress = self.events(lines, "progress")
+        assert sorted(p["done"] for p in progress) == [1, 2]
+        duplicates = [
+            sorted(os.path.basename(p) for p in line["paths"])
+            for line in self.events(lines, "duplicates")
+        ]
+        assert ["copy.png", "rundle.png"] in duplicates
+
+    def test_stats(self):
+        status, lines = self.run_command("stats", self.windmill)
+        assert status == 0
+        stats, = self.events(lines, "stats")
+        assert stats["media"] == 2
+        assert stats["images"] == 1
+        assert stats["videos"] == 1
+        assert stats["first"] < stats["last"]
+        assert sum(stats["cameras"].values()) == 2
+
+    def test_errors(self):
+        self.assertRaises(
+            SystemExit, cheddar.cli.main, ["scan", self.banff + "-missing"]
+        )
+        self.assertRaises(SystemExit, cheddar.cli.main, ["resize"])
@@ -0,0 +1,71 @@
+import unittest
+import os
+import tarfile
+import shutil
+import tempfile
+
+import cheddar
+
+# the asset tests run in the timezone their datetimes were written in
+from asset_timezone import setUpModule, tearDownModule  # noqa: F401
+
+ASSET_TAR = (
+    os.path.dirname(os.path.abspath(__file__)) + os.path.sep +
+    "assets.tar.gz"
+)
+
+
+class TestLibraryCollection(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        tar = tarfile.open(ASSET_TAR, 'r')
+        tar.extractall(self.directory)
+        tar.close()
+        self.banff = os.path.join(self.directory, "assets", "banff")
+        self.windmill = os.path.join(
+            self.directory, "assets", "windmill", "library1"
+        )
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_collection(self):
+        collection = cheddar.LibraryCollection([self.banff, self.windmill])
+        banff, windmill = collection.libraries
+
+        assert collection.media == banff.media + windmill.media
+        assert collection.images == banff.images + windmill.images
+        assert collection.videos == windmill.videos
+        assert list(collection.devices.values()) == [[banff, windmill]]
+
+        collection.load_tags()
+        assert all(m._tags is not None for m in collection.media)
+        assert collection.media_by_camera("no such camera") == []
+
+        self.assertRaises(
+            Exception, cheddar.LibraryCollection, [self.banff, banff]
+        )
+
+    def test_map(self):
+        collection = cheddar.LibraryCollection([self.banff, self.windmill])
+        banff, windmill = collection.libraries
+
+        # libraries on different devices are handled concurrently, the
+        # results are in collection order
+        collection._devices = {"sda": [windmill], "sdb": [banff]}
+        assert collection.map(lambda library: library.name) == [
+            "banff", "library1"
+        ]
+
+    def test_rename_content_by_date(self):
+        collection = cheddar.LibraryCollection([self.banff, self.windmill])
+        collection.rename_content_by_date(verbose=False)
+
+        assert sorted(os.listdir(self.banff)) == [
+            ".cheddar", "2016-10-31 21.04.57.png", "2017-07-16 11.23.57.jpg"
+        ]
+        assert [m.name for m in collection.media] == [
+            m.name for library in collection.libraries
+            for m in library.media
+        ]
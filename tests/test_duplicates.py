@@ -0,0 +1,61 @@
+import unittest
+import os
+import shutil
+import tempfile
+
+import cheddar
+
+
+class TestFindDuplicates(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        os.mkdir(self.get_path("library1"))
+        os.mkdir(self.get_path("library2"))
+
+        block = b"x" * cheddar.duplicates.PARTIAL_BLOCK_SIZE
+        contents = {
+            "library1/a.jpg": block * 3,
+            "library1/b.jpg": block * 3,
+            "library2/c.jpg": block * 3,
+            # same size, start and end as the others, different middle
+            "library2/d.jpg": block + b"y" * len(block) + block,
+            "library2/e.png": b"different size",
+        }
+        for name, content in contents.items():
+            with open(self.get_path(name), "wb") as f:
+                f.write(content)
+
+    def get_path(self, name):
+        return os.path.sep.join([self.directory] + name.split("/"))
+
+    def test_find_duplicates(self):
+        libraries = [
+            cheddar.Library(self.get_path("library1")),
+            cheddar.Library(self.get_path("library2")),
+        ]
+
+        groups = cheddar.duplicates.find_duplicates(libraries)
+        assert len(groups) == 1
+        assert sorted(m.name for m in groups[0]) == [
+            "a.jpg", "b.jpg", "c.jpg"
+        ]
+
+        # the hashes are cached next to the media
+        library_cache = cheddar.cache.get_cache(self.get_path("library2"))
+        media = libraries[1].get_media("d.jpg")
+        partial, full = library_cache.get_hashes_many([
+            (media.name, media.stat.st_size, media.stat.st_mtime_ns)
+        ])["d.jpg"]
+        assert partial == cheddar.duplicates.partial_hash(media.filepath)
+        assert full == cheddar.duplicates.full_hash(media.filepath)
+
+        groups = cheddar.duplicates.find_duplicates(libraries)
+        assert len(groups) == 1
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,225 @@
+import unittest
+import binascii
+import datetime
+import os
+import shutil
+import struct
+import tempfile
+import time
+import zlib
+
+import cheddar
+
+
+def tiff(make, model, datetime_original, endian="<"):
+    # TIFF header, IFD0 with Make, Model and the EXIF IFD pointer, then the
+    # EXIF IFD with DateTimeOriginal. Strings are stored after the IFDs
+    strings = [make, model, datetime_original]
+    strings = [s.encode("ascii") + b"\x00" for s in strings]
+
+    ifd0 = 8
+    exif_ifd = ifd0 + 2 + 3 * 12 + 4
+    data_start = exif_ifd + 2 + 12 + 4
+    offsets = [data_start]
+    for s in strings[:-1]:
+        offsets.append(offsets[-1] + len(s))
+
+    order = b"II" if endian == "<" else b"MM"
+    data = order + struct.pack(endian + "HI", 42, ifd0)
+    entry = endian + "HHII"
+    data += struct.pack(endian + "H", 3)
+    data += struct.pack(entry, 0x010f, 2, len(strings[0]), offsets[0])
+    data += struct.pack(entry, 0x0110, 2, len(strings[1]), offsets[1])
+    data += struct.pack(entry, 0x8769, 4, 1, exif_ifd)
+    data += struct.pack(endian + "I", 0)
+    data += struct.pack(endian + "H", 1)
+    data += struct.pack(entry, 0x9003, 2, len(strings[2]), offsets[2])
+    data += struct.pack(endian + "I", 0)
+    return data + b"".join(strings)
+
+
+def png_chunk(kind, data):
+    return struct.pack(">I4s", len(data), kind) + data + b"\x00" * 4
+
+
+def box(kind, data):
+    return struct.pack(">I4s", 8 + len(data), kind) + data
+
+
+class TestFastRead(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def write(self, name, data):
+        filepath = os.path.join(self.directory, name)
+        with open(filepath, "wb") as f:
+            f.write(data)
+        return filepath
+
+    def assert_tags(self, filepath):
+        tags = cheddar.fastread.read_tags(filepath)
+        assert tags[u"SourceFile"] == filepath
+        assert tags[u"EXIF:Make"] == u"Canon"
+        assert tags[u"EXIF:Model"] == u"Canon EOS 80D"
+        assert tags[u"EXIF:DateTimeOriginal"] == u"2017:09:14 01:34:21"
+        assert u"File:FileModifyDate" in tags
+
+    def test_jpeg(self):
+        for endian in ["<", ">"]:
+            exif = b"Exif\x00\x00" + tiff(
+                "Canon", "Canon EOS 80D", "2017:09:14 01:34:21", endian
+            )
+            filepath = self.write("IMG_001.jpg", (
+                b"\xff\xd8" +
+                b"\xff\xe0" + struct.pack(">H", 6) + b"JFIF" +
+                b"\xff\xe1" + struct.pack(">H", 2 + len(exif)) + exif +
+                b"\xff\xda" + b"\x00" * 16 + b"\xff\xd9"
+            ))
+            self.assert_tags(filepath)
+
+    def test_png(self):
+        exif = tiff("Canon", "Canon EOS 80D", "2017:09:14 01:34:21")
+        # the way ImageMagick stores EXIF in a PNG
+        profile = (
+            b"Raw profile type exif\x00\nexif\n" +
+            "{:8d}\n".format(len(exif)).encode("ascii") +
+            binascii.hexlify(exif) + b"\n"
+        )
+        keyword, _, text = profile.partition(b"\x00")
+        chunks = [
+            png_chunk(b"eXIf", exif),
+            png_chunk(b"tEXt", profile),
+            # exiftool and ImageMagick compress the profile
+            png_chunk(
+                b"zTXt", keyword + b"\x00\x00" + zlib.compress(text)
+            ),
+            png_chunk(
+                b"iTXt", keyword + b"\x00\x01\x00en\x00\x00" +
+                zlib.compress(text)
+            ),
+            png_chunk(b"iTXt", keyword + b"\x00\x00\x00\x00\x00" + text),
+        ]
+        header = b"\x89PNG\r\n\x1a\n" + png_chunk(b"IHDR", b"\x00" * 13)
+        footer = png_chunk(b"IDAT", b"\x00") + png_chunk(b"IEND", b"")
+        for chunk in chunks:
+            filepath = self.write("IMG_001.png", header + chunk + footer)
+            self.assert_tags(filepath)
+
+        # a profile that can not be decoded is left to exiftool
+        for chunk in [
+            png_chunk(b"zTXt", keyword + b"\x00\x00" + text),
+            png_chunk(b"zTXt", keyword + b"\x00\x01" + zlib.compress(text)),
+        ]:
+            filepath = self.write("IMG_001.png", header + chunk + footer)
+            assert cheddar.fastread.read_tags(filepath) is None
+
+    def test_mp4(self):
+        seconds = int((
+            datetime.datetime(2017, 9, 14, 1, 54, 30) -
+            datetime.datetime(1904, 1, 1)
+        ).total_seconds())
+        mvhd = box(b"mvhd", struct.pack(">B3xII", 0, seconds, seconds))
+        filepath = self.write("VID_001.mp4", (
+            box(b"ftyp", b"isom\x00\x00\x02\x00") +
+            box(b"mdat", b"\x00" * 32) +
+            box(b"moov", mvhd)
+        ))
+        tags = cheddar.fastread.read_tags(filepath)
+        assert tags[u"QuickTime:CreateDate"] == u"2017:09:14 01:54:30"
+        assert u"EXIF:Make" not in tags
+
+        # the video is dated by its CreateDate, as exiftool reports it,
+        # rather than by when the file was modified
+        os.utime(filepath, (1505374461, 1505374461))
+        cheddar.cache.ENABLED = False
+        try:
+            assert cheddar.Media(filepath).datetime == (
+                datetime.datetime(2017, 9, 14, 1, 54, 30)
+            )
+
+            # a video without a CreateDate falls back to the FileModifyDate
+            mvhd = box(b"mvhd", struct.pack(">B3xII", 0, 0, 0))
+            filepath = self.write("VID_002.mp4", (
+                box(b"ftyp", b"isom\x00\x00\x02\x00") + box(b"moov", mvhd)
+            ))
+            os.utime(filepath, (1505374461, 1505374461))
+            assert cheddar.Media(filepath).datetime == (
+                datetime.datetime.fromtimestamp(1505374461)
+            )
+        finally:
+            cheddar.cache.ENABLED = True
+
+    def test_file_modify_date(self):
+        filepath = self.write("IMG_001.jpg", b"\xff\xd8\xff\xd9")
+        os.utime(filepath, (1505374461, 1505374461))
+        tags = cheddar.fastread.read_tags(filepath)
+        key, value = cheddar.media.find_datetime(tags)
+        assert key == u"File:FileModifyDate"
+        assert cheddar.media.parse_datetime(key, value) == (
+            datetime.datetime.fromtimestamp(1505374461)
+        )
+
+        cheddar.cache.ENABLED = False
+        try:
+            assert cheddar.Media(filepath).datetime == (
+                datetime.datetime.fromtimestamp(1505374461)
+            )
+        finally:
+            cheddar.cache.ENABLED = True
+
+    @unittest.skipUnless(hasattr(time, "tzset"), "requires time.tzset")
+    def test_file_modify_date_timezones(self):
+        filepath = self.write("IMG_001.jpg", b"\xff\xd8\xff\xd9")
+        os.utime(filepath, (1505374461, 1505374461))
+
+        timezone = os.environ.get("TZ")
+        cheddar.cache.ENABLED = False
+        try:
+            # east and west of UTC, and UTC
+            for name, offset in [
+                ("Asia/Tokyo", "+09:00"), ("America/Edmonton", "-06:00"),
+                ("UTC", "+00:00")
+            ]:
+                os.environ["TZ"] = name
+                time.tzset()
+                value = cheddar.fastread.read_tags(filepath)[
+                    u"File:FileModifyDate"
+                ]
+                assert value.endswith(offset)
+                assert cheddar.Media(filepath).datetime == (
+                    datetime.datetime.fromtimestamp(1505374461)
+                )
+        finally:
+            if timezone is None:
+                del os.environ["TZ"]
+            else:
+                os.environ["TZ"] = timezone
+            time.tzset()
+            cheddar.cache.ENABLED = True
+
+    def test_parse_datetime(self):
+        key = u"File:FileModifyDate"
+        expected = datetime.datetime(2017, 9, 14, 1, 34, 21)
+        for value in [
+            u"2017:09:14 01:34:21+09:00", u"2017:09:14 01:34:21-06:00",
+            u"2017:09:14 01:34:21Z", u"2017:09:14 01:34:21"
+        ]:
+            assert cheddar.media.parse_datetime(key, value) == expected
+        assert cheddar.media.parse_datetime(
+            u"EXIF:DateTimeOriginal", u"0000:00:00 00:00:00"
+        ) is None
+
+        media = cheddar.Media(self.write("IMG_001.jpg", b""))
+        media._tags = {u"EXIF:DateTimeOriginal": u"0000:00:00 00:00:00"}
+        with self.assertRaises(cheddar.media.MissingDatetimeError):
+            media.datetime
+
+    def test_fallback(self):
+        for data in [b"", b"not a media file", b"\xff\xd8\xff\xe1\x00"]:
+            filepath = self.write("IMG_001.jpg", data)
+            assert cheddar.fastread.read_tags(filepath) is None
+        assert not cheddar.fastread.supports([u"EXIF:ISO"])
@@ -0,0 +1,53 @@
+import unittest
+import subprocess
+import sys
+
+import cheddar
+
+# modules that are slow to import, and only needed by some of cheddar
+HEAVY_MODULES = [
+    "asyncio", "exiftool", "numpy", "parse", "properties", "sqlite3"
+]
+
+# submodules only needed by some of the methods of the media and libraries
+DEFERRED_MODULES = [
+    "cheddar.index", "cheddar.plan", "cheddar.record", "cheddar.similarity",
+    "cheddar.table", "cheddar.thumbnails"
+]
+
+
+def imported_modules(statement, modules=HEAVY_MODULES):
+    # modules imported by a statement, in a fresh interpreter
+    output = subprocess.check_output([
+        sys.executable, "-c",
+        "import sys\n{}\nprint(' '.join(sorted(sys.modules)))".format(
+            statement
+        )
+    ])
+    imported = output.decode().split()
+    return [m for m in modules if m in imported]
+
+
+class TestInit(unittest.TestCase):
+
+    def test_lazy_attributes(self):
+        assert cheddar.Library is cheddar.library.Library
+        assert cheddar.Media is cheddar.media.Media
+        assert cheddar.LibraryCollection is (
+            cheddar.collection.LibraryCollection
+        )
+        assert "Library" in dir(cheddar)
+        assert "utils" in dir(cheddar)
+        self.assertRaises(AttributeError, getattr, cheddar, "missing")
+
+    def test_import_is_lazy(self):
+        assert imported_modules("import cheddar") == []
+        assert imported_modules(
+            "import cheddar.utils; cheddar.utils.filename_by_date"
+        ) == []
+        assert imported_modules("import cheddar.cli") == []
+        assert "properties" in imported_modules("import cheddar; cheddar.Library")
+        assert imported_modules(
+            "import cheddar; cheddar.Library; cheddar.LibraryCollection",
+            DEFERRED_MODULES
+        ) == []
@@ -2,10 +2,14 @@ import unittest
 import os
 import tarfile
 import shutil
+import tempfile
 import datetime
 
 import cheddar
 
+# the asset tests run in the timezone their datetimes were written in
+from asset_timezone import setUpModule, tearDownModule  # noqa: F401
+
 ASSET_TAR = (
     os.path.dirname(os.path.abspath( __file__ )) + os.path.sep +
     "assets.tar.gz"
@@ -64,6 +68,201 @@ class TestMediaAttributes(unittest.TestCase):
 
         )
 
+    def test_library_recursive(self):
+        library = cheddar.Library(
+            directory=ASSET_DIR + os.path.sep + "windmill",
+            recursive=True,
+            include=["library1/*"]
+        )
+
+        assert (
+            sorted(library.media_names) ==
+            sorted(["2017-09-14 01.34.21.jpg", "2017-09-14 01.54.30.mp4"])
+        )
+        assert library.video_names == ["2017-09-14 01.54.30.mp4"]
+
+        assert [
+            m.name for m in library.iter_media(include=["library1/*.mp4"])
+        ] == ["2017-09-14 01.54.30.mp4"]
+        assert all(
+            m.directory != library.directory + os.path.sep + "library1"
+            for m in library.iter_media(include=[], exclude=["library1"])
+        )
+
+        # the metadata is cached in the directory of each media
+        for _ in range(2):
+            library = cheddar.Library(
+                directory=ASSET_DIR + os.path.sep + "windmill",
+                recursive=True
+            )
+            library.load_metadata()
+            for m in library.media:
+                assert m.metadata["SourceFile"] == m.filepath
+
+    def test_load_metadata(self):
+        library = cheddar.Library(
+            directory=ASSET_DIR + os.path.sep + "banff"
+        )
+
+        library.load_metadata(batch_size=1)
+        for m in library.media:
+            assert m._metadata is not None
+            assert m._metadata["SourceFile"] == m.filepath
+
+        metadata = cheddar.utils.get_metadata_batch(
+            [m.filepath for m in library.media]
+        )
+        assert [md["SourceFile"] for md in metadata] == [
+            m.filepath for m in library.media
+        ]
+
+    def test_library_indexes(self):
+        library = cheddar.Library(
+            directory=(
+                ASSET_DIR + os.path.sep +
+                os.path.sep.join(["windmill", "library1"])
+            )
+        )
+
+        video = library.get_media("2017-09-14 01.54.30.mp4")
+        assert video.name == "2017-09-14 01.54.30.mp4"
+        self.assertRaises(KeyError, library.get_media, "missing.mp4")
+
+        assert library.media_by_extension("MP4") == [video]
+        assert library.media_by_extension("png") == []
+        assert library.media_by_camera("") == library.media
+        assert library.media_by_camera("no such camera") == []
+
+    def test_library_query(self):
+        directory = (
+            ASSET_DIR + os.path.sep +
+            os.path.sep.join(["windmill", "library1"])
+        )
+        library = cheddar.Library(directory=directory)
+
+        media = sorted(library.media, key=lambda m: m.datetime)
+        assert library.query() == media
+        assert library.query(start=media[1].datetime) == media[1:]
+        assert library.query(end=media[1].datetime) == media[:1]
+        assert library.query(extension="JPG") == [
+            m for m in media if m.file_extension == "jpg"
+        ]
+        assert library.query(camera="") == media
+        assert library.query(camera="no such camera") == []
+
+        # the media of the index are only looked up once per index
+        indexed = library._media_at_positions()
+        library.query(camera="")
+        assert library._media_at_positions() is indexed
+        library._clear_indexes()
+        assert library._media_at_positions() is not indexed
+        assert library.query() == media
+
+        # media without a datetime are not indexed, other errors propagate
+        undated = cheddar.Media(media[0].filepath)
+        undated._tags = {}
+        index = cheddar.index.MediaIndex.build([undated] + media, directory)
+        assert len(index) == len(media)
+        undated._tags = {u"EXIF:DateTimeOriginal": 20170914}
+        with self.assertRaises(TypeError):
+            cheddar.index.MediaIndex.build([undated], directory)
+
+        # the index is stored in the cache of the library
+        library = cheddar.Library(directory=directory)
+        signature = cheddar.index.MediaIndex.signature_of(
+            library.media, directory
+        )
+        assert library.index.signature == signature
+        assert [
+            m.filepath for m in library.query(start=media[1].datetime)
+        ] == [m.filepath for m in media[1:]]
+
+    def test_library_records(self):
+        library = cheddar.Library(
+            directory=ASSET_DIR + os.path.sep + "banff"
+        )
+
+        records = library.records(batch_size=1, workers=2)
+        assert [r.filepath for r in records] == [
+            m.filepath for m in library.media
+        ]
+        for record, m in zip(records, library.media):
+            assert record.datetime == m.datetime
+            assert record.camera_make == m.camera_make
+            assert record.camera_model == m.camera_model
+            assert record.size == os.path.getsize(m.filepath)
+
+    def test_library_refresh(self):
+        directory = tempfile.mkdtemp()
+        try:
+            shutil.copytree(
+                ASSET_DIR + os.path.sep + "banff",
+                os.path.join(directory, "banff")
+            )
+            library = cheddar.Library(os.path.join(directory, "banff"))
+            library.load_tags()
+            kananaskis = library.get_media("kananaskis.jpg")
+            rundle = library.get_media("rundle.png")
+            assert len(library.refresh()) == 0
+
+            shutil.copy2(
+                kananaskis.filepath,
+                os.path.join(library.directory, "copy.jpg")
+            )
+            os.remove(rundle.filepath)
+            with open(kananaskis.filepath, "ab") as f:
+                f.write(b"\x00")
+
+            changes = library.refresh()
+            assert [m.name for m in changes.added] == ["copy.jpg"]
+            assert changes.removed == [rundle]
+            assert changes.modified == [kananaskis]
+
+            # the media that did not change are kept, with their metadata
+            assert library.get_media("kananaskis.jpg") is kananaskis
+            assert kananaskis._tags is None
+            assert sorted(library.media_names) == [
+                "copy.jpg", "kananaskis.jpg"
+            ]
+            assert library.image_names == library.media_names
+            # the modified file is read again, its modification time is new
+            copy = library.get_media("copy.jpg")
+            assert copy.datetime < kananaskis.datetime
+            assert len(library.refresh()) == 0
+
+            # a file modified after the media were listed, before any
+            # refresh
+            library = cheddar.Library(os.path.join(directory, "banff"))
+            library.media
+            with open(copy.filepath, "ab") as f:
+                f.write(b"\x00")
+            changes = library.refresh()
+            assert [m.name for m in changes.modified] == ["copy.jpg"]
+            assert len(library.refresh()) == 0
+        finally:
+            shutil.rmtree(directory)
+
+    def test_library_table(self):
+        library = cheddar.Library(
+            directory=ASSET_DIR + os.path.sep + "banff"
+        )
+
+        table = library.to_table()
+        assert list(table.dtype.names) == cheddar.table.FIELDS
+        assert list(table["name"]) == library.media_names
+        assert list(table["size"]) == [
+            os.path.getsize(m.filepath) for m in library.media
+        ]
+        assert list(table["datetime"].astype(datetime.datetime)) == [
+            m.datetime for m in library.media
+        ]
+
+        assert list(library.datetimes()) == list(table["datetime"])
+
+        table = library.to_table(fields=["name", "extension"])
+        assert list(table.dtype.names) == ["name", "extension"]
+        assert sorted(table["extension"]) == ["jpg", "png"]
+
     def test_library_rename_attributes(self):
         library = cheddar.Library(
             directory=ASSET_DIR + os.path.sep + "banff"
@@ -126,6 +325,78 @@ class TestMediaAttributes(unittest.TestCase):
         assert all([img in os.listdir(library.directory) for img in newnames])
         assert sorted(library.media_names) == sorted(newnames)
 
+    def test_rename_bursts(self):
+        # a.png, c.png and d.png are a burst, taken in the same second
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        png = b"\x89PNG\r\n\x1a\n\x00\x00\x00\x00IEND\xaeB`\x82"
+        mtimes = {"c": 1505374461, "a": 1505374461, "d": 1505374461}
+        mtimes["b"] = 1505374521
+        for name, mtime in mtimes.items():
+            filepath = os.path.join(directory, name + ".png")
+            with open(filepath, "wb") as f:
+                # the name after the image tells the files apart
+                f.write(png + name.encode("ascii"))
+            os.utime(filepath, (mtime, mtime))
+        burst = datetime.datetime.fromtimestamp(1505374461).strftime(
+            "%Y-%m-%d %H.%M.%S"
+        )
+
+        library = cheddar.Library(directory=directory)
+        library.rename_content_by_date(verbose=False)
+        contents = {}
+        for name in library.media_names:
+            with open(os.path.join(directory, name), "rb") as f:
+                contents[name] = f.read()[len(png):].decode("ascii")
+        # the counters are given by datetime, then name
+        assert contents[burst + ".png"] == "a"
+        assert contents[burst + "-1.png"] == "c"
+        assert contents[burst + "-2.png"] == "d"
+
+        # renaming the renamed library does nothing
+        library = cheddar.Library(directory=directory)
+        assert len(library.plan_rename_by_date()) == 0
+        os.remove(os.path.join(directory, burst + ".png"))
+        library = cheddar.Library(directory=directory)
+        assert len(library.plan_rename_by_date()) == 0
+
+    def test_merge_libraries(self):
+        library1 = cheddar.Library(
+            directory=ASSET_DIR + os.path.sep + "banff"
+        )
+        library2 = cheddar.Library(
+            directory=(
+                ASSET_DIR + os.path.sep +
+                os.path.sep.join(["windmill", "library1"])
+            )
+        )
+        destination = ASSET_DIR + os.path.sep + "merged"
+
+        merged = cheddar.utils.merge_libraries(
+            [library1, library2], destination=destination, mode="hardlink",
+            verbose=False
+        )
+        assert len(merged.media) == 4
+        assert sorted(merged.media_names) == sorted(
+            m.filename_by_date() for m in library1.media + library2.media
+        )
+
+        shutil.rmtree(destination)
+
+        # shift the second library so that its video is one minute after
+        # the jpg of the first library
+        merged = cheddar.utils.merge_libraries(
+            [library1, library2], destination=destination,
+            sync=[(
+                library1.get_media("kananaskis.jpg"),
+                library2.get_media("2017-09-14 01.54.30.mp4")
+            )],
+            delta=datetime.timedelta(minutes=1), verbose=False
+        )
+        assert "2017-07-16 11.24.57.mp4" in merged.media_names
+
+        shutil.rmtree(destination)
+
     @classmethod
     def tearDownClass(cls):
         shutil.rmtree(ASSET_DIR)
@@ -6,6 +6,9 @@ import datetime
 
 import cheddar
 
+# the asset tests run in the timezone their datetimes were written in
+from asset_timezone import setUpModule, tearDownModule  # noqa: F401
+
 ASSET_TAR = (
     os.path.dirname(os.path.abspath( __file__ )) + os.path.sep +
     "assets.tar.gz"
@@ -34,6 +37,7 @@ class TestMediaAttributes(unittest.TestCase):
         assert image.filepath == img_filepath
         assert image.name == "rundle.png"
         assert image.datetime == datetime.datetime(2016, 10, 31, 21, 4, 57)
+        assert image.datetime is image.datetime
         assert image.file_extension == "png"
         assert image.directory == os.path.sep.join(
             ASSET_DIR.split(os.path.sep) + ["banff"]
@@ -65,6 +69,65 @@ class TestMediaAttributes(unittest.TestCase):
             ASSET_DIR.split(os.path.sep) + ["windmill/library1"]
         )
 
+    def test_metadata_cache(self):
+        image = cheddar.Media(self.get_image_path("banff/kananaskis.jpg"))
+        metadata = image.metadata
+
+        library_cache = cheddar.cache.get_cache(image.directory)
+        assert os.path.isfile(
+            image.directory + os.path.sep + cheddar.cache.SAYCHEESEINFO
+        )
+        cached = library_cache.get_metadata(
+            image.name, image.stat.st_size, image.stat.st_mtime_ns
+        )
+        assert cached == metadata
+
+        # a stale entry is not used
+        assert library_cache.get_metadata(
+            image.name, image.stat.st_size + 1, image.stat.st_mtime_ns
+        ) is None
+
+        image_reloaded = cheddar.Media(image.filepath)
+        assert image_reloaded.metadata == metadata
+
+        # a cache that can not be read (e.g. locked by another process) is
+        # a cache miss
+        library_cache._connection.close()
+        self.addCleanup(cheddar.cache.close_cache, image.directory)
+        key = (image.name, image.stat.st_size, image.stat.st_mtime_ns)
+        assert library_cache.get_metadata(*key) is None
+        assert library_cache.get_tags_many([key], ["EXIF:Make"]) == {}
+        assert library_cache.get_blob("index") is None
+        assert cheddar.Media(image.filepath).metadata == metadata
+
+    def test_tags(self):
+        video = cheddar.Media(
+            self.get_image_path("windmill/library1/2017-09-14 01.54.30.mp4")
+        )
+        metadata = cheddar.utils.get_metadata(video.filepath)
+
+        assert video.tags == cheddar.utils.select_tags(
+            metadata, cheddar.media.CORE_TAGS
+        )
+        assert set(video.tags) <= set(
+            cheddar.media.CORE_TAGS + [u"SourceFile"]
+        )
+        assert video.datetime == datetime.datetime(2017, 9, 14, 1, 54, 30)
+        assert video.camera_make == "UNKNOWN"
+        # only the tags were extracted
+        assert getattr(video, "_metadata", None) is None
+
+        # the tags are cached, with the tags they were extracted for
+        library_cache = cheddar.cache.get_cache(video.directory)
+        key = (video.name, video.stat.st_size, video.stat.st_mtime_ns)
+        assert library_cache.get_tags_many(
+            [key], cheddar.media.CORE_TAGS
+        ) == {video.name: video.tags}
+        assert library_cache.get_tags_many(
+            [(video.name, video.stat.st_size + 1, video.stat.st_mtime_ns)],
+            cheddar.media.CORE_TAGS
+        ) == {}
+
     def test_rename_by_date(self):
         image1 = cheddar.Media(self.get_image_path("banff/rundle.png"))
         image2 = cheddar.Media(self.get_image_path("banff/kananaskis.jpg"))
@@ -87,6 +150,3 @@ class TestMediaAttributes(unittest.TestCase):
 
 if __name__ == '__main__':
     unittest.main()
-
-
-
@@ -0,0 +1,111 @@
+import unittest
+import os
+import shutil
+import tempfile
+import json
+
+import cheddar
+
+
+class TestRenamePlan(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        for name in ["a.jpg", "b.jpg", "c.jpg"]:
+            with open(self.get_path(name), "w") as f:
+                f.write(name)
+
+    def get_path(self, name):
+        return self.directory + os.path.sep + name
+
+    def read(self, name):
+        with open(self.get_path(name)) as f:
+            return f.read()
+
+    def test_cycle(self):
+        plan = cheddar.plan.RenamePlan([
+            (self.get_path("a.jpg"), self.get_path("b.jpg")),
+            (self.get_path("b.jpg"), self.get_path("c.jpg")),
+            (self.get_path("c.jpg"), self.get_path("a.jpg")),
+        ])
+        assert len(plan.steps) == 4
+
+        done = []
+        plan.apply(
+            verbose=False,
+            callback=lambda source, destination: done.append((
+                source, destination, os.path.exists(destination)
+            ))
+        )
+        # the moves are reported once done, never with the temporary name
+        assert sorted(done) == sorted(
+            (source, destination, True) for source, destination in plan
+        )
+        assert self.read("b.jpg") == "a.jpg"
+        assert self.read("c.jpg") == "b.jpg"
+        assert self.read("a.jpg") == "c.jpg"
+        assert sorted(os.listdir(self.directory)) == [
+            "a.jpg", "b.jpg", "c.jpg"
+        ]
+
+    def test_chain(self):
+        plan = cheddar.plan.RenamePlan([
+            (self.get_path("a.jpg"), self.get_path("b.jpg")),
+            (self.get_path("b.jpg"), self.get_path("d.jpg")),
+        ])
+        assert plan.steps == [
+            (self.get_path("b.jpg"), self.get_path("d.jpg")),
+            (self.get_path("a.jpg"), self.get_path("b.jpg")),
+        ]
+
+        plan = cheddar.plan.RenamePlan.from_json(plan.to_json())
+        plan.apply(verbose=False)
+        assert self.read("b.jpg") == "a.jpg"
+        assert self.read("d.jpg") == "b.jpg"
+
+    def test_existing_destination(self):
+        plan = cheddar.plan.RenamePlan([
+            (self.get_path("a.jpg"), self.get_path("b.jpg")),
+        ])
+        self.assertRaises(AssertionError, plan.apply)
+
+    def interrupted_journal(self):
+        # journal of a cycle rename interrupted after its first two steps
+        plan = cheddar.plan.RenamePlan([
+            (self.get_path("a.jpg"), self.get_path("b.jpg")),
+            (self.get_path("b.jpg"), self.get_path("a.jpg")),
+        ])
+        steps = plan.steps
+        journal = self.get_path(cheddar.plan.JOURNAL)
+        with open(journal, "w") as f:
+            f.write(json.dumps({"steps": steps}) + "\n")
+            f.write(json.dumps({"done": 0}) + "\n")
+        for source, destination in steps[:2]:
+            os.rename(source, destination)
+        return journal
+
+    def test_resume(self):
+        journal = self.interrupted_journal()
+        cheddar.plan.RenamePlan.resume(journal, verbose=False)
+
+        assert not os.path.exists(journal)
+        assert self.read("a.jpg") == "b.jpg"
+        assert self.read("b.jpg") == "a.jpg"
+
+    def test_rollback(self):
+        journal = self.interrupted_journal()
+        cheddar.plan.RenamePlan.rollback(journal, verbose=False)
+
+        assert not os.path.exists(journal)
+        assert self.read("a.jpg") == "a.jpg"
+        assert self.read("b.jpg") == "b.jpg"
+        assert sorted(os.listdir(self.directory)) == [
+            "a.jpg", "b.jpg", "c.jpg"
+        ]
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,68 @@
+import unittest
+import os
+import tarfile
+import shutil
+
+import cheddar
+
+ASSET_TAR = (
+    os.path.dirname(os.path.abspath( __file__ )) + os.path.sep +
+    "assets.tar.gz"
+)
+ASSET_DIR = '.'.join(ASSET_TAR.split('.')[:-2])
+
+
+class TestExifToolPool(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        tar = tarfile.open(ASSET_TAR, 'r')
+        tar.extractall(os.path.sep.join(ASSET_DIR.split(os.path.sep)[:-1]))
+        tar.close()
+
+    def test_pool_reuses_workers(self):
+        pool = cheddar.pool.ExifToolPool(size=1)
+        filepath = os.path.sep.join([ASSET_DIR, "banff", "rundle.png"])
+
+        assert pool.started == 0
+        metadata = pool.get_metadata(filepath)
+        assert metadata["SourceFile"] == filepath
+        assert pool.started == 1
+
+        pool.get_metadata(filepath)
+        assert pool.started == 1
+
+        pool.shutdown()
+        assert pool.started == 0
+
+    def test_pool_restarts_crashed_worker(self):
+        pool = cheddar.pool.ExifToolPool(size=1)
+        filepath = os.path.sep.join([ASSET_DIR, "banff", "rundle.png"])
+
+        with pool.worker() as et:
+            et._process.kill()
+            et._process.wait()
+
+        metadata = pool.get_metadata(filepath)
+        assert metadata["SourceFile"] == filepath
+        assert pool.started == 1
+        pool.shutdown()
+
+    def test_pool_unreadable_batch(self):
+        # exiftool prints nothing when it can read none of the files
+        pool = cheddar.pool.ExifToolPool(size=1)
+        filepaths = [
+            os.path.sep.join([ASSET_DIR, "banff", "missing.png"]),
+            os.path.sep.join([ASSET_DIR, "banff", "missing.jpg"]),
+        ]
+        assert pool.get_metadata_batch(filepaths) == [None, None]
+        assert pool.get_tags_batch(filepaths, ["EXIF:Make"]) == [None, None]
+        pool.shutdown()
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(ASSET_DIR)
+
+
+if __name__ == '__main__':
+    unittest.main()
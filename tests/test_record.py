@@ -0,0 +1,62 @@
+import unittest
+import datetime
+import pickle
+
+import cheddar
+
+
+class TestMediaRecord(unittest.TestCase):
+
+    def record(self, name, **metadata):
+        metadata.setdefault(
+            u"File:FileModifyDate", u"2017:09:14 01:34:21-06:00"
+        )
+        return cheddar.record.MediaRecord.from_metadata(
+            "/photos/" + name, 1024, 0, metadata
+        )
+
+    def test_record(self):
+        record = self.record(
+            "IMG_001.JPG", **{
+                u"EXIF:Make": u"Canon", u"EXIF:Model": u"EOS 80D",
+                u"EXIF:ISO": 100,
+            }
+        )
+        assert record.filepath == "/photos/IMG_001.JPG"
+        assert record.directory == "/photos"
+        assert record.file_extension == "JPG"
+        assert record.camera_make == "Canon"
+        assert record.camera_model == "EOS 80D"
+        assert record.datetime == datetime.datetime(2017, 9, 14, 1, 34, 21)
+        assert u"EXIF:ISO" not in record.metadata
+
+        assert not hasattr(record, "__dict__")
+        self.assertRaises(AttributeError, setattr, record, "size", 0)
+
+        copy = pickle.loads(pickle.dumps(record))
+        assert copy.filepath == record.filepath
+        assert copy.datetime == record.datetime
+
+    def test_interned(self):
+        records = [
+            self.record(
+                "IMG_00{}.JPG".format(i), **{
+                    u"EXIF:Make": u"".join([u"Can", u"on"]),
+                    u"EXIF:DateTimeOriginal": u"2017:09:14 01:34:21",
+                }
+            )
+            for i in range(2)
+        ]
+        assert records[0].make is records[1].make
+        assert records[0].directory is records[1].directory
+        assert records[0].camera_model == "UNKNOWN"
+
+        # same datetime semantics as Media: the last datetime key is used
+        key, _ = cheddar.media.find_datetime(records[0].metadata)
+        assert key == u"File:FileModifyDate"
+
+        # videos are dated by their CreateDate
+        record = self.record(
+            "VID_001.mp4", **{u"QuickTime:CreateDate": u"2017:09:14 01:54:30"}
+        )
+        assert record.datetime == datetime.datetime(2017, 9, 14, 1, 54, 30)
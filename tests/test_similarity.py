@@ -0,0 +1,76 @@
+import unittest
+import os
+import shutil
+import tempfile
+
+import numpy as np
+from PIL import Image
+
+import cheddar
+
+
+class TestBKTree(unittest.TestCase):
+
+    def test_search(self):
+        values = [0b0000, 0b0001, 0b0011, 0b0111, 0b1111, 0b1000]
+        tree = cheddar.similarity.BKTree()
+        for i, value in enumerate(values):
+            tree.add(value, i)
+        assert len(tree) == len(values)
+
+        matches = tree.search(0b0000, 1)
+        assert sorted(item for _, _, item in matches) == [0, 1, 5]
+
+        for threshold in range(5):
+            expected = [
+                i for i, value in enumerate(values)
+                if cheddar.similarity.hamming_distance(value, 0b0110) <=
+                threshold
+            ]
+            matches = tree.search(0b0110, threshold)
+            assert sorted(item for _, _, item in matches) == expected
+
+
+class TestFindSimilar(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+        random = np.random.RandomState(0)
+        pattern = np.kron(
+            (random.rand(32, 32) * 255).astype("uint8"),
+            np.ones((8, 8), dtype="uint8")
+        )
+        Image.fromarray(pattern).save(self.get_path("original.jpg"))
+        Image.fromarray(pattern).resize((128, 128)).save(
+            self.get_path("copy.png")
+        )
+        Image.fromarray(
+            (random.rand(256, 256) * 255).astype("uint8")
+        ).save(self.get_path("other.jpg"))
+
+    def get_path(self, name):
+        return self.directory + os.path.sep + name
+
+    def test_find_similar(self):
+        library = cheddar.Library(self.directory)
+
+        pairs = library.find_similar(threshold=6)
+        assert len(pairs) == 1
+        assert sorted(m.name for m in pairs[0][:2]) == [
+            "copy.png", "original.jpg"
+        ]
+
+        # the hashes are cached next to the images
+        image = library.get_media("other.jpg")
+        library_cache = cheddar.cache.get_cache(self.directory)
+        assert library_cache.get_phash(
+            image.name, image.stat.st_size, image.stat.st_mtime_ns
+        ) == image.phash
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,147 @@
+import unittest
+import io
+import os
+import shutil
+import struct
+import sys
+import tempfile
+
+from PIL import Image
+
+import cheddar
+
+
+def jpeg_with_preview(image, preview, orientation=1):
+    # JPEG of an image, with an EXIF segment holding the orientation (IFD0)
+    # and a JPEG preview (IFD1)
+    data = io.BytesIO()
+    image.save(data, "JPEG")
+    data = data.getvalue()
+    thumbnail = io.BytesIO()
+    preview.save(thumbnail, "JPEG")
+    thumbnail = thumbnail.getvalue()
+
+    ifd1 = 8 + 2 + 12 + 4
+    preview_start = ifd1 + 2 + 2 * 12 + 4
+    tiff = b"II" + struct.pack("<HI", 42, 8)
+    tiff += struct.pack("<HHHIHH", 1, 0x0112, 3, 1, orientation, 0)
+    tiff += struct.pack("<I", ifd1)
+    tiff += struct.pack("<H", 2)
+    tiff += struct.pack("<HHII", 0x0201, 4, 1, preview_start)
+    tiff += struct.pack("<HHII", 0x0202, 4, 1, len(thumbnail))
+    tiff += struct.pack("<I", 0) + thumbnail
+
+    exif = b"Exif\x00\x00" + tiff
+    return (
+        data[:2] + b"\xff\xe1" + struct.pack(">H", 2 + len(exif)) + exif +
+        data[2:]
+    )
+
+
+class TestThumbnails(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.cache_dir = cheddar.thumbnails.CACHE_DIR
+        cheddar.thumbnails.CACHE_DIR = os.path.join(
+            self.directory, "thumbnails"
+        )
+
+        os.mkdir(self.get_path("library"))
+        with open(self.get_path("library", "preview.jpg"), "wb") as f:
+            f.write(jpeg_with_preview(
+                Image.new("RGB", (1200, 800), (255, 0, 0)),
+                Image.new("RGB", (300, 200), (0, 0, 255)),
+                orientation=6
+            ))
+        Image.new("RGB", (1000, 500), (0, 255, 0)).save(
+            self.get_path("library", "green.png")
+        )
+        shutil.copy2(
+            self.get_path("library", "green.png"),
+            self.get_path("library", "copy.png")
+        )
+
+    def tearDown(self):
+        cheddar.thumbnails.CACHE_DIR = self.cache_dir
+        shutil.rmtree(self.directory)
+
+    def get_path(self, *names):
+        return os.path.join(self.directory, *names)
+
+    def test_preview(self):
+        preview, orientation = cheddar.fastread.read_exif_preview(
+            self.get_path("library", "preview.jpg")
+        )
+        assert orientation == 6
+        assert Image.open(io.BytesIO(preview)).size == (300, 200)
+        assert cheddar.fastread.read_exif_preview(
+            self.get_path("library", "green.png")
+        ) is None
+
+    def test_thumbnail(self):
+        media = cheddar.Media(self.get_path("library", "preview.jpg"))
+        thumbnail = Image.open(media.thumbnail(size=128))
+        # made from the rotated preview rather than the photo
+        assert thumbnail.size == (85, 128)
+        red, green, blue = thumbnail.getpixel((40, 60))
+        assert blue > 200 and red < 50
+
+        # the preview is too small, the photo is decoded
+        thumbnail = Image.open(media.thumbnail(size=512))
+        assert thumbnail.size == (341, 512)
+        red, green, blue = thumbnail.getpixel((170, 256))
+        assert red > 200 and blue < 50
+
+    def test_build_thumbnails(self):
+        library = cheddar.Library(self.get_path("library"))
+        filepaths = library.build_thumbnails(workers=2)
+        assert len(filepaths) == 3
+        assert all(os.path.isfile(f) for f in filepaths)
+
+        by_name = dict(zip(library.image_names, filepaths))
+        # the thumbnails are content-addressed, copies share theirs
+        assert by_name["green.png"] == by_name["copy.png"]
+        # the default size is the size of the EXIF previews
+        assert Image.open(by_name["green.png"]).size == (160, 80)
+        preview = Image.open(by_name["preview.jpg"])
+        assert preview.size == (107, 160)
+        red, green, blue = preview.getpixel((53, 80))
+        assert blue > 200 and red < 50
+
+        thumbnails = cheddar.thumbnails.get_cache()
+        assert thumbnails.size == sum(
+            os.path.getsize(f) for f in set(filepaths)
+        )
+
+        # the least recently used thumbnail is evicted
+        os.utime(by_name["green.png"], (0, 0))
+        thumbnails.max_size = thumbnails.size - 1
+        thumbnails.added([])
+        assert not os.path.exists(by_name["green.png"])
+        assert os.path.exists(by_name["preview.jpg"])
+
+        assert library.build_thumbnails(workers=1) == filepaths
+        assert os.path.exists(by_name["green.png"])
+
+    def test_build_thumbnails_errors(self):
+        # an image that can not be read has no thumbnail, the others do
+        with open(self.get_path("library", "broken.jpg"), "wb") as f:
+            f.write(b"\xff\xd8 not a photo")
+        library = cheddar.Library(self.get_path("library"))
+        for workers in [1, 2]:
+            by_name = dict(zip(
+                library.image_names, library.build_thumbnails(workers=workers)
+            ))
+            assert by_name["broken.jpg"] is None
+            assert os.path.isfile(by_name["green.png"])
+            assert os.path.isfile(by_name["preview.jpg"])
+
+        # a missing Pillow is an error, not a thumbnail missing for each image
+        pil = sys.modules["PIL"]
+        sys.modules["PIL"] = None
+        try:
+            with self.assertRaises(ImportError):
+                library.build_thumbnails(size=64, workers=1)
+        finally:
+            sys.modules["PIL"] = pil
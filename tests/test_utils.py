@@ -0,0 +1,129 @@
+import unittest
+import datetime
+
+import numpy as np
+
+import cheddar
+
+
+class TestNameResolver(unittest.TestCase):
+
+    def test_claim_files(self):
+        resolver = cheddar.utils.NameResolver(
+            ["IMG.jpg", "IMG-1.jpg", "IMG.png"]
+        )
+
+        assert resolver.claim("other.jpg") == "other.jpg"
+        assert resolver.claim("IMG.jpg") == "IMG-2.jpg"
+        assert resolver.claim("IMG.jpg") == "IMG-3.jpg"
+        assert resolver.claim("IMG.png") == "IMG-1.png"
+        assert resolver.claim("IMG-1.png") == "IMG-2.png"
+        assert resolver.claim("2017-09-14 01.54.30.jpg") == (
+            "2017-09-14 01.54.30.jpg"
+        )
+        assert resolver.claim("2017-09-14 01.54.30.jpg") == (
+            "2017-09-14 01.54.30-1.jpg"
+        )
+
+    def test_claim_released_name(self):
+        resolver = cheddar.utils.NameResolver(["IMG.jpg"])
+
+        resolver.discard("IMG.jpg")
+        assert "IMG.jpg" not in resolver
+        assert resolver.claim("IMG.jpg") == "IMG.jpg"
+        assert "IMG.jpg" in resolver
+
+    def test_claim_directories(self):
+        resolver = cheddar.utils.NameResolver(
+            ["windmill", "windmill (1)"], suffix=" ({})",
+            split_extension=False
+        )
+
+        assert resolver.claim("windmill") == "windmill (2)"
+        assert resolver.claim("windmill (2)") == "windmill (3)"
+        assert resolver.claim("banff") == "banff"
+
+    def test_is_variant(self):
+        resolver = cheddar.utils.NameResolver()
+        assert resolver.is_variant("IMG.jpg", "IMG.jpg")
+        assert resolver.is_variant("IMG-12.jpg", "IMG.jpg")
+        assert not resolver.is_variant("IMG-0.jpg", "IMG.jpg")
+        assert not resolver.is_variant("IMG-1.png", "IMG.jpg")
+        assert not resolver.is_variant("IMG-a.jpg", "IMG.jpg")
+        # a date is not mistaken for a counter
+        assert not resolver.is_variant("2017-09-15.jpg", "2017-09-14.jpg")
+
+        resolver = cheddar.utils.NameResolver(
+            suffix=" ({})", split_extension=False
+        )
+        assert resolver.is_variant("windmill (2)", "windmill")
+        assert not resolver.is_variant("windmill (2", "windmill")
+
+    def test_exists(self):
+        resolver = cheddar.utils.NameResolver(
+            exists=lambda name: name in ["IMG.jpg", "IMG-1.jpg"]
+        )
+
+        assert resolver.claim("IMG.jpg") == "IMG-2.jpg"
+
+
+class TestParseDatetimes(unittest.TestCase):
+
+    def test_parse_datetimes(self):
+        datetimes = cheddar.utils.parse_datetimes([
+            "2017:09:14 01:54:30", "2016:10:31 21:04:57-06:00", None,
+            "0000:00:00 00:00:00"
+        ])
+
+        assert datetimes.dtype == np.dtype("datetime64[s]")
+        assert datetimes[0] == np.datetime64("2017-09-14T01:54:30")
+        assert datetimes[1].astype(datetime.datetime) == datetime.datetime(
+            2016, 10, 31, 21, 4, 57
+        )
+        assert np.isnat(datetimes[2])
+        assert np.isnat(datetimes[3])
+
+    def test_parse_no_datetimes(self):
+        assert len(cheddar.utils.parse_datetimes([])) == 0
+
+
+class TestCorrelateDatetimes(unittest.TestCase):
+
+    def setUp(self):
+        random = np.random.RandomState(0)
+
+        # bursts of shots during an 8 hour event, shared by two cameras
+        seconds = np.concatenate([
+            start + random.randint(0, 30, random.randint(1, 40))
+            for start in random.randint(0, 8 * 3600, 200)
+        ])
+        camera2 = random.rand(len(seconds)) < 0.5
+
+        origin = np.datetime64("2017-09-14T00:00:00")
+        self.datetimes1 = origin + seconds[~camera2].astype("timedelta64[s]")
+        self.datetimes2 = origin + seconds[camera2].astype("timedelta64[s]")
+
+    def test_offset(self):
+        shift = cheddar.utils.correlate_datetimes(
+            self.datetimes1, self.datetimes2 - np.timedelta64(3723, "s")
+        )
+        assert shift == 3723
+
+    def test_large_offset(self):
+        # the camera clock was never set
+        offset = 3 * 365 * 24 * 3600 + 3723
+        shift = cheddar.utils.correlate_datetimes(
+            self.datetimes1, self.datetimes2 + np.timedelta64(offset, "s")
+        )
+        assert shift == -offset
+
+    def test_max_shift(self):
+        shift = cheddar.utils.correlate_datetimes(
+            self.datetimes1, self.datetimes2 - np.timedelta64(3723, "s"),
+            max_shift=60
+        )
+        assert abs(shift) <= 60
+
+
+if __name__ == '__main__':
+    unittest.main()
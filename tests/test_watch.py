@@ -0,0 +1,68 @@
+import unittest
+import os
+import shutil
+import tempfile
+import threading
+import time
+
+import cheddar
+
+
+class TestWatch(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        os.mkdir(os.path.join(self.directory, "2017"))
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def write(self, *names):
+        with open(os.path.join(self.directory, *names), "wb") as f:
+            f.write(b"\xff\xd8\xff\xd9")
+
+    @unittest.skipUnless(cheddar.watch.available(), "requires inotify")
+    def test_inotify(self):
+        with cheddar.watch.Inotify() as inotify:
+            inotify.add_watch(self.directory)
+            assert inotify.directories == [self.directory]
+            assert inotify.read(timeout=0) == []
+
+            self.write("new.jpg")
+            events = inotify.read(timeout=1)
+            assert (self.directory, "new.jpg", cheddar.watch.IN_CREATE) in [
+                (directory, name, mask & cheddar.watch.IN_CREATE)
+                for directory, name, mask in events
+            ]
+
+            os.rmdir(os.path.join(self.directory, "2017"))
+            inotify.read(timeout=1)
+
+    def test_watch(self):
+        self.write("old.jpg")
+        library = cheddar.Library(self.directory, recursive=True)
+
+        def change():
+            time.sleep(0.2)
+            self.write("2017", "new.jpg")
+            os.remove(os.path.join(self.directory, "old.jpg"))
+
+        thread = threading.Thread(target=change)
+        changes = library.watch(timeout=5, delay=0.1, interval=0.1)
+
+        # the library was not listed yet
+        assert [m.name for m in next(changes).added] == ["old.jpg"]
+
+        thread.start()
+        refreshed = next(changes)
+        # the events may be split over two refreshes
+        if len(refreshed.added) == 0 or len(refreshed.removed) == 0:
+            second = next(changes)
+            refreshed.added += second.added
+            refreshed.removed += second.removed
+        changes.close()
+        thread.join()
+
+        assert [m.name for m in refreshed.added] == ["new.jpg"]
+        assert [m.name for m in refreshed.removed] == ["old.jpg"]
+        assert library.media_names == ["new.jpg"]